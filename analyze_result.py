@@ -1,43 +1,116 @@
 import argparse
 import json
+import statistics
 import sys
 from pathlib import Path
 
+import corpus_generator
+import memory_limit
+import result_store
+import sample_stats
 
-def analyze_results(results_file):
+KNEE_FRACTION = 0.9  # Knee point: fewest threads reaching 90% of the best observed speedup
+PRODUCTION_ALGORITHM = 'gzip'  # Current production setting: gzip -5
+PRODUCTION_LEVEL = 5
+MEMORY_FIT_TARGET = 512 * 1024 * 1024  # Archive worker memory a configuration must fit in (without --memory-limit)
+REGRESSION_THRESHOLD = 0.05  # --baseline: flag median changes of more than 5%...
+REGRESSION_ALPHA = 0.05  # ...that the permutation test finds significant at this level
+COMPARED_METRICS = ('compression_time', 'decompression_time', 'compressed_size')  # Lower is better for all
+DEFAULT_WORKLOAD = {
+    'daily_volume': '500GB',  # Logs written (and compressed) per day
+    'read_ratio': 0.2,  # Bytes read back (decompressed) per byte written
+    'retention_days': 30,  # Days each day's logs stay in the archive
+    'core_budget': 8,  # Cores available to compression and decompression, around the clock
+    'storage_budget': '5TB',  # Compressed logs the archive can hold (retention_days worth)
+    'weights': {  # Cost of each resource, in any one unit (default: cloud list prices in USD)
+        'compression_cpu_hour': 0.04,
+        'decompression_cpu_hour': 0.04,
+        'storage_gb_day': 0.023 / 30,
+    },
+}
+
+
+def total_time(result):
+    """Compression + decompression time in seconds"""
+    return result['avg_compression_time'] + result['avg_decompression_time']
+
+
+def config_label(result):
+    """
+    'algorithm - level' plus whatever else tells configurations of one run apart
+
+    The worker count, the grid or memory-sweep variant, the transform and the
+    host class when there are, and the backend and page-cache state when
+    they are not the defaults.
+    """
+    label = f"{result['algorithm']} - {result['level_name']}"
+    if result.get('threads') is not None:
+        label += f" x{result['threads']}"
+    if result.get('variant'):
+        label += f" [{result['variant']}]"
+    if result.get('transform'):
+        label += f" +{result['transform']}"
+    if result.get('host_class'):
+        label += f" @{result['host_class']}"
+    if result.get('backend', 'cli') != 'cli':
+        label += f" ({result['backend']})"
+    if result.get('cache_state', 'cold') != 'cold':
+        label += f" [{result['cache_state']}]"
+    return label
+
+
+def load_results(results_file, corpus_hash=None):
+    """
+    Load results from a JSON export or from a SQLite result store (.db)
+
+    A store holds every configuration ever measured, possibly on several
+    corpora; corpus_hash (a prefix is enough) restricts it to one corpus.
+    """
+    if Path(results_file).suffix not in ('.db', '.sqlite'):
+        with open(results_file, 'r') as f:
+            return json.load(f)
+
+    results = result_store.load_results(result_store.open_store(results_file))
+    if corpus_hash:
+        results = [r for r in results if r['corpus_hash'].startswith(corpus_hash)]
+    return results
+
+
+def analyze_results(results_file, corpus_hash=None):
     """Analyze compression benchmark results"""
     try:
-        # Load the JSON results
-        with open(results_file, 'r') as f:
-            results = json.load(f)
+        # Load the JSON results (or the result store view)
+        results = load_results(results_file, corpus_hash)
 
         print(f"Analyzing results from: {results_file}")
         print()
+
+        # Configurations aborted over their time budget or memory limit have no times to rank
+        exceeded = [r for r in results if r.get('budget_exceeded')]
+        results = [r for r in results if not r.get('budget_exceeded')]
+        if exceeded:
+            print("=== Exceeded Time Budget or Memory Limit ===")
+            for result in exceeded:
+                projected = result.get('projected_time')
+                print(f"    {config_label(result)}: {result['status']}"
+                      + (f" (projected {projected:.0f}s vs {result['exceeded_budget']}s budget)" if projected else ""))
+            print()
         # Calculate Overall Best - Top 3:
         print("=== Overall Best Results ===")
         # Top 3 compression ratios (best compression)
-        top_compression = sorted(results, key=lambda x: x['compression_score'], reverse=True)[:3]
+        top_compression = sorted(results, key=lambda x: x['avg_compression_ratio'])[:3]
         print(" Top 3 Best Compression Ratios:")
         for i, result in enumerate(top_compression, 1):
             print(f"    {i}. {result['avg_compression_ratio']:.3f} "
-                  f"({result['algorithm']} - {result['level_name']})")
+                  f"({config_label(result)})")
         print()
 
         # Top 3 compression speeds (fastest)
-        top_speed = sorted(results, key=lambda x: x['speed_score'], reverse=True)[:3]
+        top_speed = sorted(results, key=total_time)[:3]
         print(" Top 3 Fastest Compression + Decompression Speeds (seconds):")
         for i, result in enumerate(top_speed, 1):
-            total_time = result['avg_compression_time'] + result['avg_decompression_time']
-            print(f"    {i}. {total_time:.3f}s total "
-                  f"({result['algorithm']} - {result['level_name']})")
-        print()
-
-        # Top 3 trade-off scores (best balance)
-        top_tradeoff = sorted(results, key=lambda x: x['trade_off_score'], reverse=True)[:3]
-        print(" Top 3 Best Trade-off Scores:")
-        for i, result in enumerate(top_tradeoff, 1):
-            print(f"    {i}. {result['trade_off_score']:.1f}/100 "
-                  f"({result['algorithm']} - {result['level_name']})")
+            print(f"    {i}. {total_time(result):.3f}s total "
+                  f"({config_label(result)})")
         print()
 
         print("=== Best Single Thread Category Results ===")
@@ -47,28 +120,19 @@ def analyze_results(results_file):
 
         if single_threaded:
             # Top 3 compression for single-threaded
-            top_single_compression = sorted(single_threaded, key=lambda x: x['compression_score'], reverse=True)[:3]
+            top_single_compression = sorted(single_threaded, key=lambda x: x['avg_compression_ratio'])[:3]
             print(" Top 3 Best Compression Ratios:")
             for i, result in enumerate(top_single_compression, 1):
                 print(f"    {i}. {result['avg_compression_ratio']:.3f} "
-                      f"({result['algorithm']} - {result['level_name']})")
+                      f"({config_label(result)})")
             print()
 
             # Top 3 fastest single-threaded
-            top_single_speed = sorted(single_threaded, key=lambda x: x['speed_score'], reverse=True)[:3]
+            top_single_speed = sorted(single_threaded, key=total_time)[:3]
             print(" Top 3 Fastest Speeds:")
             for i, result in enumerate(top_single_speed, 1):
-                total_time = result['avg_compression_time'] + result['avg_decompression_time']
-                print(f"    {i}. {total_time:.3f}s "
-                      f"({result['algorithm']} - {result['level_name']})")
-            print()
-
-            # Top 3 trade-off for single-threaded
-            top_single_tradeoff = sorted(single_threaded, key=lambda x: x['trade_off_score'], reverse=True)[:3]
-            print(" Top 3 Best Trade-off Scores:")
-            for i, result in enumerate(top_single_tradeoff, 1):
-                print(f"    {i}. {result['trade_off_score']:.1f}/100 "
-                      f"({result['algorithm']} - {result['level_name']})")
+                print(f"    {i}. {total_time(result):.3f}s "
+                      f"({config_label(result)})")
         else:
             print("No single-threaded results found")
         print()
@@ -80,28 +144,19 @@ def analyze_results(results_file):
 
         if multi_threaded:
             # Top 3 compression for multi-threaded
-            top_multi_compression = sorted(multi_threaded, key=lambda x: x['compression_score'], reverse=True)[:3]
+            top_multi_compression = sorted(multi_threaded, key=lambda x: x['avg_compression_ratio'])[:3]
             print(" Top 3 Best Compression Ratios:")
             for i, result in enumerate(top_multi_compression, 1):
                 print(f"    {i}. {result['avg_compression_ratio']:.3f} "
-                      f"({result['algorithm']} - {result['level_name']})")
+                      f"({config_label(result)})")
             print()
 
             # Top 3 fastest multi-threaded
-            top_multi_speed = sorted(multi_threaded, key=lambda x: x['speed_score'], reverse=True)[:3]
+            top_multi_speed = sorted(multi_threaded, key=total_time)[:3]
             print(" Top 3 Fastest Speeds:")
             for i, result in enumerate(top_multi_speed, 1):
-                total_time = result['avg_compression_time'] + result['avg_decompression_time']
-                print(f"    {i}. {total_time:.3f}s "
-                      f"({result['algorithm']} - {result['level_name']})")
-            print()
-
-            # Top 3 trade-off for multi-threaded
-            top_multi_tradeoff = sorted(multi_threaded, key=lambda x: x['trade_off_score'], reverse=True)[:3]
-            print(" Top 3 Best Trade-off Scores:")
-            for i, result in enumerate(top_multi_tradeoff, 1):
-                print(f"    {i}. {result['trade_off_score']:.1f}/100 "
-                      f"({result['algorithm']} - {result['level_name']})")
+                print(f"    {i}. {total_time(result):.3f}s "
+                      f"({config_label(result)})")
         else:
             print("No multi-threaded results found")
         print()
@@ -119,26 +174,877 @@ def analyze_results(results_file):
         sys.exit(1)
 
 
+def analyze_resource_usage(results):
+    """Report CPU time, memory and parallel efficiency per configuration"""
+    measured = [r for r in results if 'compression_cpu_seconds_per_gb' in r]
+    if not measured:
+        print("No resource usage data in results (run with a newer run_benchmark.py)")
+        print()
+        return
+
+    print("=== Resource Usage (per GB of input) ===")
+    print(f"    {'configuration':<32} {'comp CPU-s/GB':>13} {'decomp CPU-s/GB':>15} "
+          f"{'comp cores':>10} {'comp eff':>8} {'peak RSS MB':>11}")
+    for result in measured:
+        peak_rss_kb = max(result.get('peak_compression_rss_kb', 0), result.get('peak_decompression_rss_kb', 0))
+        print(f"    {config_label(result):<32} "
+              f"{result['compression_cpu_seconds_per_gb']:>13.2f} "
+              f"{result.get('decompression_cpu_seconds_per_gb', 0):>15.2f} "
+              f"{result['compression_cpu_utilization']:>10.2f} "
+              f"{result['compression_parallel_efficiency']:>8.0%} "
+              f"{peak_rss_kb / 1024:>11.1f}")
+    print()
+
+    # Top 3 cheapest compression in CPU time
+    top_cpu = sorted(measured, key=lambda x: x['compression_cpu_seconds_per_gb'])[:3]
+    print(" Top 3 Lowest Compression CPU-seconds per GB:")
+    for i, result in enumerate(top_cpu, 1):
+        print(f"    {i}. {result['compression_cpu_seconds_per_gb']:.2f} CPU-s/GB "
+              f"({config_label(result)})")
+    print()
+
+    # Top 3 smallest compression memory footprint
+    top_rss = sorted(measured, key=lambda x: x.get('peak_compression_rss_kb', 0))[:3]
+    print(" Top 3 Lowest Peak Compression Memory:")
+    for i, result in enumerate(top_rss, 1):
+        print(f"    {i}. {result.get('peak_compression_rss_kb', 0) / 1024:.1f} MB "
+              f"({config_label(result)})")
+    print()
+
+
+def analyze_throughput(results):
+    """Report steady-state throughput, time to first output byte and output stalls per configuration"""
+    measured = [r for r in results if 'avg_compression_ttfb' in r]
+    if not measured:
+        return
+
+    def fmt(value, width, precision):
+        # Steady state is missing for runs too short to resolve it
+        return f"{value:>{width}.{precision}f}" if value is not None else f"{'-':>{width}}"
+
+    print("=== Throughput Time Series (steady-state MB/s of input, TTFB, output stalls) ===")
+    print(f"    {'configuration':<32} {'comp MB/s':>9} {'comp TTFB':>9} {'comp stalls':>11} "
+          f"{'decomp MB/s':>11} {'decomp TTFB':>11} {'decomp stalls':>13}")
+    for result in measured:
+        print(f"    {config_label(result):<32} "
+              f"{fmt(result.get('avg_compression_steady_mbps'), 9, 1)} "
+              f"{fmt(result.get('avg_compression_ttfb'), 8, 3)}s "
+              f"{result.get('avg_compression_stalls', 0):>4.1f}/{result.get('avg_compression_stall_time', 0):>5.2f}s "
+              f"{fmt(result.get('avg_decompression_steady_mbps'), 11, 1)} "
+              f"{fmt(result.get('avg_decompression_ttfb'), 10, 3)}s "
+              f"{result.get('avg_decompression_stalls', 0):>6.1f}/{result.get('avg_decompression_stall_time', 0):>5.2f}s")
+    print()
+
+    # Top 3 quickest to the first compressed byte (what a reader streaming the log waits for)
+    top_ttfb = sorted(measured, key=lambda x: x['avg_compression_ttfb'])[:3]
+    print(" Top 3 Fastest Time to First Compressed Byte:")
+    for i, result in enumerate(top_ttfb, 1):
+        print(f"    {i}. {result['avg_compression_ttfb'] * 1000:.0f} ms "
+              f"({config_label(result)})")
+    print()
+
+
+def analyze_backends(results):
+    """Compare CLI and in-process library throughput for matching configurations"""
+    library = {(r['algorithm'], r['level_name'], r.get('cache_state', 'cold'), r.get('transform')): r
+               for r in results if r.get('backend') == 'library'}
+    if not library:
+        return
+
+    print("=== CLI vs Library Backend (MB/s of input) ===")
+    print(f"    {'configuration':<32} {'CLI comp':>9} {'lib comp':>9} {'CLI decomp':>11} {'lib decomp':>11} {'size diff':>9}")
+    for cli in results:
+        if cli.get('backend', 'cli') != 'cli':
+            continue
+        lib = library.get((cli['algorithm'], cli['level_name'], cli.get('cache_state', 'cold'), cli.get('transform')))
+        if not lib:
+            continue
+        size_mb = cli['original_size'] / 1024 / 1024
+        print(f"    {config_label(cli):<32} "
+              f"{size_mb / cli['avg_compression_time']:>9.1f} "
+              f"{size_mb / lib['avg_compression_time']:>9.1f} "
+              f"{size_mb / cli['avg_decompression_time']:>11.1f} "
+              f"{size_mb / lib['avg_decompression_time']:>11.1f} "
+              f"{lib['avg_compressed_size'] / cli['avg_compressed_size'] - 1:>+9.1%}")
+
+    # Library codecs without a CLI counterpart in this run
+    cli_configs = {(r['algorithm'], r['level_name'], r.get('cache_state', 'cold'), r.get('transform'))
+                   for r in results if r.get('backend', 'cli') == 'cli'}
+    for key, lib in library.items():
+        if key not in cli_configs:
+            size_mb = lib['original_size'] / 1024 / 1024
+            print(f"    {config_label(lib):<32} {'-':>9} "
+                  f"{size_mb / lib['avg_compression_time']:>9.1f} {'-':>11} "
+                  f"{size_mb / lib['avg_decompression_time']:>11.1f} {'-':>9}")
+    print()
+
+
+def analyze_transform(results):
+    """Compare each configuration's end-to-end ratio and speed with and without the log-aware transform"""
+    transformed = [r for r in results if r.get('transform')]
+    if not transformed:
+        return
+
+    def key(r):
+        return (r.get('backend', 'cli'), r['algorithm'], r['level_name'], r.get('threads'), r.get('variant'),
+                r.get('cache_state', 'cold'))
+
+    plain = {key(r): r for r in results if not r.get('transform')}
+    first = transformed[0]
+    size_mb = first['original_size'] / 1024 / 1024
+    print(f"=== Log-Aware Transform ({first['transform']}) ===")
+    print(f"    Transform alone: encode {size_mb / first['transform_encode_time']:.1f} MB/s, "
+          f"decode {size_mb / first['transform_decode_time']:.1f} MB/s, "
+          f"output {first['transformed_size'] / first['original_size']:.3f} of the input"
+          + ("" if first['transform_valid'] else " (round trip FAILED)"))
+    print("    End to end, without / with the transform (MB/s of input):")
+    print(f"    {'configuration':<32} {'ratio':>13} {'compression':>15} {'decompression':>15}")
+    for r in transformed:
+        base = plain.get(key(r))
+        if not base:
+            continue
+        print(f"    {config_label(base):<32} "
+              f"{base['avg_compression_ratio']:>6.3f}/{r['avg_compression_ratio']:<6.3f} "
+              f"{size_mb / base['avg_compression_time']:>7.1f}/{size_mb / r['avg_compression_time']:<7.1f} "
+              f"{size_mb / base['avg_decompression_time']:>7.1f}/{size_mb / r['avg_decompression_time']:<7.1f}")
+    print()
+
+
+def analyze_cache_states(results):
+    """Compare each configuration's throughput across the page-cache states it was measured in"""
+    configs = {}
+    for r in results:
+        key = (r.get('backend', 'cli'), r['algorithm'], r['level_name'], r.get('threads'), r.get('variant'),
+               r.get('transform'), r.get('host_class'))
+        configs.setdefault(key, {})[r.get('cache_state', 'cold')] = r
+    configs = {key: states for key, states in configs.items() if len(states) > 1}
+    if not configs:
+        return
+
+    modes = ('cold', 'warm', 'direct')
+    print("=== Page Cache States (MB/s of input, compression / decompression) ===")
+    print(f"    {'configuration':<32} " + " ".join(f"{mode:>15}" for mode in modes) + f" {'warm/cold':>10}")
+    for states in configs.values():
+        label = config_label({**next(iter(states.values())), 'cache_state': 'cold'})
+        columns = []
+        for mode in modes:
+            r = states.get(mode)
+            if r:
+                size_mb = r['original_size'] / 1024 / 1024
+                columns.append(f"{size_mb / r['avg_compression_time']:>7.1f}/"
+                               f"{size_mb / r['avg_decompression_time']:<7.1f}")
+            else:
+                columns.append(f"{'-':>15}")
+        if 'cold' in states and 'warm' in states:
+            speedup = states['cold']['avg_compression_time'] / states['warm']['avg_compression_time']
+            columns.append(f"{speedup:>9.2f}x")
+        print(f"    {label:<32} " + " ".join(columns))
+    print()
+
+
+def analyze_host_classes(results):
+    """Compare each configuration's throughput across the host classes it ran on (--coordinator runs)"""
+    def host_class(r):
+        return r.get('host_class') or r.get('cpu_model', 'unknown')
+
+    classes = list(dict.fromkeys(host_class(r) for r in results))
+    if len(classes) < 2:
+        return
+    configs = {}
+    for r in results:
+        key = (r.get('backend', 'cli'), r['algorithm'], r['level_name'], r.get('threads'), r.get('variant'),
+               r.get('transform'), r.get('cache_state', 'cold'))
+        configs.setdefault(key, {})[host_class(r)] = r
+
+    print("=== Host Classes (MB/s of input, compression / decompression) ===")
+    for i, name in enumerate(classes, 1):
+        hosts = sorted({r['host'] for r in results if host_class(r) == name and r.get('host')})
+        print(f"    [{i}] {name}" + (f" ({', '.join(hosts)})" if hosts else ""))
+    print(f"    {'configuration':<32} " + " ".join(f"{f'[{i}]':>15}" for i in range(1, len(classes) + 1)))
+    wins = dict.fromkeys(classes, 0)
+    for states in configs.values():
+        label = config_label({**next(iter(states.values())), 'host_class': None})
+        columns = []
+        for name in classes:
+            r = states.get(name)
+            if r:
+                size_mb = r['original_size'] / 1024 / 1024
+                columns.append(f"{size_mb / r['avg_compression_time']:>7.1f}/"
+                               f"{size_mb / r['avg_decompression_time']:<7.1f}")
+            else:
+                columns.append(f"{'-':>15}")
+        if len(states) > 1:
+            wins[min(states, key=lambda name: states[name]['avg_compression_time'])] += 1
+        print(f"    {label:<32} " + " ".join(columns))
+    for i, name in enumerate(classes, 1):
+        print(f"    [{i}] compresses fastest in {wins[name]} configurations")
+    print()
+
+
+def peak_memory_mb(result):
+    """Peak memory of the hungrier phase: the run cgroup's peak when measured, otherwise peak RSS"""
+    peaks = []
+    for phase in ('compression', 'decompression'):
+        peak = result.get(f'peak_{phase}_cgroup_memory_kb', result.get(f'peak_{phase}_rss_kb'))
+        if peak is not None:
+            peaks.append(peak / 1024)
+    return max(peaks) if peaks else None
+
+
+def analyze_memory(results):
+    """Ratio / speed / peak memory triples of a --memory-sweep or --memory-limit run"""
+    measured = [r for r in results if r.get('memory_sweep') or r.get('memory_limit')]
+    if not measured:
+        return
+
+    print("=== Memory (ratio / MB/s of input / peak memory) ===")
+    print(f"    {'configuration':<40} {'ratio':>7} {'comp MB/s':>10} {'decomp MB/s':>12} "
+          f"{'comp MB':>8} {'decomp MB':>10}")
+    for r in measured:
+        label = config_label(r)
+        size_mb = r['original_size'] / 1024 / 1024
+        columns = []
+        for phase in ('compression', 'decompression'):
+            peak = r.get(f'peak_{phase}_cgroup_memory_kb', r.get(f'peak_{phase}_rss_kb'))
+            columns.append(f"{peak / 1024:>.0f}" if peak is not None else "-")
+        print(f"    {label:<40} {r['avg_compression_ratio']:>7.3f} "
+              f"{size_mb / r['avg_compression_time']:>10.1f} {size_mb / r['avg_decompression_time']:>12.1f} "
+              f"{columns[0]:>8} {columns[1]:>10}")
+    print()
+
+    target_mb = (measured[0].get('memory_limit') or MEMORY_FIT_TARGET) / 1024 / 1024
+    if measured[0].get('memory_enforcement') == 'rlimit':
+        # Failures count reserved address space, the peaks only resident memory
+        print(f" The {target_mb:.0f} MB limit was a {memory_limit.LIMIT_KINDS['rlimit']}: runs that failed "
+              f"under it may fit in {target_mb:.0f} MB of RSS")
+    fitting = [r for r in measured if peak_memory_mb(r) is not None and peak_memory_mb(r) <= target_mb]
+    print(f" Best compression ratios within {target_mb:.0f} MB:")
+    for i, r in enumerate(sorted(fitting, key=lambda x: x['avg_compression_ratio'])[:3], 1):
+        print(f"    {i}. {r['avg_compression_ratio']:.3f} at {peak_memory_mb(r):.0f} MB ({config_label(r)})")
+    print()
+
+
+def analyze_streaming(results):
+    """Report flush latency, CPU cost and ratio loss of a streaming-append run (streaming_append.py)"""
+    print("=== Streaming Append (ratio loss vs one-shot / p95 flush latency) ===")
+    intervals = sorted({r['flush_interval'] for r in results})
+    print(f"    {'configuration':<36} {'cores':>6} {'CPU-s/GB':>9} "
+          + " ".join(f"{f'every {interval:g}s':>18}" for interval in intervals))
+    configs = {}
+    for r in results:
+        configs.setdefault((r['algorithm'], r['level_name'], r['ingest_rate']), {})[r['flush_interval']] = r
+    for (algorithm, level_name, rate), by_interval in configs.items():
+        label = f"{algorithm} - {level_name} @ {rate / 1024 / 1024:g} MB/s"
+        runs = list(by_interval.values())
+        cores = statistics.mean(r['cpu_utilization'] for r in runs)
+        cpu_per_gb = statistics.mean(r['cpu_seconds_per_gb'] for r in runs)
+        columns = []
+        for interval in intervals:
+            r = by_interval.get(interval)
+            if r is None or r['p95_flush_latency'] is None:
+                columns.append(f"{'-':>18}")
+            else:
+                columns.append(f"{r['ratio_loss']:>+8.2%} /{r['p95_flush_latency'] * 1000:>6.2f}ms")
+        note = "" if all(r['kept_up'] for r in runs) else "  (fell behind)"
+        print(f"    {label:<36} {cores:>6.2f} {cpu_per_gb:>9.1f} " + " ".join(columns) + note)
+    failed = [r for r in results if not r['sha256_valid']]
+    if failed:
+        print(f"    Verification failed for {len(failed)} replays")
+    print()
+
+
+def analyze_small_files(results):
+    """Report ratio and per-file latency with and without zstd dictionaries (small_files.py)"""
+    print("=== Small Files (each record compressed on its own) ===")
+    print(f"    {'configuration':<42} {'ratio':>6} {'+dict':>6} {'saved':>7} "
+          f"{'p50 us':>7} {'p95 us':>7} {'d p50 us':>9} {'train s':>8}")
+    for r in results:
+        dictionary = f"{r['dict_size'] // 1024} KB dict" if r['dict_size'] else "no dict"
+        label = f"{r['algorithm']} - {r['level_name']} [{dictionary}]"
+        print(f"    {label:<42} {r['compression_ratio']:>6.3f} {r['compression_ratio_with_dict']:>6.3f} "
+              f"{r['dict_gain']:>+7.1%} {r['median_compression_latency'] * 1e6:>7.0f} "
+              f"{r['p95_compression_latency'] * 1e6:>7.0f} {r['median_decompression_latency'] * 1e6:>9.0f} "
+              f"{r['training_time']:>8.2f}")
+    print()
+
+    classes = [key[len('ratio_'):] for key in results[0] if key.startswith('ratio_')]
+    print("=== Small Files by Record Size (ratio without / with the best dictionary) ===")
+    print(f"    {'level':<12} " + " ".join(f"{label:>17}" for label in classes))
+    for level_name in dict.fromkeys(r['level_name'] for r in results):
+        runs = [r for r in results if r['level_name'] == level_name]
+        baseline = next((r for r in runs if not r['dict_size']), None)
+        best = min((r for r in runs if r['dict_size']), key=lambda r: r['compressed_size'], default=None)
+        if baseline is None or best is None:
+            continue
+        columns = []
+        for label in classes:
+            without, with_dict = baseline[f'ratio_{label}'], best[f'ratio_{label}']
+            columns.append(f"{'-':>17}" if without is None else f"{without:>8.3f} /{with_dict:>7.3f}")
+        print(f"    {level_name:<12} " + " ".join(columns))
+    failed = [r for r in results if not r['sha256_valid']]
+    if failed:
+        print(f"    Verification failed for {len(failed)} configurations")
+    print()
+
+
+def analyze_seekable(results):
+    """Report ratio cost and tail/range read latency per frame size (seekable.py)"""
+    print("=== Seekable Compression (independent frames + index vs whole stream) ===")
+    print(f"    {'configuration':<40} {'ratio':>6} {'cost':>8} {'tail ms':>8} {'range p50':>10} "
+          f"{'range p95':>10} {'amplif.':>8}")
+    for r in results:
+        frames = f"{r['frame_size'] // 1024} KB frames" if r['frame_size'] else "whole stream"
+        label = f"{r['algorithm']} - {r['level_name']} [{frames}]"
+        print(f"    {label:<40} {r['compression_ratio']:>6.3f} {r['ratio_cost']:>+8.2%} "
+              f"{r['tail_read_latency'] * 1000:>8.1f} {r['median_range_latency'] * 1000:>8.1f}ms "
+              f"{r['p95_range_latency'] * 1000:>8.1f}ms {r['read_amplification']:>7.1f}x")
+    failed = [r for r in results if not r['sha256_valid']]
+    if failed:
+        print(f"    Verification failed for {len(failed)} configurations")
+    print()
+
+
+def analyze_concurrent_readers(results):
+    """Report aggregate throughput and tail latency per reader count and the ranking under load (concurrent_readers.py)"""
+    reader_counts = sorted({r['readers'] for r in results})
+    print("=== Concurrent Readers (aggregate MB/s / p99 latency ms) ===")
+    print(f"    {'configuration':<36} " + " ".join(f"{f'{m} readers':>16}" for m in reader_counts) + f" {'CPU':>5}")
+    configs = {}
+    for r in results:
+        configs.setdefault(f"{r['algorithm']} - {r['level_name']}", {})[r['readers']] = r
+    for label, by_readers in configs.items():
+        columns = []
+        for m in reader_counts:
+            r = by_readers.get(m)
+            columns.append(f"{'-':>16}" if r is None else
+                           f"{r['aggregate_throughput'] / 1024 / 1024:>8.1f} /{r['p99_latency'] * 1000:>6.0f}")
+        busiest = by_readers[max(by_readers)]
+        print(f"    {label:<36} " + " ".join(columns) + f" {busiest['cpu_saturation']:>5.0%}")
+    print()
+
+    # Codecs that are cheap to decompress can overtake others once the host is saturated
+    fewest, most = reader_counts[0], reader_counts[-1]
+    if fewest != most:
+        print(f"=== Ranking by Aggregate Throughput: {fewest} vs {most} readers ===")
+        ranked = {m: sorted((r for r in results if r['readers'] == m), key=lambda r: -r['aggregate_throughput'])
+                  for m in (fewest, most)}
+        positions = {f"{r['algorithm']} - {r['level_name']}": i for i, r in enumerate(ranked[fewest], 1)}
+        for i, r in enumerate(ranked[most], 1):
+            label = f"{r['algorithm']} - {r['level_name']}"
+            before = positions.get(label)
+            moved = "" if before is None or before == i else f"  (#{before} with {fewest})"
+            print(f"    {i:>2}. {label:<36} {r['aggregate_throughput'] / 1024 / 1024:>8.1f} MB/s{moved}")
+        print()
+    failed = [r for r in results if not r['sha256_valid']]
+    if failed:
+        print(f"    Verification failed for {len(failed)} configurations")
+        print()
+
+
+def analyze_archive_tree(results):
+    """Report per-file vs tar-then-compress of a job archive and the ratio per file type (archive_tree.py)"""
+    print("=== Job Archive (per-file over a process pool vs tar | compress) ===")
+    print(f"    {'configuration':<40} {'ratio':>6} {'MB/s':>7} {'CPU-s':>7} {'size':>7} {'CPU/file':>9}")
+    for r in results:
+        label = f"{r['algorithm']} - {r['level_name']} [{r['strategy']}]"
+        overhead = (f"{r['size_overhead']:>+7.1%} {r['cpu_overhead_per_file'] * 1000:>+7.2f}ms"
+                    if r['strategy'] == 'per_file' else "")
+        print(f"    {label:<40} {r['compression_ratio']:>6.3f} {r['aggregate_throughput'] / 1024 / 1024:>7.1f} "
+              f"{r['cpu_seconds']:>7.2f} {overhead}".rstrip())
+    print()
+
+    per_file = [r for r in results if r['strategy'] == 'per_file']
+    types = [key[len('ratio_'):] for key in results[0] if key.startswith('ratio_')]
+    if per_file and types:
+        print("=== Job Archive Ratio by File Type (per-file compression) ===")
+        print(f"    {'configuration':<32} " + " ".join(f"{'.' + t:>8}" for t in types))
+        for r in per_file:
+            print(f"    {r['algorithm'] + ' - ' + r['level_name']:<32} "
+                  + " ".join(f"{r[f'ratio_{t}']:>8.3f}" for t in types))
+        print()
+    failed = [r for r in results if not r['sha256_valid']]
+    if failed:
+        print(f"    Verification failed for {len(failed)} configurations")
+        print()
+
+
+def analyze_search(results):
+    """Report query latency per codec for full scans and first-match searches (search_logs.py)"""
+    queries = list(dict.fromkeys(r['query'] for r in results))
+    configs = {}
+    for r in results:
+        label = r['algorithm'] if r['level_name'] is None else f"{r['algorithm']} - {r['level_name']}"
+        configs.setdefault(label, {})[(r['query'], r['search'])] = r
+
+    print("=== Search Over Compressed Logs (median ms: full scan / first match) ===")
+    print(f"    {'configuration':<32} " + " ".join(f"{query[:15]:>15}" for query in queries))
+    for label, searches in configs.items():
+        columns = []
+        for query in queries:
+            scan, first = searches.get((query, 'scan')), searches.get((query, 'first'))
+            columns.append(f"{'-':>15}" if scan is None or first is None else
+                           f"{scan['median_latency'] * 1000:>7.0f}/{first['median_latency'] * 1000:<7.0f}")
+        print((f"    {label:<32} " + " ".join(columns)).rstrip())
+    print()
+
+    # What a user grepping the archive waits for, on average over the queries
+    print("=== Search Ranking (mean of the per-query median latencies) ===")
+    ranked = []
+    for label, searches in configs.items():
+        scans = [r for (_, kind), r in searches.items() if kind == 'scan']
+        firsts = [r for (_, kind), r in searches.items() if kind == 'first']
+        ranked.append((label, statistics.mean(r['median_latency'] for r in scans),
+                       statistics.mean(r['median_latency'] for r in firsts),
+                       statistics.mean(r['scan_throughput'] for r in scans)))
+    for i, (label, scan, first, throughput) in enumerate(sorted(ranked, key=lambda x: x[1]), 1):
+        print(f"    {i:>2}. {label:<32} scan {scan * 1000:>8.1f} ms ({throughput / 1024 / 1024:>7.1f} MB/s), "
+              f"first match {first * 1000:>7.1f} ms")
+    failed = [r for r in results if not r['sha256_valid']]
+    if failed:
+        print(f"    {len(failed)} searches disagreed with the uncompressed search")
+    print()
+
+
+def analyze_upload_pipeline(results):
+    """Rank codecs by compress-and-upload wall time on each emulated link (upload_pipeline.py)"""
+    links = {}
+    for r in results:
+        links.setdefault(r['bandwidth_name'], []).append(r)
+
+    for bandwidth_name, link_results in links.items():
+        print(f"=== Compress and Upload at {bandwidth_name} ({link_results[0]['latency'] * 1000:g} ms RTT, "
+              f"seconds) ===")
+        print(f"    {'':>3} {'configuration':<32} {'ratio':>6} {'compress':>9} {'upload':>8} {'sequential':>11} "
+              f"{'pipelined':>10} {'saved':>6} {'MB/s':>7}")
+        for i, r in enumerate(sorted(link_results, key=lambda x: x['pipelined_time']), 1):
+            label = r['algorithm'] if r['level_name'] is None else f"{r['algorithm']} - {r['level_name']}"
+            flags = (" (harness-limited)" if r['link_utilization'] < 0.9 else "") + \
+                ("" if r['sha256_valid'] else " (verification failed)")
+            print(f"    {i:>2}. {label:<32} {r['compression_ratio']:>6.3f} {r['compression_time']:>9.2f} "
+                  f"{r['upload_time']:>8.2f} {r['sequential_time']:>11.2f} {r['pipelined_time']:>10.2f} "
+                  f"{r['overlap_saving']:>6.0%} {r['end_to_end_throughput'] / 1024 / 1024:>7.1f}{flags}")
+        print()
+
+    print("=== End-to-End Winner per Link (pipelined) ===")
+    for bandwidth_name, link_results in links.items():
+        best = min(link_results, key=lambda x: x['pipelined_time'])
+        label = best['algorithm'] if best['level_name'] is None else f"{best['algorithm']} - {best['level_name']}"
+        print(f"    {bandwidth_name:>8}: {label} ({best['pipelined_time']:.2f}s, "
+              f"{best['end_to_end_throughput'] / 1024 / 1024:.1f} MB/s of log)")
+    print()
+
+
+def analyze_variability(results):
+    """Print per-configuration sample statistics (median, p95, stddev, bootstrap CI)"""
+    measured = [r for r in results if 'median_compression_time' in r]
+    if not measured:
+        return
+
+    print("=== Sample Statistics (compression time, seconds) ===")
+    print(f"    {'configuration':<32} {'n':>3} {'median':>8} {'p95':>8} {'stddev':>8} {'95% CI of mean':>19}")
+    for result in measured:
+        print(f"    {config_label(result):<32} {result['iterations']:>3} "
+              f"{result['median_compression_time']:>8.3f} {result['p95_compression_time']:>8.3f} "
+              f"{result['stddev_compression_time']:>8.3f} "
+              f"{result['compression_time_ci_low']:>9.3f}-{result['compression_time_ci_high']:<9.3f}")
+    print()
+
+
+def find_knee(curve):
+    """Return the fewest threads whose speedup reaches KNEE_FRACTION of the best speedup"""
+    best = max(speedup for _, speedup in curve)
+    return min(threads for threads, speedup in curve if speedup >= KNEE_FRACTION * best)
+
+
+def analyze_thread_scaling(results):
+    """Print speedup/efficiency curves and the knee point of each thread-swept codec and level"""
+    swept = [r for r in results if 'compression_speedup' in r]
+    if not swept:
+        return
+
+    print("=== Thread Scaling (speedup vs 1 thread, efficiency = speedup / threads) ===")
+    configs = {}
+    for result in swept:
+        configs.setdefault(config_label({**result, 'threads': None}), []).append(result)
+
+    for label, curve in configs.items():
+        curve.sort(key=lambda x: x['threads'])
+        print(f" {label}:")
+        print(f"    {'threads':>7} {'comp speedup':>12} {'comp eff':>8} {'decomp speedup':>14} {'decomp eff':>10}")
+        for result in curve:
+            print(f"    {result['threads']:>7} "
+                  f"{result['compression_speedup']:>12.2f} {result['compression_scaling_efficiency']:>8.0%} "
+                  f"{result['decompression_speedup']:>14.2f} {result['decompression_scaling_efficiency']:>10.0%}")
+        compression_knee = find_knee([(r['threads'], r['compression_speedup']) for r in curve])
+        decompression_knee = find_knee([(r['threads'], r['decompression_speedup']) for r in curve])
+        print(f"    Knee point: compression {compression_knee} threads, decompression {decompression_knee} threads")
+        print()
+
+
+def compression_gain(result):
+    """Original size / compressed size (bigger = better compression)"""
+    return result['original_size'] / result['avg_compressed_size']
+
+
+def compression_throughput(result):
+    """Compression throughput in MB/s of input"""
+    return result['original_size'] / 1024 / 1024 / result['avg_compression_time']
+
+
+def dominates(a, b, tolerance=0.0):
+    """True if a is at least as good as b on ratio and throughput (by a margin of tolerance) and better on one"""
+    gain_a, gain_b = compression_gain(a), compression_gain(b) * (1 + tolerance)
+    speed_a, speed_b = compression_throughput(a), compression_throughput(b) * (1 + tolerance)
+    return gain_a >= gain_b and speed_a >= speed_b and (gain_a > gain_b or speed_a > speed_b)
+
+
+def pareto_frontier(results, tolerance=0.0):
+    """
+    Ratio-vs-compression-throughput Pareto frontier, fastest first
+
+    With a tolerance, configurations only dominated by less than that margin
+    on both axes are kept too (used to pick where to spend more iterations).
+    Results that failed SHA256 verification are never on the frontier.
+    """
+    valid = [r for r in results if r['all_sha256_valid']]
+    frontier = [r for r in valid if not any(dominates(other, r, tolerance) for other in valid)]
+    return sorted(frontier, key=compression_throughput, reverse=True)
+
+
+def analyze_pareto(results):
+    """Print the Pareto frontier and the configurations that dominate the production setting"""
+    frontier = pareto_frontier(results)
+    if not frontier:
+        return
+
+    print("=== Ratio vs Compression Throughput Pareto Frontier ===")
+    for result in frontier:
+        print(f"    {compression_throughput(result):>8.1f} MB/s  ratio {result['avg_compression_ratio']:.3f} "
+              f"({config_label(result)})")
+    print()
+
+    production = [r for r in results if r['algorithm'] == PRODUCTION_ALGORITHM
+                  and r['level_value'] == PRODUCTION_LEVEL and r.get('backend', 'cli') == 'cli']
+    if not production:
+        print(f" No {PRODUCTION_ALGORITHM} -{PRODUCTION_LEVEL} result to compare against")
+        print()
+        return
+
+    baseline = production[0]
+    better = sorted((r for r in results if r['all_sha256_valid'] and dominates(r, baseline)),
+                    key=compression_throughput, reverse=True)
+    print(f" Configurations dominating {PRODUCTION_ALGORITHM} -{PRODUCTION_LEVEL} "
+          f"({compression_throughput(baseline):.1f} MB/s, ratio {baseline['avg_compression_ratio']:.3f}):")
+    if not better:
+        print("    None")
+    for result in better:
+        print(f"    {compression_throughput(result):>8.1f} MB/s "
+              f"({compression_throughput(result) / compression_throughput(baseline) - 1:+.0%})  "
+              f"ratio {result['avg_compression_ratio']:.3f} "
+              f"({result['avg_compression_ratio'] / baseline['avg_compression_ratio'] - 1:+.0%} size)  "
+              f"({config_label(result)})")
+    print()
+
+
+def load_workload(workload_file=None) -> dict:
+    """
+    Load a workload profile, falling back to DEFAULT_WORKLOAD
+
+    A workload JSON file only needs the keys it overrides; 'weights' is
+    merged the same way so a single resource can be re-priced. Sizes may be
+    given as strings such as 500GB.
+    """
+    workload = json.loads(json.dumps(DEFAULT_WORKLOAD))
+    if workload_file:
+        with open(workload_file, 'r') as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - set(DEFAULT_WORKLOAD) | set(overrides.get('weights', {})) - set(DEFAULT_WORKLOAD['weights'])
+        if unknown:
+            raise ValueError(f"unknown workload keys in {workload_file}: {', '.join(sorted(unknown))}")
+        workload['weights'].update(overrides.pop('weights', {}))
+        workload.update(overrides)
+    for key in ('daily_volume', 'storage_budget'):
+        if isinstance(workload[key], str):
+            workload[key] = corpus_generator.parse_size(workload[key])
+    return workload
+
+
+def cpu_seconds_per_gb(result, phase):
+    """
+    CPU-seconds per GB of input of one phase, and whether it was measured
+
+    Behind a transform the codec's rusage leaves out the transform stage, so
+    its CPU time (its wall time in older results; it runs on one core) is
+    added. Results without rusage data fall back to wall time, which already
+    includes the transform and undercounts multi-threaded codecs.
+    """
+    size_gb = result['original_size'] / 1024 ** 3
+    if f'{phase}_cpu_seconds_per_gb' not in result:
+        return result[f'avg_{phase}_time'] / size_gb, False
+    cpu = result[f'{phase}_cpu_seconds_per_gb']
+    if result.get('transform'):
+        direction = 'encode' if phase == 'compression' else 'decode'
+        cpu += result.get(f'transform_{direction}_cpu_time', result[f'transform_{direction}_time']) / size_gb
+    return cpu, True
+
+
+def project_daily_cost(result, workload):
+    """
+    Project a configuration's daily CPU-hours, storage and cost under a workload
+
+    Everything scales from the configuration's own per-GB measurements, so a
+    projection does not change when other configurations are added to or
+    removed from the run.
+    """
+    volume_gb = workload['daily_volume'] / 1024 ** 3
+    weights = workload['weights']
+    compression_cpu, compression_measured = cpu_seconds_per_gb(result, 'compression')
+    decompression_cpu, decompression_measured = cpu_seconds_per_gb(result, 'decompression')
+    compression_cpu_hours = volume_gb * compression_cpu / 3600
+    decompression_cpu_hours = volume_gb * workload['read_ratio'] * decompression_cpu / 3600
+    stored_gb = volume_gb * result['avg_compression_ratio']
+    retained_gb = stored_gb * workload['retention_days']
+    cores = (compression_cpu_hours + decompression_cpu_hours) / 24
+    cost = (compression_cpu_hours * weights['compression_cpu_hour'] +
+            decompression_cpu_hours * weights['decompression_cpu_hour'] +
+            retained_gb * weights['storage_gb_day'])
+    return {
+        'compression_cpu_hours': compression_cpu_hours,
+        'decompression_cpu_hours': decompression_cpu_hours,
+        'cpu_measured': compression_measured and decompression_measured,
+        'cores': cores,
+        'stored_gb': stored_gb,
+        'retained_gb': retained_gb,
+        'daily_cost': cost,
+        'fits_cores': cores <= workload['core_budget'],
+        'fits_storage': retained_gb * 1024 ** 3 <= workload['storage_budget'],
+    }
+
+
+def analyze_daily_cost(results, workload):
+    """Print every configuration's projected daily CPU-hours, storage and cost, cheapest first"""
+    valid = [r for r in results if r['all_sha256_valid']]
+    if not valid:
+        return
+    projections = sorted(((project_daily_cost(r, workload), r) for r in valid), key=lambda p: p[0]['daily_cost'])
+
+    print(f"=== Projected Daily Resource Cost ({workload['daily_volume'] / 1024 ** 3:.0f} GB/day written, "
+          f"{workload['read_ratio']:.0%} read back, {workload['retention_days']} days retention) ===")
+    print(f" Budget: {workload['core_budget']} cores, {workload['storage_budget'] / 1024 ** 4:.1f} TB stored; "
+          f"weights: " + ", ".join(f"{name} {weight:g}" for name, weight in workload['weights'].items()))
+    print(f"    {'configuration':<32} {'comp CPU-h':>10} {'decomp CPU-h':>12} {'cores':>6} "
+          f"{'GB/day':>8} {'stored TB':>9} {'cost/day':>9}  fits budget")
+    for projection, result in projections:
+        misses = [name for name, fits in (('cores', projection['fits_cores']),
+                                          ('storage', projection['fits_storage'])) if not fits]
+        print(f"    {config_label(result):<32} "
+              f"{projection['compression_cpu_hours']:>10.2f} "
+              f"{projection['decompression_cpu_hours']:>12.2f} "
+              f"{projection['cores']:>6.2f} "
+              f"{projection['stored_gb']:>8.1f} "
+              f"{projection['retained_gb'] / 1024:>9.2f} "
+              f"{projection['daily_cost']:>9.2f}  "
+              + (f"no ({', '.join(misses)})" if misses else "yes")
+              + ("" if projection['cpu_measured'] else "  (wall time, no rusage)"))
+    print()
+
+    fitting = [(projection, result) for projection, result in projections
+               if projection['fits_cores'] and projection['fits_storage']]
+    production = next(((p, r) for p, r in projections if r['algorithm'] == PRODUCTION_ALGORITHM
+                       and r['level_value'] == PRODUCTION_LEVEL and r.get('backend', 'cli') == 'cli'), None)
+    print(" Cheapest configurations within budget:")
+    if not fitting:
+        print("    None")
+    for i, (projection, result) in enumerate(fitting[:3], 1):
+        saving = ""
+        if production and result is not production[1]:
+            saving = f", {projection['daily_cost'] - production[0]['daily_cost']:+.2f}/day vs " \
+                     f"{PRODUCTION_ALGORITHM} -{PRODUCTION_LEVEL}"
+        print(f"    {i}. {projection['daily_cost']:.2f}/day{saving} ({config_label(result)})")
+    print()
+
+
+def comparison_key(result):
+    """What identifies a configuration across runs: codec, level and parameters, not tool versions or hosts"""
+    return (result['algorithm'], result.get('backend', 'cli'), result['level_name'], result.get('level_value'),
+            result.get('variant'), result.get('threads'), result.get('cache_state', 'cold'),
+            result.get('memory_limit'), result.get('transform'), result.get('host_class'))
+
+
+def metric_samples(result, metric):
+    """Per-iteration values of a metric; the average stands in for exports without samples"""
+    samples = [d[metric] for d in result.get('samples') or [] if d.get(metric) is not None]
+    return samples or [result[f'avg_{metric}']]
+
+
+def compare_results(baseline, candidate, threshold=REGRESSION_THRESHOLD, alpha=REGRESSION_ALPHA, tracked=None):
+    """
+    Print a regression/improvement table of candidate against baseline and return the tracked failures
+
+    Configurations are matched by comparison_key. For every metric the medians
+    are compared and the per-iteration samples go through a permutation test;
+    a change beyond threshold with p < alpha is a regression or improvement.
+    Cliff's delta is the effect size (+1: every candidate sample is worse).
+    A change beyond threshold is untested when there are too few samples for
+    the test to ever reach alpha; on a tracked configuration it is returned
+    with the regressions, so the gate fails instead of passing blind.
+    tracked restricts the returned regressions to those algorithms.
+    """
+    baseline_configs = {comparison_key(r): r for r in baseline}
+    candidate_configs = {comparison_key(r): r for r in candidate}
+    baseline_corpora = {r['corpus_hash'] for r in baseline if r.get('corpus_hash')}
+    candidate_corpora = {r['corpus_hash'] for r in candidate if r.get('corpus_hash')}
+    if baseline_corpora and candidate_corpora and baseline_corpora != candidate_corpora:
+        print("Warning: the baseline and candidate were measured on different corpora")
+
+    print(f"=== Baseline Comparison (change of the median; regression/improvement beyond "
+          f"{threshold:.0%} at p < {alpha}) ===")
+    print(f"    {'configuration':<40} {'metric':<18} {'baseline':>10} {'candidate':>10} {'change':>8} "
+          f"{'p':>6} {'delta':>6}  verdict")
+    regressions = []
+    untested = []
+    for key, new in candidate_configs.items():
+        old = baseline_configs.get(key)
+        if old is None:
+            continue
+        label = config_label(new)
+        is_tracked = not tracked or new['algorithm'] in tracked
+        if old.get('budget_exceeded') or new.get('budget_exceeded'):
+            if new.get('budget_exceeded') and not old.get('budget_exceeded'):
+                print(f"    {label:<40} {'-':<18} {'-':>10} {'-':>10} {'-':>8} {'-':>6} {'-':>6}  "
+                      f"regression ({new['status']})")
+                if is_tracked:
+                    regressions.append((label, 'budget'))
+            continue
+        for metric in COMPARED_METRICS:
+            old_samples, new_samples = metric_samples(old, metric), metric_samples(new, metric)
+            old_median, new_median = statistics.median(old_samples), statistics.median(new_samples)
+            change = new_median / old_median - 1 if old_median else 0.0
+            p_value = sample_stats.permutation_test(old_samples, new_samples)
+            delta = sample_stats.cliffs_delta(old_samples, new_samples)
+            if abs(change) <= threshold:
+                verdict = ''
+            elif p_value is not None and p_value < alpha:
+                verdict = None  # Significant: regression or improvement below
+            elif p_value is None or sample_stats.smallest_p_value(len(old_samples), len(new_samples)) >= alpha:
+                # Too few samples for any difference to reach alpha: not a pass
+                verdict = 'untested' if is_tracked else 'untested (untracked)'
+                if is_tracked:
+                    untested.append((label, metric))
+            else:
+                verdict = ''
+            if verdict is not None:
+                pass
+            elif change > 0:
+                verdict = 'regression' if is_tracked else 'regression (untracked)'
+                if is_tracked:
+                    regressions.append((label, metric))
+            else:
+                verdict = 'improvement'
+            if metric == 'compressed_size':
+                values = f"{old_median / 1024 / 1024:>9.2f}M {new_median / 1024 / 1024:>9.2f}M"
+            else:
+                values = f"{old_median:>9.3f}s {new_median:>9.3f}s"
+            p_text = '-' if p_value is None else f"{p_value:.3f}"
+            print(f"    {label:<40} {metric:<18} {values} {change:>+8.1%} {p_text:>6} {delta:>+6.2f}  {verdict}".rstrip())
+
+    for name, only in (('baseline', baseline_configs.keys() - candidate_configs.keys()),
+                       ('candidate', candidate_configs.keys() - baseline_configs.keys())):
+        configs = baseline_configs if name == 'baseline' else candidate_configs
+        for key in only:
+            print(f"    Only in the {name}: {config_label(configs[key])}")
+    print()
+    if untested:
+        print(f"{len(untested)} changes in tracked configurations could not be tested: too few samples for p < {alpha} "
+              f"(use more --iterations); the gate fails on them rather than passing untested")
+    if regressions:
+        print(f"{len(regressions)} regressions in tracked configurations")
+    else:
+        print("No regressions in tracked configurations")
+    return regressions + untested
+
+
+# Standalone benchmarks whose JSON files get their own report
+SPECIAL_REPORTS = {
+    'streaming': analyze_streaming,
+    'small_files': analyze_small_files,
+    'seekable': analyze_seekable,
+    'concurrent_readers': analyze_concurrent_readers,
+    'archive_tree': analyze_archive_tree,
+    'search': analyze_search,
+    'upload_pipeline': analyze_upload_pipeline,
+}
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Analyze compression benchmark results'
     )
     parser.add_argument('results_file',
-                        help='Path to the JSON results file (e.g., results_1754595284.json)')
+                        help='Path to the JSON results file (e.g., results_1754595284.json, streaming_/small_files_/seekable_/concurrent_/archive_/search_/upload_1754595284.json) or a result store (results.db)')
+    parser.add_argument('--corpus-hash',
+                        help='Result store only: analyze the configurations measured on this corpus (SHA256 prefix)')
+    parser.add_argument('--baseline',
+                        help='Compare results_file (the candidate) against this baseline results file or store and '
+                             'exit with status 1 if a tracked configuration regressed')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help=f'--baseline: relative median change that counts (default: {REGRESSION_THRESHOLD})')
+    parser.add_argument('--alpha', type=float, default=REGRESSION_ALPHA,
+                        help=f'--baseline: significance level of the permutation test (default: {REGRESSION_ALPHA})')
+    parser.add_argument('--workload',
+                        help='JSON file overriding DEFAULT_WORKLOAD (daily_volume, read_ratio, retention_days, '
+                             'core_budget, storage_budget, weights) for the daily cost projection')
+    parser.add_argument('--track',
+                        help='--baseline: comma-separated algorithms whose regressions fail the run (default: all)')
 
     args = parser.parse_args()
+    workload = load_workload(args.workload)
 
     # Validate file exists
     if not Path(args.results_file).exists():
         print(f"Error: File {args.results_file} does not exist")
         sys.exit(1)
 
+    if args.baseline:
+        if not Path(args.baseline).exists():
+            print(f"Error: File {args.baseline} does not exist")
+            sys.exit(1)
+        print(f"Comparing {args.results_file} against the baseline {args.baseline}")
+        regressions = compare_results(
+            load_results(args.baseline, args.corpus_hash), load_results(args.results_file, args.corpus_hash),
+            args.threshold, args.alpha, args.track.split(',') if args.track else None
+        )
+        sys.exit(1 if regressions else 0)
+
     print("Running benchmark analysis...")
-    results = analyze_results(args.results_file)
+    if Path(args.results_file).suffix == '.json':
+        results = load_results(args.results_file)
+        for mode, report in SPECIAL_REPORTS.items():
+            if results and all(r.get('mode') == mode for r in results):
+                report(results)
+                print("Analysis complete!")
+                return
+
+    results = analyze_results(args.results_file, args.corpus_hash)
 
     # Add more analysis functions here
+    analyze_variability(results)
+    analyze_resource_usage(results)
+    analyze_throughput(results)
+    analyze_backends(results)
+    analyze_transform(results)
+    analyze_cache_states(results)
+    analyze_host_classes(results)
+    analyze_memory(results)
+    analyze_thread_scaling(results)
+    analyze_pareto(results)
+    analyze_daily_cost(results, workload)
     print("Analysis complete!")
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
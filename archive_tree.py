@@ -0,0 +1,333 @@
+"""
+Job Archive Benchmark
+
+We compress whole teuthology job directories, not one teuthology.log, so this
+benchmark works on a directory tree shaped like a job archive: the big
+teuthology.log next to per-daemon logs, YAML configs and JSON dumps. Each
+codec and level is run two ways:
+
+- per_file: every file compressed on its own (as `find -exec gzip` does),
+  spread over a process pool
+- tar: `tar -cf - . | compress`, one stream for the whole tree
+
+and the benchmark reports aggregate throughput, the ratio of each file type,
+and the cost of per-file compression relative to tar: extra compressed bytes
+and extra CPU per file.
+
+Point --archive-dir at a real archive; without it a synthetic job tree is
+built from the corpus (see build_job_tree).
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import corpus_generator
+import run_benchmark
+
+ARCHIVE_LEVELS = ('mid',)  # Named levels to run; whole trees at every level take long
+SYNTHETIC_SIZE = '64MB'  # teuthology.log size of the synthetic job tree
+SYNTHETIC_JSON_FILES = 200  # JSON dumps written as files of their own in the synthetic tree
+TAR_ARGV = ['tar', '--sort=name', '-cf', '-']  # Sorted so the stream (and its checksum) is reproducible
+
+DAEMON_LINE = re.compile(rb'^\S+ INFO:tasks\.ceph\.(\S+?)\.(smithi\d+)\.stderr:(.*\n)')
+JSON_LINE = re.compile(rb'^\S+ INFO:teuthology\.orchestra\.run\.(smithi\d+)\.stdout:(\{.*)\n')
+
+
+def build_job_tree(data: bytes, root: str) -> None:
+    """
+    Lay out a synthetic job archive from corpus bytes
+
+    teuthology.log gets the whole corpus, as the real one interleaves every
+    daemon's stderr; each daemon's lines also go to
+    remote/<host>/log/ceph-<daemon>.log, the first SYNTHETIC_JSON_FILES JSON
+    dumps to remote/<host>/json/ and the job metadata to small YAML files.
+    """
+    with open(os.path.join(root, 'teuthology.log'), 'wb') as f:
+        f.write(data)
+
+    daemon_logs = {}
+    json_files = 0
+    for line in data.splitlines(keepends=True):
+        match = DAEMON_LINE.match(line)
+        if match:
+            daemon, host, message = match.groups()
+            daemon_logs.setdefault((host.decode(), daemon.decode()), []).append(message)
+            continue
+        match = JSON_LINE.match(line)
+        if match and json_files < SYNTHETIC_JSON_FILES:
+            host, dump = match.groups()
+            os.makedirs(os.path.join(root, 'remote', host.decode(), 'json'), exist_ok=True)
+            with open(os.path.join(root, 'remote', host.decode(), 'json', f"osd_dump.{json_files}.json"), 'wb') as f:
+                f.write(dump + b'\n')
+            json_files += 1
+    for (host, daemon), lines in daemon_logs.items():
+        os.makedirs(os.path.join(root, 'remote', host, 'log'), exist_ok=True)
+        with open(os.path.join(root, 'remote', host, 'log', f"ceph-{daemon}.log"), 'wb') as f:
+            f.writelines(lines)
+
+    hosts = sorted({host for host, _ in daemon_logs})
+    metadata = {
+        'config.yaml': ["branch: main", "suite: rados", "roles:"] + [f"- [osd, client]  # {host}" for host in hosts],
+        'info.yaml': ["job_id: '1234'", "owner: scheduled_teuthology@teuthology", "status: pass", "targets:"]
+                     + [f"  {host}.front.sepia.ceph.com: ssh-ed25519 AAAAC3NzaC1lZDI1NTE5" for host in hosts],
+        'summary.yaml': ["description: rados/thrash", "duration: 3725.4", "success: true"],
+        'pid': ["4242"],
+    }
+    for name, lines in metadata.items():
+        with open(os.path.join(root, name), 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def list_files(root: str) -> list:
+    """Relative paths of the regular files under root, sorted"""
+    files = []
+    for directory, dirs, names in os.walk(root):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and not os.path.islink(path):
+                files.append(os.path.relpath(path, root))
+    return files
+
+
+def file_type(path: str) -> str:
+    """Type a file is reported under: its extension, ignoring rotation suffixes like .1"""
+    name = os.path.basename(path)
+    parts = [part for part in name.split('.')[1:] if not part.isdigit()]
+    return parts[-1].lower() if parts else 'none'
+
+
+def sha256_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _compress_file(argv: list, source: str, destination: str) -> int:
+    """Compress one file with a CLI codec; returns the compressed size"""
+    with open(source, 'rb') as stdin, open(destination, 'wb') as stdout:
+        subprocess.run(argv, stdin=stdin, stdout=stdout, stderr=subprocess.DEVNULL, check=True)
+    return os.path.getsize(destination)
+
+
+def _verify_file(argv: list, compressed: str, digest: str) -> bool:
+    """Decompress one file and compare it with the original's checksum"""
+    with open(compressed, 'rb') as stdin:
+        process = subprocess.run(argv, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    return process.returncode == 0 and hashlib.sha256(process.stdout).hexdigest() == digest
+
+
+def _child_cpu(before, after) -> float:
+    return (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+
+def run_per_file(root: str, files: list, digests: dict, config: dict, level_value, workers: int,
+                 out_dir: str) -> dict:
+    """Compress every file on its own over a process pool, then decompress and verify each"""
+    compress_argv = run_benchmark.codec_argv(config['compress_cmd'].format(level=level_value))
+    decompress_argv = run_benchmark.codec_argv(config['decompress_cmd'].format(level=level_value))
+    outputs = [os.path.join(out_dir, path + config['extension']) for path in files]
+    for output in outputs:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        sizes = list(executor.map(_compress_file, [compress_argv] * len(files),
+                                  [os.path.join(root, path) for path in files], outputs))
+    wall_time = time.perf_counter() - start_time
+    cpu_seconds = _child_cpu(usage_before, resource.getrusage(resource.RUSAGE_CHILDREN))
+
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        valid = list(executor.map(_verify_file, [decompress_argv] * len(files), outputs,
+                                  [digests[path] for path in files]))
+    decompression_time = time.perf_counter() - start_time
+    return {
+        'compressed_size': sum(sizes),
+        'compression_time': wall_time,
+        'cpu_seconds': cpu_seconds,
+        'decompression_time': decompression_time,
+        'sha256_valid': all(valid),
+        'file_sizes': dict(zip(files, sizes)),
+    }
+
+
+def run_tar(root: str, tar_digest: str, config: dict, level_value, out_dir: str) -> dict:
+    """Compress the tar stream of the whole tree, then decompress and verify it"""
+    compress_argv = run_benchmark.codec_argv(config['compress_cmd'].format(level=level_value))
+    decompress_argv = run_benchmark.codec_argv(config['decompress_cmd'].format(level=level_value))
+    output = os.path.join(out_dir, 'job.tar' + config['extension'])
+
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start_time = time.perf_counter()
+    with open(output, 'wb') as stdout:
+        tar = subprocess.Popen(TAR_ARGV + ['-C', root, '.'], stdout=subprocess.PIPE)
+        compressor = subprocess.Popen(compress_argv, stdin=tar.stdout, stdout=stdout, stderr=subprocess.DEVNULL)
+        tar.stdout.close()  # The compressor holds the only read end now
+        tar_rc, compress_rc = tar.wait(), compressor.wait()
+    wall_time = time.perf_counter() - start_time
+    cpu_seconds = _child_cpu(usage_before, resource.getrusage(resource.RUSAGE_CHILDREN))
+    if tar_rc != 0 or compress_rc != 0:
+        raise ValueError(f"tar | {' '.join(compress_argv)} failed ({tar_rc}, {compress_rc})")
+
+    start_time = time.perf_counter()
+    with open(output, 'rb') as stdin:
+        process = subprocess.run(decompress_argv, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    decompression_time = time.perf_counter() - start_time
+    return {
+        'compressed_size': os.path.getsize(output),
+        'compression_time': wall_time,
+        'cpu_seconds': cpu_seconds,
+        'decompression_time': decompression_time,
+        'sha256_valid': process.returncode == 0 and hashlib.sha256(process.stdout).hexdigest() == tar_digest,
+    }
+
+
+def run_archive(root: str, codecs: dict, workers: int, work_dir: str) -> list:
+    """Run every codec/level per file and as a tar stream over the tree at root"""
+    files = list_files(root)
+    if not files:
+        raise ValueError(f"No files under {root}")
+    sizes = {path: os.path.getsize(os.path.join(root, path)) for path in files}
+    digests = {path: sha256_file(os.path.join(root, path)) for path in files}
+    tar_digest = hashlib.sha256(subprocess.run(TAR_ARGV + ['-C', root, '.'], stdout=subprocess.PIPE,
+                                               check=True).stdout).hexdigest()
+    input_size = sum(sizes.values())
+    types = sorted({file_type(path) for path in files})
+    print(f"{len(files)} files, {input_size / 1024 / 1024:.1f} MB: "
+          + ", ".join(f"{sum(1 for p in files if file_type(p) == t)} .{t}" for t in types))
+
+    results = []
+    for algorithm, config in codecs.items():
+        for level_name in ARCHIVE_LEVELS:
+            level_value = config['levels'][level_name]
+            out_dir = os.path.join(work_dir, f"{algorithm}-{level_name}")
+            print(f"Compressing {algorithm} level {level_name} ({level_value}) per file ({workers} workers)...")
+            per_file = run_per_file(root, files, digests, config, level_value, workers, out_dir)
+            print(f"Compressing {algorithm} level {level_name} ({level_value}) as one tar stream...")
+            tar = run_tar(root, tar_digest, config, level_value, out_dir)
+            shutil.rmtree(out_dir)
+
+            file_sizes = per_file.pop('file_sizes')
+            by_type = {}
+            for t in types:
+                typed = [path for path in files if file_type(path) == t]
+                by_type[f'ratio_{t}'] = sum(file_sizes[p] for p in typed) / max(1, sum(sizes[p] for p in typed))
+            for strategy, measurement in (('per_file', per_file), ('tar', tar)):
+                result = {
+                    'mode': 'archive_tree',
+                    'algorithm': algorithm,
+                    'level_name': level_name,
+                    'level_value': level_value,
+                    'strategy': strategy,
+                    'workers': workers if strategy == 'per_file' else 1,
+                    'files': len(files),
+                    'input_size': input_size,
+                    **measurement,
+                    'compression_ratio': measurement['compressed_size'] / input_size,
+                    'aggregate_throughput': input_size / measurement['compression_time'],
+                    'decompression_throughput': input_size / measurement['decompression_time'],
+                    # Per-file compression's cost relative to one tar stream
+                    'size_overhead': measurement['compressed_size'] / tar['compressed_size'] - 1,
+                    'cpu_overhead_per_file': (measurement['cpu_seconds'] - tar['cpu_seconds']) / len(files),
+                    # Only per-file compression sees file types; the tar row keeps the columns for the CSV
+                    **{key: value if strategy == 'per_file' else None for key, value in by_type.items()},
+                }
+                print(f"  {strategy:<8} ratio {result['compression_ratio']:.3f}, "
+                      f"{result['aggregate_throughput'] / 1024 / 1024:.1f} MB/s, "
+                      f"{result['cpu_seconds']:.2f} CPU-s"
+                      + (f" ({result['size_overhead']:+.1%} size, "
+                         f"{result['cpu_overhead_per_file'] * 1000:+.2f} ms CPU per file vs tar)"
+                         if strategy == 'per_file' else ""))
+                if not result['sha256_valid']:
+                    print("  Verification failed")
+                results.append(result)
+    return results
+
+
+def main():
+    global ARCHIVE_LEVELS
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark per-file vs tar-then-compress compression of a job archive directory'
+    )
+    parser.add_argument('--archive-dir',
+                        help='Job archive directory to compress (default: a synthetic tree built from the corpus)')
+    parser.add_argument('--synthetic-size', type=corpus_generator.parse_size, default=SYNTHETIC_SIZE,
+                        help=f'teuthology.log size of the synthetic tree (default: {SYNTHETIC_SIZE})')
+    parser.add_argument('--workers', type=int, default=len(os.sched_getaffinity(0)),
+                        help='Process pool size for per-file compression (default: available CPUs)')
+    parser.add_argument('--levels', default=','.join(ARCHIVE_LEVELS),
+                        help=f"Comma-separated level names (default: {','.join(ARCHIVE_LEVELS)})")
+    parser.add_argument('--codecs',
+                        help='Comma-separated subset of the registry codecs (default: every installed one)')
+    parser.add_argument('--work-dir',
+                        help='Directory for the synthetic tree and compressed output (default: a temporary directory)')
+    parser.add_argument('--seed', type=int, default=run_benchmark.CORPUS_SEED,
+                        help='Seed for the generated corpus')
+    parser.add_argument('--corpus-profile',
+                        help='JSON file overriding the corpus content profile (see corpus_generator.py)')
+    args = parser.parse_args()
+
+    ARCHIVE_LEVELS = tuple(args.levels.split(','))
+    codecs = {**run_benchmark.ALGORITHMS_SINGLE_THREADS, **run_benchmark.ALGORITHMS_MULTI_THREADS}
+    if args.codecs:
+        codecs = {name: config for name, config in codecs.items() if name in args.codecs.split(',')}
+    for name, config in list(codecs.items()):
+        if shutil.which(config['compress_cmd'].split()[0]) is None:
+            print(f"Skipping {name}: {config['compress_cmd'].split()[0]} is not installed")
+            del codecs[name]
+    if not codecs:
+        print("Error: none of the selected codecs is installed")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory(prefix='compbench-archive-', dir=args.work_dir) as work_dir:
+        root = args.archive_dir
+        if root is None:
+            input_file = run_benchmark.create_test_file(args.synthetic_size, args.seed, args.corpus_profile)
+            with open(input_file, 'rb') as f:
+                data = f.read(args.synthetic_size)
+            root = os.path.join(work_dir, 'job')
+            os.mkdir(root)
+            build_job_tree(data, root)
+            print(f"Built a synthetic job archive from {input_file} in {root}")
+        results = run_archive(root, codecs, args.workers, work_dir)
+
+    timestamp = int(time.time())
+    json_file = f"archive_{timestamp}.json"
+    with open(json_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    csv_file = f"archive_{timestamp}.csv"
+    if results:
+        with open(csv_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    print("Results saved:")
+    print(f"JSON: {json_file}")
+    print(f"CSV: {csv_file}")
+    print(f"Total tests: {len(results)}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
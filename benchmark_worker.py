@@ -0,0 +1,120 @@
+"""
+Benchmark Worker Agent
+
+Runs iterations for a `run_benchmark.py --coordinator` (see distributed.py):
+fetches the corpus parameters, generates (or reuses) the same corpus and
+checks its digest, registers with this host's environment fingerprint, then
+pulls tasks, runs each with run_benchmark.run_iteration and posts the
+iteration's data back until the coordinator has nothing left.
+
+    python benchmark_worker.py --coordinator archive-bench-01:8642
+    python benchmark_worker.py --coordinator localhost:8642 --cpu 2 --host-class local-test
+
+Several workers on one host share its cores and disk, so their timings
+interfere; pin them with --cpu when testing locally.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import corpus_generator
+import distributed
+import result_store
+import run_benchmark
+
+
+def fingerprint(tools: list, name: str = None, cpu: int = None) -> dict:
+    """
+    This worker's environment: CPU model, cpuset, host, cores and codec tool versions (None if missing)
+
+    A worker pinned to one core with cpu has that core as its cpuset.
+    """
+    environment = result_store.environment()
+    if cpu is None:
+        environment['cores'] = len(os.sched_getaffinity(0))
+    else:
+        environment['cpuset'] = str(cpu)
+        environment['cores'] = 1
+    environment['tool_versions'] = {
+        tool: result_store.tool_version(tool) if shutil.which(tool) else None for tool in tools
+    }
+    environment['host_class'] = name or distributed.host_class(environment)
+    return environment
+
+
+def prepare_corpus(corpus: dict) -> Path:
+    """The coordinator's corpus on this host: teuthology.log if present, otherwise the generated one"""
+    if os.path.exists("teuthology.log"):
+        input_file = Path("teuthology.log")
+    else:
+        input_file = corpus_generator.get_corpus(corpus['size'], corpus['seed'], corpus['profile'])
+    if run_benchmark.get_input_digest(str(input_file)) != corpus['digest']:
+        raise ValueError(f"{input_file} differs from the coordinator's corpus (SHA256 {corpus['digest'][:16]})")
+    return input_file
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run benchmark iterations for a run_benchmark.py --coordinator'
+    )
+    parser.add_argument('--coordinator', required=True,
+                        help=f'Coordinator address, HOST:PORT (default port {distributed.DEFAULT_PORT})')
+    parser.add_argument('--host-class',
+                        help='Name of the hardware class this host belongs to (default: CPU model and core count)')
+    parser.add_argument('--cpu', type=int,
+                        help='Pin every codec run to this core')
+    parser.add_argument('--work-dir',
+                        help='Directory for the compressed files (default: a temporary directory)')
+    args = parser.parse_args()
+    if args.cpu is not None and args.cpu not in os.sched_getaffinity(0):
+        raise ValueError(f"--cpu {args.cpu} is not in this host's cpuset "
+                         f"({','.join(map(str, sorted(os.sched_getaffinity(0))))})")
+
+    coordinator = distributed.parse_address(args.coordinator)
+    setup = distributed.post(coordinator, '/setup', {})
+    input_file = prepare_corpus(setup['corpus'])
+    environment = fingerprint(setup['tools'], args.host_class, args.cpu)
+    registration = distributed.post(coordinator, '/register', {'environment': environment})
+    worker_id = registration['worker_id']
+    print(f"Registered as {worker_id} ({registration['host_class']}), corpus {input_file}")
+
+    completed = failed = 0
+    with tempfile.TemporaryDirectory(prefix='compbench-worker-', dir=args.work_dir) as work_dir:
+        while True:
+            reply = distributed.post(coordinator, '/next', {'worker_id': worker_id})
+            if reply.get('done'):
+                break
+            if 'wait' in reply:
+                time.sleep(reply['wait'])
+                continue
+            job = reply['job']
+            run_benchmark.CACHE_MODE = job['cache_mode']
+            run_benchmark.MEMORY_LIMIT = job['memory_limit']
+            print(f"{job['algorithm']} - {job['level_name']} ({job['level_value']}) "
+                  f"iteration {job['iteration'] + 1}, {job['cache_mode']} cache:")
+            data = run_benchmark.run_iteration(
+                job['algorithm'], job['config'], job['level_name'], job['level_value'], job['iteration'],
+                input_file, setup['corpus']['digest'], work_dir, cpu=args.cpu
+            )
+            result = {'worker_id': worker_id, 'task_id': reply['task_id'], 'data': data}
+            if data is None:
+                failed += 1
+                result['error'] = f"iteration failed on {environment['host']} (see the worker's output)"
+            else:
+                data['host'] = environment['host']
+            distributed.post(coordinator, '/result', result)
+            completed += 1
+    print(f"Done: {completed} iterations" + (f", {failed} failed" if failed else ""))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except (ValueError, ConnectionError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
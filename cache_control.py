@@ -0,0 +1,114 @@
+"""
+Page Cache Control
+
+Puts benchmark files into a known page-cache state before each measured run,
+without forking helper tools: posix_fadvise(POSIX_FADV_DONTNEED) evicts a
+file, a sequential read pre-faults it, and mincore(2) on a read-only mapping
+verifies how much of it is resident. O_DIRECT reads bypass the cache entirely.
+"""
+
+import ctypes
+import ctypes.util
+import mmap
+import os
+
+CACHE_MODES = ('cold', 'warm', 'direct')  # Evicted, pre-faulted, or read with O_DIRECT
+DIRECT_IO_ALIGNMENT = 4096  # O_DIRECT buffers, offsets and lengths must be multiples of this
+WARM_CHUNK_SIZE = 1024 * 1024  # 1MB reads when pre-faulting a file
+
+_libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+_libc.mmap.restype = ctypes.c_void_p
+_libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_long]
+_libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+_libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.POINTER(ctypes.c_ubyte)]
+_MAP_FAILED = ctypes.c_void_p(-1).value
+
+
+def residency(path: str) -> tuple:
+    """
+    Return (resident pages, total pages) of a file according to mincore(2)
+
+    Python's mmap objects do not expose their address, so the file is mapped
+    through libc directly. Mapping it does not fault any page in.
+    """
+    size = os.path.getsize(path)
+    total_pages = (size + mmap.PAGESIZE - 1) // mmap.PAGESIZE
+    if size == 0:
+        return 0, 0
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        addr = _libc.mmap(None, size, mmap.PROT_READ, mmap.MAP_SHARED, fd, 0)
+        if addr == _MAP_FAILED:
+            err = ctypes.get_errno()
+            raise OSError(err, f"mmap failed: {os.strerror(err)}", path)
+        try:
+            vec = (ctypes.c_ubyte * total_pages)()
+            if _libc.mincore(addr, size, vec) != 0:
+                err = ctypes.get_errno()
+                raise OSError(err, f"mincore failed: {os.strerror(err)}", path)
+            return sum(page & 1 for page in vec), total_pages
+        finally:
+            _libc.munmap(addr, size)
+    finally:
+        os.close(fd)
+
+
+def resident_fraction(path: str) -> float:
+    """Fraction (0..1) of a file's pages in the page cache"""
+    resident, total = residency(path)
+    return resident / total if total else 0.0
+
+
+def evict(path: str) -> None:
+    """Drop a file's pages from the page cache"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        # DONTNEED skips dirty pages, e.g. a compressed file that was just written
+        os.fdatasync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def warm(path: str) -> None:
+    """Pre-fault a whole file into the page cache by reading it once"""
+    buffer = bytearray(WARM_CHUNK_SIZE)
+    with open(path, 'rb', buffering=0) as f:
+        while f.readinto(buffer):
+            pass
+
+
+def prepare(path: str, mode: str) -> float:
+    """
+    Put a file into the page-cache state of a CACHE_MODES mode
+
+    'warm' pre-faults it; 'cold' and 'direct' evict it (O_DIRECT reads skip
+    the cache, but the codec may still mmap or re-read the file). Returns
+    the resident fraction measured afterwards.
+    """
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown cache mode {mode!r} (choose from {', '.join(CACHE_MODES)})")
+    if mode == 'warm':
+        warm(path)
+    else:
+        evict(path)
+    return resident_fraction(path)
+
+
+def direct_chunks(path: str, chunk_size: int):
+    """
+    Yield a file's contents read with O_DIRECT, bypassing the page cache
+
+    chunk_size is rounded up to DIRECT_IO_ALIGNMENT and reads go into a
+    page-aligned anonymous mapping; each yielded chunk is a copy.
+    """
+    chunk_size = -(-chunk_size // DIRECT_IO_ALIGNMENT) * DIRECT_IO_ALIGNMENT
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECT)
+    buffer = mmap.mmap(-1, chunk_size)
+    try:
+        while n := os.readv(fd, [buffer]):
+            yield buffer[:n]
+    finally:
+        buffer.close()
+        os.close(fd)
@@ -10,11 +10,18 @@ for tool in zstd brotli gzip pigz xz pbzip2 lz4; do
     fi
 done
 
-echo "Checking vmtouch..."
-if command -v vmtouch &>/dev/null; then
-    echo "vmtouch is installed!"
+echo "Checking taskset..."
+if command -v taskset &>/dev/null; then
+    echo "taskset is installed!"
 else
-    echo "vmtouch is MISSING!!"
+    echo "taskset is MISSING!!"
+fi
+
+echo "Checking prlimit..."
+if command -v prlimit &>/dev/null; then
+    echo "prlimit is installed!"
+else
+    echo "prlimit is MISSING!!"
 fi
 
 echo "Checking sha256sum..."
@@ -2,7 +2,9 @@ import os
 from glob import glob
 
 # Delete results files
-results_files = glob("results_*.csv") + glob("results_*.json")
+results_files = []
+for prefix in ("results", "streaming", "small_files", "seekable", "concurrent", "archive", "search", "upload"):
+    results_files += glob(f"{prefix}_*.csv") + glob(f"{prefix}_*.json")
 for file in results_files:
     os.remove(file)
     print(f"Deleted: {file}")
@@ -0,0 +1,143 @@
+"""
+Codec Registry
+
+Loads the CLI codecs the benchmark runs from a JSON file (codecs.json next
+to this module, $COMPBENCH_CODECS, or --codecs) and expands them into jobs.
+
+Each codec declares its command templates, named levels, the level range
+covered by --level-sweep and, optionally, a parameter grid: every template
+placeholder besides {level} lists its values under "grid", and every
+combination becomes a configuration of its own, e.g.
+
+    "pigz_blocks": {
+        "threaded": true,
+        "compress_cmd": "pigz -c -{level} -b {block} {flags}",
+        "decompress_cmd": "pigz -dc",
+        "levels": {"mid": 6},
+        "grid": {"block": [128, 512, 2048], "flags": ["", "--rsyncable"]},
+        "extension": ".gz"
+    }
+
+A grid parameter named "threads" is also recorded as the job's worker count.
+"""
+
+import itertools
+import json
+import os
+import string
+
+CODEC_REGISTRY = os.environ.get(
+    'COMPBENCH_CODECS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'codecs.json')
+)
+REQUIRED_FIELDS = ('compress_cmd', 'decompress_cmd', 'levels', 'extension')
+
+
+def placeholders(template: str) -> set:
+    """Names of the {placeholders} in a command template"""
+    return {name for _, name, _, _ in string.Formatter().parse(template) if name}
+
+
+def load_registry(path: str = CODEC_REGISTRY) -> dict:
+    """
+    Load and validate a codec registry file
+
+    Returns {codec name: config} in file order, with extra_levels keyed by
+    int level and memory_options as (compress option, decompress option)
+    tuples. Raises ValueError for a codec with missing fields or a template
+    placeholder that is neither {level} nor in its grid.
+    """
+    with open(path, 'r') as f:
+        registry = json.load(f)
+
+    codecs = {}
+    for name, spec in registry.items():
+        missing = [field for field in REQUIRED_FIELDS if field not in spec]
+        if missing:
+            raise ValueError(f"Codec {name!r} in {path} is missing {', '.join(missing)}")
+        config = {**spec, 'threaded': spec.get('threaded', False), 'grid': spec.get('grid', {})}
+        if 'extra_levels' in spec:
+            config['extra_levels'] = {int(level): cmd for level, cmd in spec['extra_levels'].items()}
+        if 'memory_options' in spec:
+            config['memory_options'] = {label: tuple(options) for label, options in spec['memory_options'].items()}
+
+        templates = [config['compress_cmd'], config['decompress_cmd'], *config.get('extra_levels', {}).values()]
+        unknown = set().union(*map(placeholders, templates)) - {'level'} - set(config['grid'])
+        if unknown:
+            raise ValueError(f"Codec {name!r} in {path} uses {', '.join(sorted(unknown))} without a grid for it")
+        codecs[name] = config
+    return codecs
+
+
+def split(codecs: dict) -> tuple:
+    """(single-threaded, multi-threaded) codecs of a registry"""
+    return (
+        {name: config for name, config in codecs.items() if not config['threaded']},
+        {name: config for name, config in codecs.items() if config['threaded']},
+    )
+
+
+def variants(config: dict) -> list:
+    """
+    Every point of a codec's parameter grid as (label, params, config)
+
+    The config copy has the grid values filled into its templates, leaving
+    {level} for the level. A codec without a grid has a single variant
+    labelled None.
+    """
+    grid = config.get('grid', {})
+    result = []
+    for values in itertools.product(*grid.values()):
+        params = dict(zip(grid, values))
+        fill = {'level': '{level}', **params}
+        variant = {
+            **config,
+            'compress_cmd': config['compress_cmd'].format(**fill),
+            'decompress_cmd': config['decompress_cmd'].format(**fill),
+        }
+        if 'extra_levels' in config:
+            variant['extra_levels'] = {level: cmd.format(**fill) for level, cmd in config['extra_levels'].items()}
+        label = ','.join(f"{key}={value}" for key, value in params.items()) or None
+        result.append((label, params, variant))
+    return result
+
+
+def sweep_levels(config: dict) -> list:
+    """
+    Every supported level of a codec as (level_name, level_value, config)
+
+    extra_levels entries (e.g. zstd --fast/--ultra) carry a complete compress
+    command, so their config copy replaces compress_cmd.
+    """
+    levels = [(str(level), level, config) for level in config.get('level_range', config['levels'].values())]
+    for level, cmd in config.get('extra_levels', {}).items():
+        levels.append((str(level), level, {**config, 'compress_cmd': cmd}))
+    return sorted(levels, key=lambda x: x[1])
+
+
+def expand(codecs: dict, threads: int = None, all_levels: bool = False) -> list:
+    """
+    The job list of a set of codecs: every grid variant at every named level
+
+    With all_levels, every supported level instead (see sweep_levels).
+    Each job is a dict with algorithm, is_threaded, level_name, level_value,
+    config (templates filled except {level}), variant (grid label or None)
+    and threads (the "threads" grid value, else the threads argument).
+    """
+    jobs = []
+    for algorithm, config in codecs.items():
+        for label, params, variant in variants(config):
+            if all_levels:
+                levels = sweep_levels(variant)
+            else:
+                levels = [(level_name, level_value, variant) for level_name, level_value in config['levels'].items()]
+            for level_name, level_value, level_config in levels:
+                jobs.append({
+                    'algorithm': algorithm,
+                    'is_threaded': config['threaded'],
+                    'level_name': level_name,
+                    'level_value': level_value,
+                    'config': level_config,
+                    'variant': label,
+                    'threads': params.get('threads', threads),
+                })
+    return jobs
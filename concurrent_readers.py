@@ -0,0 +1,260 @@
+"""
+Concurrent-Reader Load Test
+
+run_benchmark.py times one decompression at a time, but an archive host
+decompresses logs for many users at once. This load test compresses a
+corpus slice once per codec and level, then has M clients decompress it over
+and over for a fixed time, for every M in the sweep. It reports aggregate
+throughput, per-request latency percentiles and how much of the machine the
+decompressors kept busy, so codecs can be ranked under load as well as in
+isolation.
+
+The CLI backend runs each client in a thread that starts the codec's
+decompress command per request and reads its output, as a server piping zcat
+to a socket would. The library backend runs each client in its own process
+(one per client, so the GIL is never shared) decompressing in-process.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import codec_registry
+import corpus_generator
+import library_backend
+import run_benchmark
+import sample_stats
+
+READER_COUNTS = [1, 2, 4, 8, 16]  # Concurrent clients to sweep
+LOAD_DURATION = 10  # Seconds each client keeps issuing requests per configuration
+ARTIFACT_SIZE = '32MB'  # Uncompressed size of the log every request decompresses
+LOAD_LEVELS = ('low', 'mid', 'high')  # Named levels to pre-compress artifacts at
+READ_CHUNK = 1024 * 1024  # Bytes read from a decompressor's output at a time
+
+
+def _cli_client(argv: list, artifact: str, deadline: float, digest: str) -> list:
+    """Run decompress requests until deadline; returns [(start, end, bytes out, valid or None)]"""
+    requests = []
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        with open(artifact, 'rb') as stdin:
+            process = subprocess.Popen(argv, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            # Only each client's first request is hashed, so later ones cost the harness nothing but the read
+            hasher = hashlib.sha256() if not requests else None
+            size = 0
+            while chunk := process.stdout.read(READ_CHUNK):
+                size += len(chunk)
+                if hasher:
+                    hasher.update(chunk)
+            process.stdout.close()
+            returncode = process.wait()
+        valid = returncode == 0 and (hasher.hexdigest() == digest if hasher else None)
+        requests.append((start, time.monotonic(), size, valid))
+    return requests
+
+
+def _library_client(algorithm: str, artifact: str, deadline: float, digest: str) -> list:
+    """Same as _cli_client, decompressing in-process with library_backend"""
+    with open(artifact, 'rb') as f:
+        compressed = f.read()
+    requests = []
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        output = library_backend.LIBRARY_CODECS[algorithm]['decompressor']().decompress(compressed)
+        valid = hashlib.sha256(output).hexdigest() == digest if not requests else None
+        requests.append((start, time.monotonic(), len(output), valid))
+    return requests
+
+
+def cli_jobs(levels: tuple) -> list:
+    """Registry jobs (first grid variant only) whose tools are installed, as (algorithm, level_name, level_value, config)"""
+    jobs = []
+    seen = set()
+    for job in codec_registry.expand({**run_benchmark.ALGORITHMS_SINGLE_THREADS, **run_benchmark.ALGORITHMS_MULTI_THREADS}):
+        key = (job['algorithm'], job['level_name'])
+        if job['level_name'] not in levels or key in seen:
+            continue
+        seen.add(key)
+        tool = job['config']['compress_cmd'].split()[0]
+        if shutil.which(tool) is None:
+            print(f"Skipping {job['algorithm']}: {tool} is not installed")
+            continue
+        jobs.append((job['algorithm'], job['level_name'], job['level_value'], job['config']))
+    return jobs
+
+
+def compress_artifact(backend: str, algorithm: str, level_value, config, data: bytes, path: str) -> None:
+    """Write the artifact every request of one configuration decompresses"""
+    if backend == 'cli':
+        argv = run_benchmark.codec_argv(config['compress_cmd'].format(level=level_value))
+        with open(path, 'wb') as output:
+            subprocess.run(argv, input=data, stdout=output, stderr=subprocess.DEVNULL, check=True)
+    else:
+        compressor = library_backend.LIBRARY_CODECS[algorithm]['compressor'](level_value)
+        with open(path, 'wb') as output:
+            output.write(compressor.compress(data) + compressor.flush())
+
+
+def load_test(backend: str, target, artifact: str, digest: str, readers: int, duration: float) -> dict:
+    """
+    Run readers clients for duration seconds and aggregate their requests
+
+    target is the decompress argv (cli) or the library_backend codec name (library).
+    """
+    client = _cli_client if backend == 'cli' else _library_client
+    executor_class = ThreadPoolExecutor if backend == 'cli' else ProcessPoolExecutor
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    with executor_class(max_workers=readers) as executor:
+        # Clients of a process pool need a moment to start; give every client the same window
+        deadline = time.monotonic() + duration + (1.0 if backend == 'library' else 0.0)
+        futures = [executor.submit(client, target, artifact, deadline, digest) for _ in range(readers)]
+        per_client = [future.result() for future in futures]
+    usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    requests = [request for client_requests in per_client for request in client_requests]
+    if not requests:
+        raise ValueError(f"No request finished within {duration}s; raise --duration")
+    wall_time = max(end for _, end, _, _ in requests) - min(start for start, _, _, _ in requests)
+    latencies = [end - start for start, end, _, _ in requests]
+    cpu_seconds = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    cpus = len(os.sched_getaffinity(0))
+    return {
+        'requests': len(requests),
+        'wall_time': wall_time,
+        'aggregate_throughput': sum(size for _, _, size, _ in requests) / wall_time,
+        'requests_per_second': len(requests) / wall_time,
+        'median_latency': statistics.median(latencies),
+        'p95_latency': sample_stats.percentile(latencies, 0.95),
+        'p99_latency': sample_stats.percentile(latencies, 0.99),
+        'max_latency': max(latencies),
+        'cpu_seconds': cpu_seconds,
+        # Share of the cores available to the harness the decompressors kept busy
+        'cpu_saturation': cpu_seconds / wall_time / cpus,
+        'cpus': cpus,
+        'sha256_valid': all(valid is not False for _, _, _, valid in requests),
+    }
+
+
+def run_load_tests(backend: str, jobs: list, data: bytes, reader_counts: list, duration: float,
+                   work_dir: str) -> list:
+    """Pre-compress each codec/level once and load-test it at every reader count"""
+    digest = hashlib.sha256(data).hexdigest()
+    results = []
+    for algorithm, level_name, level_value, config in jobs:
+        artifact = os.path.join(work_dir, f"artifact-{algorithm}-{level_name}")
+        print(f"Compressing {algorithm} level {level_name} ({level_value}) artifact...")
+        compress_artifact(backend, algorithm, level_value, config, data, artifact)
+        if backend == 'cli':
+            target = run_benchmark.codec_argv(config['decompress_cmd'].format(level=level_value))
+        else:
+            target = algorithm
+        single = None
+        for readers in reader_counts:
+            print(f"  {readers} concurrent readers for {duration:g}s...")
+            measurement = load_test(backend, target, artifact, digest, readers, duration)
+            if single is None:
+                single = measurement
+            result = {
+                'mode': 'concurrent_readers',
+                'algorithm': algorithm,
+                'backend': backend,
+                'level_name': level_name,
+                'level_value': level_value,
+                'readers': readers,
+                'artifact_size': len(data),
+                'compressed_size': os.path.getsize(artifact),
+                'compression_ratio': os.path.getsize(artifact) / len(data),
+                **measurement,
+                # Aggregate throughput relative to the first (fewest readers) point of the sweep
+                'throughput_scaling': measurement['aggregate_throughput'] / single['aggregate_throughput'],
+            }
+            print(f"    {result['aggregate_throughput'] / 1024 / 1024:.1f} MB/s aggregate, "
+                  f"p50 {result['median_latency'] * 1000:.0f} ms, p99 {result['p99_latency'] * 1000:.0f} ms, "
+                  f"CPU {result['cpu_saturation']:.0%} of {result['cpus']} cores")
+            if not result['sha256_valid']:
+                print("    Verification failed")
+            results.append(result)
+        os.remove(artifact)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load-test decompression with many concurrent readers'
+    )
+    parser.add_argument('--readers', default=','.join(str(m) for m in READER_COUNTS),
+                        help=f"Comma-separated concurrent client counts (default: {','.join(map(str, READER_COUNTS))})")
+    parser.add_argument('--duration', type=float, default=LOAD_DURATION,
+                        help=f'Seconds of load per codec, level and reader count (default: {LOAD_DURATION})')
+    parser.add_argument('--artifact-size', type=corpus_generator.parse_size, default=ARTIFACT_SIZE,
+                        help=f'Uncompressed size of the log each request decompresses (default: {ARTIFACT_SIZE})')
+    parser.add_argument('--levels', default=','.join(LOAD_LEVELS),
+                        help=f"Comma-separated level names (default: {','.join(LOAD_LEVELS)})")
+    parser.add_argument('--codecs',
+                        help='Comma-separated subset of the codecs (registry names, or library_backend names)')
+    parser.add_argument('--backend', choices=['cli', 'library'], default='cli',
+                        help='Decompress with the CLI tools from a thread pool or in-process from a process pool')
+    parser.add_argument('--work-dir',
+                        help='Directory for the compressed artifacts (default: a temporary directory)')
+    parser.add_argument('--seed', type=int, default=run_benchmark.CORPUS_SEED,
+                        help='Seed for the generated corpus')
+    parser.add_argument('--corpus-profile',
+                        help='JSON file overriding the corpus content profile (see corpus_generator.py)')
+    args = parser.parse_args()
+
+    reader_counts = sorted(int(m) for m in args.readers.split(','))
+    levels = tuple(args.levels.split(','))
+    if args.backend == 'cli':
+        jobs = cli_jobs(levels)
+    else:
+        jobs = [(algorithm, level_name, level_value, None)
+                for algorithm, codec in library_backend.available_codecs().items()
+                for level_name, level_value in codec['levels'].items() if level_name in levels]
+    if args.codecs:
+        jobs = [job for job in jobs if job[0] in args.codecs.split(',')]
+    if not jobs:
+        print("Error: none of the selected codecs is available")
+        sys.exit(1)
+
+    input_file = run_benchmark.create_test_file(args.artifact_size, args.seed, args.corpus_profile)
+    with open(input_file, 'rb') as f:
+        data = f.read(args.artifact_size)
+    print(f"Artifact: {len(data)} bytes of {input_file}, {len(os.sched_getaffinity(0))} CPUs available")
+
+    with tempfile.TemporaryDirectory(prefix='compbench-readers-', dir=args.work_dir) as work_dir:
+        results = run_load_tests(args.backend, jobs, data, reader_counts, args.duration, work_dir)
+
+    timestamp = int(time.time())
+    json_file = f"concurrent_{timestamp}.json"
+    with open(json_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    csv_file = f"concurrent_{timestamp}.csv"
+    if results:
+        with open(csv_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    print("Results saved:")
+    print(f"JSON: {json_file}")
+    print(f"CSV: {csv_file}")
+    print(f"Total tests: {len(results)}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
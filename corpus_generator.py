@@ -0,0 +1,384 @@
+"""
+Teuthology Corpus Generator
+
+Builds seeded, reproducible teuthology-style logs in large blocks and caches
+them on disk by parameter hash, so repeated runs reuse the same corpus.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from calendar import timegm
+from multiprocessing import Pool
+from pathlib import Path
+
+GENERATOR_VERSION = 1  # Bump when the output for a given seed/profile changes
+BLOCK_SIZE = 8 * 1024 * 1024  # 8MB per generated block (also the unit of parallelism)
+BATCH_RECORDS = 4096  # Record kinds drawn per rng.choices() call
+AVG_LINE_BYTES = 120  # Used to turn lines_per_second into timestamp growth per byte
+CORPUS_CACHE_DIR = os.environ.get('COMPBENCH_CORPUS_CACHE', '.corpus_cache')
+
+DEFAULT_PROFILE = {
+    'hosts': 8,  # Number of smithi test nodes in the job
+    'osds': 12,  # Number of OSD daemons spread across the hosts
+    'start_time': '2025-08-15T10:30:45',
+    'lines_per_second': 200,  # Average log rate, drives timestamp growth
+    # Relative frequency of each record kind
+    'weights': {
+        'teuthology': 30,
+        'command': 15,
+        'daemon': 40,
+        'json': 5,
+        'yaml': 3,
+        'traceback': 2,
+        'health': 5,
+    },
+}
+
+TEUTHOLOGY_MESSAGES = [
+    "INFO:teuthology.run_tasks:Running task {task}...",
+    "INFO:teuthology.task.internal:Checking packages for os_type 'ubuntu', flavor 'default' and ceph hash '{sha}'",
+    "DEBUG:teuthology.orchestra.remote:{host}:> sudo systemctl status ceph-osd@{osd}",
+    "INFO:teuthology.orchestra.run.{host}.stdout:active (running) since Fri 2025-08-15 10:{minute:02d}:{second:02d} UTC",
+    "INFO:tasks.thrashosds.thrasher:in_osds:  [{osd}, {osd2}] out_osds:  [] dead_osds:  [] live_osds:  [{osd}, {osd2}]",
+    "INFO:tasks.thrashosds.thrasher:Removing osd {osd}, in_osds are: [{osd2}, {osd}]",
+    "INFO:teuthology.misc:Waiting for {num} osds to be up",
+    "INFO:teuthology.orchestra.run.{host}.stderr:dumped pgs",
+    "WARNING:teuthology.contextutil:'wait for recovery' reached maximum tries ({num}) after waiting for {seconds} seconds",
+    "ERROR:teuthology.orchestra.connection:Connection timeout on {host} (attempt {num})",
+    "INFO:teuthology.orchestra.run.{host}.stdout:{pgs} pgs: {pgs} active+clean; {num} MiB data, {seconds} MiB used",
+    "INFO:tasks.workunit.client.0.{host}.stdout:test_{task}_{num} ... ok",
+]
+
+COMMAND_MESSAGES = [
+    "DEBUG:teuthology.orchestra.run.{host}:> sudo adjust-ulimits ceph-coverage /home/ubuntu/cephtest/archive/coverage timeout 120 ceph --cluster ceph osd dump --format=json",
+    "DEBUG:teuthology.orchestra.run.{host}:> sudo ceph --cluster ceph pg dump --format=json",
+    "DEBUG:teuthology.orchestra.run.{host}:> sudo ceph --cluster ceph osd pool create unique_pool_{num} {pgs} {pgs}",
+    "DEBUG:teuthology.orchestra.run.{host}:> sudo rados -p unique_pool_{num} bench {seconds} write -b 4096 --no-cleanup",
+    "DEBUG:teuthology.orchestra.run.{host}:> sudo ceph --cluster ceph tell osd.{osd} injectargs --osd-max-backfills {num}",
+    "DEBUG:teuthology.orchestra.run.{host}:> test -e /home/ubuntu/cephtest/archive/{task}.{num}",
+]
+
+DAEMON_MESSAGES = [
+    "{thread} -1 osd.{osd} {epoch} heartbeat_check: no reply from 172.21.15.{octet}:68{port} osd.{osd2} since back {daemon_ts} front {daemon_ts}",
+    "{thread}  0 log_channel(cluster) log [DBG] : {pg} scrub starts",
+    "{thread}  0 log_channel(cluster) log [DBG] : {pg} scrub ok",
+    "{thread}  1 osd.{osd} pg_epoch: {epoch} pg[{pg}( v {epoch}'{num} (0'0,{epoch}'{num}] local-lis/les={epoch}/{epoch} n={num}) [{osd},{osd2}] r=0 lpr=0 crt={epoch}'{num} mlcod 0'0 active+clean] start_peering_interval",
+    "{thread} 10 osd.{osd} {epoch} handle_osd_map epochs [{epoch},{epoch}], i have {epoch}, src has [1,{epoch}]",
+    "{thread}  5 bluestore(/var/lib/ceph/osd/ceph-{osd}) _kv_sync_thread committed {num} cleaned 0 in {seconds}.{num} ms",
+    "{thread} -1 received  signal: Hangup from killall -q -1 ceph-mon ceph-mgr ceph-mds ceph-osd (PID: {num}) UID: 0",
+    "{thread}  0 mon.a@0(leader).osd e{epoch} e{epoch}: {osds} total, {osds} up, {osds} in",
+]
+
+HEALTH_MESSAGES = [
+    "INFO:teuthology.orchestra.run.{host}.stdout:HEALTH_OK",
+    "INFO:teuthology.orchestra.run.{host}.stdout:HEALTH_WARN 1 osds down; Degraded data redundancy: {num}/{pgs} objects degraded",
+    "DEBUG:tasks.ceph.ceph_manager.ceph:PG {pg} is not active+clean",
+    "INFO:tasks.ceph.ceph_manager.ceph:waiting for recovery to complete",
+]
+
+TRACEBACK_FRAMES = [
+    ('teuthology/run_tasks.py', 'run_tasks', 'manager = run_one_task(taskname, ctx=ctx, config=config)'),
+    ('teuthology/run_tasks.py', 'run_one_task', 'return task(**kwargs)'),
+    ('teuthology/task/__init__.py', '__enter__', 'self.begin()'),
+    ('teuthology/orchestra/remote.py', 'run', 'r = self._runner(client=self.ssh, name=self.shortname, **kwargs)'),
+    ('teuthology/orchestra/run.py', 'run', 'r.wait()'),
+    ('teuthology/orchestra/run.py', 'wait', 'self._raise_for_status()'),
+    ('tasks/ceph_manager.py', 'wait_for_recovery', "assert now - start < timeout, 'wait_for_recovery: failed before timeout expired'"),
+]
+
+TRACEBACK_ERRORS = [
+    "teuthology.exceptions.CommandFailedError: Command failed on {host} with status {status}: 'sudo ceph --cluster ceph osd pool create unique_pool_{num} {pgs}'",
+    "AssertionError: wait_for_recovery: failed before timeout expired",
+    "teuthology.exceptions.MaxWhileTries: reached maximum tries ({num}) after waiting for {seconds} seconds",
+    "paramiko.ssh_exception.NoValidConnectionsError: [Errno None] Unable to connect to port 22 on 172.21.15.{octet}",
+]
+
+TASKS = ['install', 'ceph', 'thrashosds', 'radosbench', 'workunit', 'rgw', 'cephfs_test_runner', 'internal.archive']
+
+
+def parse_size(value: str) -> int:
+    """Parse a size such as 300MB, 10G or 1048576 into bytes"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    text = value.strip().upper().rstrip('B').rstrip('I')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def load_profile(profile_file=None) -> dict:
+    """
+    Load a content profile, falling back to DEFAULT_PROFILE
+
+    A profile JSON file only needs the keys it overrides; 'weights' is
+    merged the same way so a single record kind can be re-weighted.
+    """
+    profile = json.loads(json.dumps(DEFAULT_PROFILE))
+    if profile_file:
+        with open(profile_file, 'r') as f:
+            overrides = json.load(f)
+        profile['weights'].update(overrides.pop('weights', {}))
+        profile.update(overrides)
+    return profile
+
+
+def corpus_hash(size: int, seed: int, profile: dict) -> str:
+    """Hash every parameter that affects the generated bytes"""
+    params = {
+        'version': GENERATOR_VERSION,
+        'block_size': BLOCK_SIZE,
+        'size': size,
+        'seed': seed,
+        'profile': profile,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def _hosts(seed: int, count: int) -> list:
+    """Pick the job's test nodes; depends only on the seed so every block agrees"""
+    rng = random.Random(f"{seed}:hosts")
+    return [f"smithi{n:03d}" for n in rng.sample(range(1, 200), count)]
+
+
+def _traceback(rng: random.Random, fields: dict) -> str:
+    frames = TRACEBACK_FRAMES[:rng.randint(3, len(TRACEBACK_FRAMES))]
+    lines = ["Traceback (most recent call last):"]
+    for path, func, code in frames:
+        lines.append(f'  File "/home/teuthworker/src/git.ceph.com_teuthology_main/{path}", '
+                     f'line {rng.randint(20, 900)}, in {func}')
+        lines.append(f"    {code}")
+    lines.append(rng.choice(TRACEBACK_ERRORS).format(**fields))
+    return "\n".join(lines)
+
+
+def _json_dump(rng: random.Random, fields: dict) -> str:
+    osds = [
+        {'osd': n, 'up': int(rng.random() > 0.05), 'in': 1, 'weight': 1,
+         'primary_affinity': 1, 'last_clean_begin': 0, 'last_clean_end': 0,
+         'up_from': rng.randint(5, fields['epoch']), 'state': ['exists', 'up']}
+        for n in range(rng.randint(2, fields['osds']))
+    ]
+    return json.dumps({
+        'epoch': fields['epoch'],
+        'fsid': fields['fsid'],
+        'created': f"{fields['daemon_ts']}+0000",
+        'flags': 'sortbitwise,recovery_deletes,purged_snapdirs,pglog_hardlimit',
+        'pool_max': rng.randint(1, 20),
+        'max_osd': fields['osds'],
+        'osds': osds,
+    }, separators=(',', ':'))
+
+
+def _yaml_config(rng: random.Random, fields: dict, hosts: list) -> str:
+    lines = [
+        "Config:",
+        f"  archive_path: /home/teuthworker/archive/teuthology-2025-08-15_10:30:45-rados-main-distro-default-smithi/{fields['num']}",
+        "  branch: main",
+        "  description: rados/thrash/{ceph clusters/{fixed-2} msgr-failures/fastclose thrashers/default workloads/radosbench}",
+        f"  job_id: '{fields['num']}'",
+        "  overrides:",
+        "    ceph:",
+        "      conf:",
+        "        osd:",
+        f"          osd max backfills: {rng.randint(1, 16)}",
+        "          osd scrub min interval: 60",
+        f"          debug osd: {rng.choice([5, 10, 20])}",
+        f"      sha1: {fields['sha']}",
+        "  roles:",
+    ]
+    for host in rng.sample(hosts, min(3, len(hosts))):
+        lines.append(f"  - [mon.a, mgr.x, osd.{rng.randint(0, fields['osds'] - 1)}, client.0]  # {host}")
+    return "\n".join(lines)
+
+
+def generate_block(seed: int, profile: dict, block_index: int) -> bytes:
+    """
+    Generate one BLOCK_SIZE chunk of log records (whole lines only)
+
+    Each block has its own RNG stream derived from (seed, block_index) and its
+    own slice of the job timeline, so blocks can be built in parallel and
+    still concatenate into the same corpus for a given seed.
+    """
+    rng = random.Random(f"{seed}:{block_index}")
+    hosts = _hosts(seed, profile['hosts'])
+    osds = profile['osds']
+    kinds = list(profile['weights'])
+    cum_weights = []
+    total = 0
+    for kind in kinds:
+        total += profile['weights'][kind]
+        cum_weights.append(total)
+
+    ms_per_byte = 1000 / (profile['lines_per_second'] * AVG_LINE_BYTES)
+    start_ms = timegm(time.strptime(profile['start_time'], '%Y-%m-%dT%H:%M:%S')) * 1000
+    clock_ms = start_ms + int(block_index * BLOCK_SIZE * ms_per_byte)
+    block_end_ms = start_ms + int((block_index + 1) * BLOCK_SIZE * ms_per_byte)
+    fsid = f"{seed & 0xffffffff:08x}-4f5e-11f0-9c6d-{block_index % 0xffff:04x}0cc47a8d2e"
+    sha = hashlib.sha1(str(seed).encode()).hexdigest()
+
+    templates = {
+        'teuthology': TEUTHOLOGY_MESSAGES,
+        'command': COMMAND_MESSAGES,
+        'daemon': DAEMON_MESSAGES,
+        'health': HEALTH_MESSAGES,
+    }
+    stamp_second = None
+    stamp_prefix = ''
+    records = []
+    size = 0
+    while size < BLOCK_SIZE:
+        for kind in rng.choices(kinds, cum_weights=cum_weights, k=BATCH_RECORDS):
+            # Only re-run strftime when the second changes
+            second, millis = divmod(clock_ms, 1000)
+            if second != stamp_second:
+                stamp_second = second
+                stamp_prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+            ts = f"{stamp_prefix}.{millis:03d}"
+            # One 64-bit draw feeds every variable field of the record
+            bits = rng.getrandbits(64)
+            host = hosts[bits % len(hosts)]
+            fields = {
+                'host': host,
+                'osd': bits % osds,
+                'osd2': (bits >> 8) % osds,
+                'osds': osds,
+                'num': (bits >> 16) % 100000,
+                'pgs': 1 << ((bits >> 36) % 9),
+                'seconds': (bits >> 40) % 600,
+                'epoch': 20 + (clock_ms - start_ms) // 4000,
+                'octet': 10 + (bits >> 48) % 240,
+                'port': (bits >> 56) % 100,
+                'minute': (second // 60) % 60,
+                'second': second % 60,
+                'status': 1 + (bits >> 44) % 127,
+                'task': TASKS[(bits >> 20) % len(TASKS)],
+                'pg': f"{(bits >> 24) % 12}.{(bits >> 28) % 256:x}",
+                'thread': f"7f{bits & 0xffffffffff:010x}",
+                'daemon_ts': ts,
+                'fsid': fsid,
+                'sha': sha,
+            }
+
+            if kind in templates:
+                messages = templates[kind]
+                body = messages[(bits >> 32) % len(messages)].format_map(fields)
+                if kind == 'daemon':
+                    daemon = f"osd.{fields['osd']}" if bits & 1 else 'mon.a'
+                    body = f"INFO:tasks.ceph.{daemon}.{host}.stderr:{ts}+0000 {body}"
+            elif kind == 'json':
+                body = f"INFO:teuthology.orchestra.run.{host}.stdout:" + _json_dump(rng, fields)
+            elif kind == 'yaml':
+                body = "INFO:teuthology.run:" + _yaml_config(rng, fields, hosts)
+            else:
+                body = "ERROR:teuthology.run_tasks:Saw exception from tasks.\n" + _traceback(rng, fields)
+
+            record = f"{ts} {body}\n"
+            records.append(record)
+            size += len(record)
+            clock_ms = min(clock_ms + int(rng.random() * 2 * len(record) * ms_per_byte), block_end_ms)
+            if size >= BLOCK_SIZE:
+                break
+
+    return ''.join(records).encode()
+
+
+def _generate_block_job(job):
+    return generate_block(*job)
+
+
+def generate_corpus(output_path: str, size: int, seed: int = 0, profile: dict = None,
+                    workers: int = None) -> None:
+    """
+    Write a corpus of exactly `size` bytes to output_path
+
+    Blocks are generated on a process pool and written in order; the file is
+    preallocated up front and moved into place only once it is complete.
+    """
+    profile = profile or load_profile()
+    workers = workers or len(os.sched_getaffinity(0))
+    num_blocks = -(-size // BLOCK_SIZE)
+    tmp_path = f"{output_path}.tmp{os.getpid()}"
+
+    start_time = time.perf_counter()
+    written = 0
+    with open(tmp_path, 'wb') as f:
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+        except (AttributeError, OSError):
+            pass  # Preallocation is an optimization only
+
+        with Pool(processes=workers) as pool:
+            # Bounded windows keep at most a few blocks per worker in memory
+            window = workers * 2
+            for first in range(0, num_blocks, window):
+                jobs = [(seed, profile, index) for index in range(first, min(first + window, num_blocks))]
+                for block in pool.imap(_generate_block_job, jobs):
+                    block = block[:size - written]
+                    f.write(block)
+                    written += len(block)
+        f.truncate(written)
+    os.replace(tmp_path, output_path)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Generated {written / 1024 / 1024:.1f} MB in {elapsed:.1f}s "
+          f"({written / 1024 / 1024 / elapsed:.1f} MB/s, {workers} workers)")
+
+
+def get_corpus(size: int, seed: int = 0, profile: dict = None,
+               cache_dir: str = CORPUS_CACHE_DIR) -> Path:
+    """
+    Return the path of the cached corpus for these parameters, generating it if needed
+
+    Set COMPBENCH_CORPUS_CACHE to a mounted directory to reuse corpora across
+    container rebuilds.
+    """
+    profile = profile or load_profile()
+    digest = corpus_hash(size, seed, profile)
+    path = Path(cache_dir) / f"teuthology-{digest[:16]}.log"
+    if path.exists():
+        print(f"Using cached corpus: {path}")
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    print(f"Generating corpus of size {size / 1024 / 1024:.1f} MB (seed {seed}) into {path}...")
+    generate_corpus(str(path), size, seed, profile)
+    with open(path.with_suffix('.json'), 'w') as f:
+        json.dump({'size': size, 'seed': seed, 'profile': profile,
+                   'generator_version': GENERATOR_VERSION}, f, indent=2)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a seeded teuthology-style log corpus'
+    )
+    parser.add_argument('--size', default='300MB',
+                        help='Corpus size, e.g. 10MB, 300MB, 10GB (default: 300MB)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed; the same seed and profile always produce the same bytes')
+    parser.add_argument('--profile',
+                        help='JSON file overriding DEFAULT_PROFILE (hosts, osds, weights, ...)')
+    parser.add_argument('--output',
+                        help='Write to this path instead of the corpus cache')
+
+    args = parser.parse_args()
+    size = parse_size(args.size)
+    profile = load_profile(args.profile)
+
+    if args.output:
+        generate_corpus(args.output, size, args.seed, profile)
+        print(f"Created {args.output}")
+    else:
+        print(f"Corpus: {get_corpus(size, args.seed, profile)}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,214 @@
+"""
+Distributed Benchmark Coordinator
+
+`run_benchmark.py --coordinator HOST:PORT` serves its job list over HTTP
+instead of running it, and worker agents (benchmark_worker.py) on any number
+of hosts pull one (configuration, iteration) task at a time, run it and
+post the iteration's data back as soon as it completes, so results stream
+into the coordinator's result store while the matrix runs.
+
+Every worker registers with an environment fingerprint: CPU model, cpuset,
+host name, core count and the version of every codec tool. Workers of the
+same host class (CPU model and core count, unless the worker names its own
+class) share one copy of the job list, so every class of hardware runs the
+full matrix once, split over its workers.
+
+Protocol: JSON POSTs to the coordinator
+
+    /setup                     -> corpus parameters and digest, tools to fingerprint
+    /register {environment}    -> {worker_id, host_class}
+    /next {worker_id}          -> {task_id, job} | {wait: seconds} | {done: true}
+    /result {worker_id, task_id, data[, error]}  -> {}    (data is null and error set if the iteration failed)
+
+A task leased to a worker that does not report back within LEASE_TIME is
+handed out again.
+"""
+
+import collections
+import http.client
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LEASE_TIME = 300  # Seconds before a task handed to a silent worker is handed out again
+POLL_INTERVAL = 2.0  # Seconds a worker waits when every remaining task of its class is leased out
+REQUEST_TIMEOUT = 60  # Seconds a worker waits for the coordinator to answer
+DEFAULT_PORT = 8642
+
+
+def parse_address(value: str) -> tuple:
+    """Parse HOST:PORT, HOST or :PORT into (host, port)"""
+    host, _, port = value.rpartition(':') if ':' in value else (value, '', '')
+    try:
+        return host or '0.0.0.0', int(port) if port else DEFAULT_PORT
+    except ValueError:
+        raise ValueError(f"invalid address {value!r} (expected HOST:PORT)")
+
+
+def host_class(environment: dict) -> str:
+    """Default host class of a worker: its CPU model and core count"""
+    return f"{environment['cpu_model']} x{environment['cores']}"
+
+
+def post(address: tuple, path: str, payload: dict) -> dict:
+    """POST payload as JSON to the coordinator at (host, port) and return its JSON reply"""
+    connection = http.client.HTTPConnection(*address, timeout=REQUEST_TIMEOUT)
+    try:
+        connection.request('POST', path, body=json.dumps(payload), headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        reply = json.loads(response.read() or b'{}')
+        if response.status != 200:
+            raise ValueError(f"coordinator rejected {path}: {reply.get('error', response.status)}")
+        return reply
+    finally:
+        connection.close()
+
+
+class _CoordinatorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        routes = {
+            '/setup': lambda: self.server.setup,
+            '/register': lambda: self.server.register(payload['environment']),
+            '/next': lambda: self.server.next_task(payload['worker_id']),
+            '/result': lambda: self.server.complete(payload['worker_id'], payload['task_id'], payload['data'],
+                                                    payload.get('error')),
+        }
+        status = 200
+        try:
+            reply = routes[self.path]()
+        except KeyError as e:
+            status, reply = 400, {'error': f"unknown request or field {e}"}
+        body = json.dumps(reply).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Coordinator(ThreadingHTTPServer):
+    """
+    Hands out tasks to workers, one task list per host class
+
+    plan(environment, host_class) is called when the first worker of a host
+    class registers and returns that class's tasks as (config_key, job)
+    pairs, job being JSON the worker runs. record(config_key, data) stores an
+    iteration's data and returns False once the configuration should stop
+    (e.g. it went over budget); its remaining tasks are then dropped.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple, setup: dict, plan, record, min_workers: int = 1):
+        self.setup = setup
+        self.plan = plan
+        self.record = record
+        self.min_workers = min_workers
+        self.lock = threading.Lock()
+        self.workers = {}  # worker_id -> host class
+        self.classes = {}  # host class -> {'pending', 'leased', 'stopped', 'total', 'done', 'planned'}
+        self.told_done = set()
+        self.failures = []  # (host class, worker_id, job, error) of iterations that failed
+        self.finished = threading.Event()
+        self.next_id = 0
+        super().__init__(address, _CoordinatorHandler)
+
+    def register(self, environment: dict) -> dict:
+        name = environment.get('host_class') or host_class(environment)
+        with self.lock:
+            worker_id = f"w{len(self.workers) + 1}"
+            self.workers[worker_id] = name
+            new_class = name not in self.classes
+            if new_class:
+                # Hold the class's slot while planning, so its other workers wait for the plan
+                self.classes[name] = {'pending': collections.deque(), 'leased': {}, 'stopped': set(),
+                                      'total': 0, 'done': 0, 'planned': False}
+        print(f"Worker {worker_id} registered: {environment['host']} ({name})")
+        if new_class:
+            tasks = self.plan(environment, name)
+            with self.lock:
+                for config_key, job in tasks:
+                    self.next_id += 1
+                    self.classes[name]['pending'].append((f"t{self.next_id}", config_key, job))
+                self.classes[name]['total'] = len(tasks)
+                self.classes[name]['planned'] = True
+            print(f"Host class {name}: {len(tasks)} iterations to run")
+            self._check_finished()
+        return {'worker_id': worker_id, 'host_class': name}
+
+    def next_task(self, worker_id: str) -> dict:
+        with self.lock:
+            state = self.classes[self.workers[worker_id]]
+            now = time.monotonic()
+            for task_id, (task, holder, deadline) in list(state['leased'].items()):
+                if deadline < now:
+                    print(f"Task {task_id} lease of worker {holder} expired, handing it out again")
+                    del state['leased'][task_id]
+                    state['pending'].appendleft(task)
+            while state['pending']:
+                task_id, config_key, job = state['pending'].popleft()
+                if config_key in state['stopped']:
+                    state['done'] += 1
+                    continue
+                state['leased'][task_id] = ((task_id, config_key, job), worker_id, now + LEASE_TIME)
+                return {'task_id': task_id, 'job': job}
+            if state['leased'] or not self._all_done():
+                return {'wait': POLL_INTERVAL}
+            self.finished.set()
+            self.told_done.add(worker_id)
+            return {'done': True}
+
+    def complete(self, worker_id: str, task_id: str, data, error: str = None) -> dict:
+        name = self.workers[worker_id]
+        with self.lock:
+            state = self.classes[name]
+            leased = state['leased'].pop(task_id, None)
+            if leased is None:
+                return {}  # Already handed out again and completed by another worker
+            (_, config_key, job), _, _ = leased
+            state['done'] += 1
+            progress = f"{state['done']}/{state['total']}"
+            if data is None:
+                self.failures.append((name, worker_id, job, error or "iteration failed"))
+        if data is not None and not self.record(config_key, data):
+            with self.lock:
+                state['stopped'].add(config_key)
+        print(f"[{name}] {progress} {job['algorithm']} - {job['level_name']} iteration {job['iteration'] + 1} "
+              f"from worker {worker_id}" + ("" if data is not None else f" FAILED: {error or 'iteration failed'}"))
+        self._check_finished()
+        return {}
+
+    def _all_done(self) -> bool:
+        return (len(self.workers) >= self.min_workers and
+                all(state['planned'] and not state['pending'] and not state['leased']
+                    for state in self.classes.values()))
+
+    def _check_finished(self):
+        with self.lock:
+            if self._all_done():
+                self.finished.set()
+
+    def run(self):
+        """Serve until every host class has run its tasks, then let the polling workers know"""
+        print(f"Coordinator listening on {self.server_address[0]}:{self.server_address[1]}, "
+              f"waiting for {self.min_workers} worker(s)")
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        self.finished.wait()
+        deadline = time.monotonic() + POLL_INTERVAL * 2 + 5
+        while len(self.told_done) < len(self.workers) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self.shutdown()
+        self.server_close()
+        if self.failures:
+            print(f"{len(self.failures)} iterations failed:")
+            for name, worker_id, job, error in self.failures:
+                print(f"    [{name}] {job['algorithm']} - {job['level_name']} iteration {job['iteration'] + 1} "
+                      f"on worker {worker_id}: {error}")
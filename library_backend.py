@@ -0,0 +1,217 @@
+"""
+In-Process Codec Backend
+
+Benchmarks the compression libraries our archiver would link against, driven
+directly from Python instead of forking the CLI tools. The input is memory
+mapped and fed to each compressor as memoryview slices, so no chunk is copied
+on its way in.
+"""
+
+import bz2
+import hashlib
+import lzma
+import mmap
+import resource
+import time
+import zlib
+
+import cache_control
+
+# Optional third-party bindings; their codecs are skipped when not installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+LIBRARY_CHUNK_SIZE = 1024 * 1024  # 1MB memoryview slices fed to each compress() call
+
+
+class _BrotliCompressor:
+    """Adapt brotli.Compressor to the compress()/flush() interface"""
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+class _BrotliDecompressor:
+    """Adapt brotli.Decompressor to the decompress() interface"""
+
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, data):
+        return self._decompressor.process(data)
+
+
+class _LZ4FrameCompressor:
+    """Adapt lz4.frame.LZ4FrameCompressor to the compress()/flush() interface"""
+
+    def __init__(self, level):
+        self._compressor = lz4.frame.LZ4FrameCompressor(compression_level=level)
+        self._header = self._compressor.begin()
+
+    def compress(self, data):
+        header, self._header = self._header, b''
+        return header + self._compressor.compress(data)
+
+    def flush(self):
+        return self._header + self._compressor.flush()
+
+
+# Same algorithm names and levels as the CLI tables in run_benchmark.py, so
+# results of the two backends line up configuration by configuration.
+# 'compressor' takes a level and returns an object with compress()/flush();
+# 'decompressor' returns an object with decompress().
+LIBRARY_CODECS = {
+    'gzip': {
+        'library': 'zlib',
+        'available': True,
+        'levels': {'low': 1, 'mid': 5, 'high': 9},
+        'compressor': lambda level: zlib.compressobj(level, zlib.DEFLATED, 31),  # wbits=31: gzip container
+        'decompressor': lambda: zlib.decompressobj(31),
+    },
+    'xz': {
+        'library': 'lzma',
+        'available': True,
+        'levels': {'low': 1, 'mid': 6, 'high': 9},
+        'compressor': lambda level: lzma.LZMACompressor(format=lzma.FORMAT_XZ, preset=level),
+        'decompressor': lambda: lzma.LZMADecompressor(),
+    },
+    'bzip2': {
+        'library': 'bz2',
+        'available': True,
+        'levels': {'low': 1, 'mid': 6, 'high': 9},
+        'compressor': lambda level: bz2.BZ2Compressor(level),
+        'decompressor': lambda: bz2.BZ2Decompressor(),
+    },
+    'zstd_single_threaded': {
+        'library': 'zstandard',
+        'available': zstandard is not None,
+        'levels': {'low': 1, 'mid': 10, 'high': 19},
+        'compressor': lambda level: zstandard.ZstdCompressor(level=level).compressobj(),
+        'decompressor': lambda: zstandard.ZstdDecompressor().decompressobj(),
+    },
+    'brotli': {
+        'library': 'brotli',
+        'available': brotli is not None,
+        'levels': {'low': 1, 'mid': 6, 'high': 11},
+        'compressor': _BrotliCompressor,
+        'decompressor': _BrotliDecompressor,
+    },
+    'lz4': {
+        'library': 'lz4',
+        'available': lz4 is not None,
+        'levels': {'low': 1, 'mid': 6, 'high': 9},
+        'compressor': _LZ4FrameCompressor,
+        'decompressor': lambda: lz4.frame.LZ4FrameDecompressor(),
+    },
+}
+
+
+def available_codecs() -> dict:
+    """Return the LIBRARY_CODECS entries whose bindings are importable"""
+    return {name: codec for name, codec in LIBRARY_CODECS.items() if codec['available']}
+
+
+def _thread_usage(phase: str, before, after) -> dict:
+    """CPU time and context switches of the benchmarking thread between two getrusage() calls"""
+    return {
+        f'{phase}_user_time': after.ru_utime - before.ru_utime,
+        f'{phase}_sys_time': after.ru_stime - before.ru_stime,
+        f'{phase}_voluntary_ctx_switches': after.ru_nvcsw - before.ru_nvcsw,
+        f'{phase}_involuntary_ctx_switches': after.ru_nivcsw - before.ru_nivcsw,
+        f'{phase}_inblock': after.ru_inblock - before.ru_inblock,
+        f'{phase}_oublock': after.ru_oublock - before.ru_oublock,
+    }
+
+
+def run_iteration(codec: dict, level_value, input_file: str, input_digest: str,
+                  chunk_size: int = LIBRARY_CHUNK_SIZE, direct: bool = False) -> dict:
+    """
+    Compress and decompress the input in-process once and return this iteration's data
+
+    Compression reads memoryview slices of the mmap'd input, or with direct,
+    chunks read with O_DIRECT (the reads are then part of the timed window).
+    Decompression hashes each output chunk outside the timed calls, so only
+    codec work is counted. Returns the same keys as run_benchmark.run_iteration();
+    peak RSS is not recorded because the codec shares the harness's address space.
+    """
+    def compress(chunks):
+        usage_before = resource.getrusage(resource.RUSAGE_THREAD)
+        start_time = time.perf_counter()
+        compressor = codec['compressor'](level_value)
+        compressed_chunks = [compressor.compress(chunk) for chunk in chunks]
+        compressed_chunks.append(compressor.flush())
+        compression_time = time.perf_counter() - start_time
+        usage = _thread_usage('compression', usage_before, resource.getrusage(resource.RUSAGE_THREAD))
+        return compressed_chunks, compression_time, usage
+
+    if direct:
+        compressed_chunks, compression_time, compression_usage = compress(
+            cache_control.direct_chunks(input_file, chunk_size)
+        )
+    else:
+        with open(input_file, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    compressed_chunks, compression_time, compression_usage = compress(
+                        view[offset:offset + chunk_size] for offset in range(0, len(view), chunk_size)
+                    )
+                finally:
+                    view.release()
+
+    # One copy of the (small) compressed stream, outside the timed window
+    compressed = b''.join(compressed_chunks)
+    del compressed_chunks
+    compressed_view = memoryview(compressed)
+
+    # Time and CPU are accumulated around each decompress() call so that
+    # hashing the output in between is not counted
+    digest = hashlib.sha256()
+    decompression_time = 0.0
+    decompression_usage = {}
+
+    def timed(call, *args):
+        nonlocal decompression_time
+        usage_before = resource.getrusage(resource.RUSAGE_THREAD)
+        start_time = time.perf_counter()
+        output = call(*args)
+        decompression_time += time.perf_counter() - start_time
+        usage = _thread_usage('decompression', usage_before, resource.getrusage(resource.RUSAGE_THREAD))
+        for key, value in usage.items():
+            decompression_usage[key] = decompression_usage.get(key, 0) + value
+        return output
+
+    decompressor = codec['decompressor']()
+    for offset in range(0, len(compressed_view), chunk_size):
+        digest.update(timed(decompressor.decompress, compressed_view[offset:offset + chunk_size]))
+    if hasattr(decompressor, 'flush'):
+        digest.update(timed(decompressor.flush))
+    compressed_view.release()
+
+    return {
+        'compression_time': compression_time,
+        'decompression_time': decompression_time,
+        'compressed_size': len(compressed),
+        'sha256_valid': digest.hexdigest() == input_digest,
+        'cpu': None,
+        **compression_usage,
+        **decompression_usage,
+    }
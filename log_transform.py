@@ -0,0 +1,329 @@
+"""
+Log-Aware Preprocessing Transform
+
+A reversible transform run ahead of a general-purpose codec. Teuthology lines
+are a timestamp, one of a few hundred message templates and a handful of
+varying numbers, so the "logpack" transform rewrites each line as:
+
+- the timestamp as a delta in milliseconds from the previous line's
+- a template id: the line with every number (a run of digits, or an 8-16
+  digit lowercase hex word such as a thread id) replaced by \\x01
+- the numbers, grouped into one column per (template, placeholder position)
+
+and writes the template ids, the timestamp deltas and every column as
+separate sections, so the codec sees long runs of similar bytes. The stream
+is a magic number followed by self-contained blocks of up to BLOCK_LINES
+lines; encode() and decode() are generators over byte chunks and hold at
+most one block (plus the template table) in memory. Lines the transform
+cannot represent exactly are stored verbatim, so decode(encode(x)) == x for
+any input.
+
+    python log_transform.py encode < teuthology.log > teuthology.log.logpack
+    python log_transform.py decode < teuthology.log.logpack > teuthology.log
+"""
+
+import argparse
+import calendar
+import hashlib
+import re
+import sys
+import time
+from array import array
+
+MAGIC = b'LOGPACK1'
+BLOCK_LINES = 32768  # Lines per self-contained block; bounds the memory of both directions
+MAX_TEMPLATES = 65535  # Template ids are 16-bit (0 marks a verbatim line); later new templates go verbatim
+STREAM_CHUNK_SIZE = 1024 * 1024  # Bytes read at a time by the file helpers
+TRANSFORMS = ('logpack',)  # Names accepted by run_benchmark.py --transform
+
+TIMESTAMP = re.compile(rb'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{3} ')
+TIMESTAMP_LENGTH = 24  # 'YYYY-MM-DDTHH:MM:SS.mmm '
+VARIABLE = re.compile(rb'((?=[0-9a-f])(?:(?<![0-9A-Za-z])[0-9a-f]{8,16}(?![0-9A-Za-z])|\d+))')
+PLACEHOLDER = b'\x01'
+NO_TIMESTAMP = b'-'  # Timestamp column entry of a line without one
+SEPARATOR = b' '  # Between the entries of a text column (entries never contain it)
+
+
+def _varint(value: int, out: bytearray) -> None:
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _section(data, out: bytearray) -> None:
+    _varint(len(data), out)
+    out += data
+
+
+def _template_ids(tids: list) -> bytes:
+    ids = array('H', tids)
+    if sys.byteorder == 'big':
+        ids.byteswap()  # Always little-endian on disk
+    return ids.tobytes()
+
+
+class _Reader:
+    """Sequential reads of varints and length-prefixed sections from a block"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.position = 0
+
+    def varint(self) -> int:
+        value = shift = 0
+        while True:
+            byte = self.data[self.position]
+            self.position += 1
+            value |= (byte & 0x7f) << shift
+            if not byte & 0x80:
+                return value
+            shift += 7
+
+    def section(self) -> bytes:
+        length = self.varint()
+        self.position += length
+        return self.data[self.position - length:self.position]
+
+
+class _Encoder:
+    """Block encoder; the template table persists across blocks"""
+
+    def __init__(self):
+        self.templates = {}  # template -> id (0 is reserved for verbatim lines)
+        self.seconds = {}  # 'YYYY-MM-DDTHH:MM:SS' -> epoch second, or None if not canonical
+
+    def _second(self, prefix: bytes):
+        second = self.seconds.get(prefix, False)
+        if second is False:
+            if len(self.seconds) >= MAX_TEMPLATES:
+                self.seconds.clear()
+            try:
+                second = calendar.timegm(time.strptime(prefix.decode(), '%Y-%m-%dT%H:%M:%S'))
+            except ValueError:
+                second = None
+            # Only timestamps that format back to the same bytes can be delta-coded
+            if second is not None and time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second)).encode() != prefix:
+                second = None
+            self.seconds[prefix] = second
+        return second
+
+    def block(self, lines: list, unterminated: bool) -> bytes:
+        new_templates = []
+        tids = []
+        stamps = []
+        verbatim = bytearray()
+        rows = {}  # tid -> [values of each line]
+        previous_ms = 0
+
+        for line in lines:
+            rest = line
+            ms = None
+            if TIMESTAMP.match(line):
+                second = self._second(line[:19])
+                if second is not None:
+                    ms = second * 1000 + int(line[20:23])
+                    rest = line[TIMESTAMP_LENGTH:]
+
+            pieces = VARIABLE.split(rest)  # Literal text and numbers, alternately
+            template = PLACEHOLDER.join(pieces[::2])
+            tid = self.templates.get(template)
+            if tid is None:
+                if PLACEHOLDER in rest or len(self.templates) >= MAX_TEMPLATES:
+                    tid = 0  # The line itself contains placeholder bytes, or the table is full
+                else:
+                    tid = self.templates[template] = len(self.templates) + 1
+                    new_templates.append(template)
+                    rows[tid] = []
+            elif PLACEHOLDER in rest:
+                tid = 0
+            tids.append(tid)
+            if tid == 0:
+                stamps.append(NO_TIMESTAMP)
+                _section(line, verbatim)
+                continue
+            if ms is None:
+                stamps.append(NO_TIMESTAMP)
+            else:
+                stamps.append(b'%d' % (ms - previous_ms))
+                previous_ms = ms
+            rows.setdefault(tid, []).append(pieces[1::2])
+
+        out = bytearray()
+        _varint(len(lines), out)
+        _varint(1 if unterminated else 0, out)
+        templates_section = bytearray()
+        _varint(len(new_templates), templates_section)
+        for template in new_templates:
+            _section(template, templates_section)
+        _section(templates_section, out)
+        _section(_template_ids(tids), out)
+        _section(SEPARATOR.join(stamps), out)
+        columns = [(tid, slot, column) for tid, values in rows.items() if values
+                   for slot, column in enumerate(zip(*values))]
+        _varint(len(columns), out)
+        for tid, slot, column in columns:
+            _varint(tid, out)
+            _varint(slot, out)
+            _section(SEPARATOR.join(column), out)
+        _section(verbatim, out)
+        return bytes(out)
+
+
+def _lines(chunks):
+    """Yield (line without newline, is_last_and_unterminated) from byte chunks"""
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line, False
+    if pending:
+        yield pending, True
+
+
+def _framed(block: bytes) -> bytes:
+    out = bytearray()
+    _section(block, out)
+    return bytes(out)
+
+
+def encode(chunks):
+    """Transform an iterable of log byte chunks into logpack byte chunks (one per block)"""
+    encoder = _Encoder()
+    yield MAGIC
+    lines = []
+    unterminated = False
+    for line, unterminated in _lines(chunks):
+        lines.append(line)
+        if len(lines) >= BLOCK_LINES:
+            yield _framed(encoder.block(lines, unterminated))
+            lines = []
+    if lines:
+        yield _framed(encoder.block(lines, unterminated))
+
+
+def _blocks(chunks):
+    """Yield the blocks of a logpack stream"""
+    buffer = bytearray()
+    magic_checked = False
+    for chunk in chunks:
+        buffer += chunk
+        if not magic_checked:
+            if len(buffer) < len(MAGIC):
+                continue
+            if bytes(buffer[:len(MAGIC)]) != MAGIC:
+                raise ValueError("Not a logpack stream")
+            del buffer[:len(MAGIC)]
+            magic_checked = True
+        while buffer:
+            # Block length prefix, then the block once it is complete
+            length = shift = position = 0
+            while position < len(buffer):
+                byte = buffer[position]
+                position += 1
+                length |= (byte & 0x7f) << shift
+                shift += 7
+                if not byte & 0x80:
+                    break
+            else:
+                break
+            if len(buffer) < position + length:
+                break
+            yield bytes(buffer[position:position + length])
+            del buffer[:position + length]
+    if buffer:
+        raise ValueError("Truncated logpack stream")
+
+
+def decode(chunks):
+    """Invert encode(): yield the original log bytes, one chunk per block"""
+    formats = [None]  # id -> template as a bytes %-format; id 0 is verbatim
+    prefixes = {}
+    for block in _blocks(chunks):
+        reader = _Reader(block)
+        line_count = reader.varint()
+        unterminated = reader.varint() & 1
+        new_templates = _Reader(reader.section())
+        for _ in range(new_templates.varint()):
+            formats.append(new_templates.section().replace(b'%', b'%%').replace(PLACEHOLDER, b'%s'))
+        tids = array('H')
+        tids.frombytes(reader.section())
+        if sys.byteorder == 'big':
+            tids.byteswap()
+        stamps = reader.section().split(SEPARATOR)
+        columns = {}
+        for _ in range(reader.varint()):
+            tid, slot = reader.varint(), reader.varint()
+            columns.setdefault(tid, {})[slot] = reader.section().split(SEPARATOR)
+        verbatim = _Reader(reader.section())
+        if len(tids) != line_count or len(stamps) != line_count:
+            raise ValueError("Corrupt logpack block")
+
+        # Each template's lines, as value tuples in line order
+        rows = {tid: iter(zip(*(slots[slot] for slot in range(len(slots))))) for tid, slots in columns.items()}
+        out = []
+        previous_ms = 0
+        for tid, stamp in zip(tids, stamps):
+            if tid == 0:
+                out.append(verbatim.section())
+                continue
+            line = formats[tid] % next(rows[tid]) if tid in rows else formats[tid].replace(b'%%', b'%')
+            if stamp != NO_TIMESTAMP:
+                ms = previous_ms + int(stamp)
+                previous_ms = ms
+                second, millis = divmod(ms, 1000)
+                prefix = prefixes.get(second)
+                if prefix is None:
+                    if len(prefixes) >= MAX_TEMPLATES:
+                        prefixes.clear()
+                    prefix = prefixes[second] = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second)).encode()
+                line = b'%s.%03d %s' % (prefix, millis, line)
+            out.append(line)
+        yield b'\n'.join(out) + (b'' if unterminated else b'\n')
+
+
+def _read_chunks(f):
+    while chunk := f.read(STREAM_CHUNK_SIZE):
+        yield chunk
+
+
+def encode_file(input_path: str, output_path: str) -> float:
+    """Encode a file into output_path; returns the seconds taken"""
+    start_time = time.perf_counter()
+    with open(input_path, 'rb') as source, open(output_path, 'wb') as output:
+        for chunk in encode(_read_chunks(source)):
+            output.write(chunk)
+    return time.perf_counter() - start_time
+
+
+def decode_digest(input_path: str) -> tuple:
+    """Decode a file without writing it out; returns (seconds, SHA256 of the decoded bytes)"""
+    hasher = hashlib.sha256()
+    start_time = time.perf_counter()
+    with open(input_path, 'rb') as source:
+        for chunk in decode(_read_chunks(source)):
+            hasher.update(chunk)
+    return time.perf_counter() - start_time, hasher.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Reversible log-aware transform (logpack) between stdin and stdout'
+    )
+    parser.add_argument('direction', choices=['encode', 'decode'])
+    args = parser.parse_args()
+
+    transform = encode if args.direction == 'encode' else decode
+    stdout = sys.stdout.buffer
+    for chunk in transform(_read_chunks(sys.stdin.buffer)):
+        stdout.write(chunk)
+    stdout.flush()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
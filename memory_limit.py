@@ -0,0 +1,144 @@
+"""
+Memory Limits
+
+Runs codecs under an enforced memory ceiling. When the harness may manage
+a cgroup v2 subtree, every codec run gets its own child cgroup with
+memory.max set to the limit and swap disabled: the kernel OOM-kills a codec
+that outgrows it, and memory.peak gives the exact peak. Otherwise the codec
+is started through prlimit with RLIMIT_DATA set to the limit, so its
+allocations past the limit fail instead.
+
+RLIMIT_DATA is used rather than RLIMIT_AS because glibc reserves (but
+never touches) 64MB of address space per malloc arena, which would make
+multi-threaded codecs fail far below their real footprint. It still limits
+virtual size, not resident memory: a codec that reserves large buffers up
+front (zstd) fails under a limit its RSS would fit in, so such results are
+labeled as virtual-size limits.
+"""
+
+import itertools
+import os
+import signal
+from functools import lru_cache
+
+CGROUP_MOUNT = '/sys/fs/cgroup'
+HARNESS_CGROUP = 'compbench-harness'  # Leaf the harness moves into so run cgroups can get the memory controller
+RUN_CGROUP_PREFIX = 'compbench-run'
+# What the registry's codecs print when RLIMIT_DATA refuses an allocation (matched lowercased)
+OOM_STDERR_MARKERS = (
+    b'cannot allocate memory',  # strerror(ENOMEM): xz and most tools
+    b'allocation error : not enough memory',  # zstd error 11, lz4 error 31
+    b'failed creating i/o thread pool',  # zstd: its thread stacks count against RLIMIT_DATA too
+    b'not enough memory',  # pigz
+    b'out of memory',  # brotli, gzip
+    b'memory exhausted',  # gzip (xalloc_die)
+    b'could not allocate memory',  # pbzip2
+)
+LIMIT_KINDS = {'cgroup': 'memory limit', 'rlimit': 'virtual-size limit (RLIMIT_DATA)'}  # By enforcement()
+
+_run_ids = itertools.count()
+
+
+def _read(path: str) -> str:
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def _write(path: str, value: str) -> None:
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+@lru_cache(maxsize=None)
+def cgroup_parent():
+    """
+    The cgroup v2 directory per-run memory cgroups are created in, or None
+
+    A cgroup can only hand the memory controller to its children when it
+    has no processes of its own, so the harness first moves itself into a
+    HARNESS_CGROUP leaf next to the future run cgroups. This only works when
+    the harness owns its cgroup, e.g. when started with
+    `systemd-run --user --scope -p Delegate=yes`; cgroup v1, a read-only
+    cgroupfs or another process sharing the cgroup all mean None.
+    """
+    try:
+        own = None
+        for line in _read('/proc/self/cgroup').splitlines():
+            if line.startswith('0::'):
+                own = os.path.join(CGROUP_MOUNT, line[3:].lstrip('/'))
+        if own is None or 'memory' not in _read(os.path.join(own, 'cgroup.controllers')).split():
+            return None
+        if 'memory' not in _read(os.path.join(own, 'cgroup.subtree_control')).split():
+            os.makedirs(os.path.join(own, HARNESS_CGROUP), exist_ok=True)
+            _write(os.path.join(own, HARNESS_CGROUP, 'cgroup.procs'), str(os.getpid()))
+            _write(os.path.join(own, 'cgroup.subtree_control'), '+memory')
+        return own
+    except OSError:
+        return None
+
+
+def enforcement() -> str:
+    """How limits are enforced on this host: 'cgroup' or 'rlimit'"""
+    return 'cgroup' if cgroup_parent() else 'rlimit'
+
+
+def create_run_cgroup(limit: int) -> str:
+    """Create a cgroup for one codec run with memory.max set to limit bytes and no swap"""
+    path = os.path.join(cgroup_parent(), f"{RUN_CGROUP_PREFIX}-{os.getpid()}-{next(_run_ids)}")
+    os.mkdir(path)
+    _write(os.path.join(path, 'memory.max'), str(limit))
+    try:
+        _write(os.path.join(path, 'memory.swap.max'), '0')
+    except OSError:
+        pass  # No swap accounting on this kernel
+    return path
+
+
+def cgroup_usage(path: str) -> dict:
+    """Peak memory (KB, kernels >= 5.19), OOM events and OOM kills of a finished run cgroup"""
+    usage = {}
+    try:
+        usage['memory_peak_kb'] = int(_read(os.path.join(path, 'memory.peak'))) // 1024
+    except OSError:
+        pass
+    for line in _read(os.path.join(path, 'memory.events')).splitlines():
+        name, value = line.split()
+        if name == 'oom':
+            usage['oom_events'] = int(value)
+        elif name == 'oom_kill':
+            usage['oom_kills'] = int(value)
+    return usage
+
+
+def remove_cgroup(path: str) -> None:
+    """Remove a run cgroup once its codec has been reaped"""
+    try:
+        os.rmdir(path)
+    except OSError as e:
+        print(f"Warning: Could not remove {path}: {e}")
+
+
+def limit_argv(argv: list, limit: int, cgroup: str = None) -> list:
+    """
+    Wrap a codec command line so it runs under the memory limit
+
+    With a run cgroup, a shell moves itself into the cgroup and execs the
+    codec, so the codec's own pid is the one the harness waits for.
+    """
+    if cgroup:
+        return ['sh', '-c', 'echo $$ > "$0/cgroup.procs" && exec "$@"', cgroup] + argv
+    return ['prlimit', f'--data={limit}'] + argv
+
+
+def exhausted(returncode: int, stderr: bytes, cgroup_usage: dict = None) -> bool:
+    """
+    Whether a failed codec run died of the memory limit
+
+    With a run cgroup (cgroup_usage from cgroup_usage()) only an OOM event or
+    kill in its memory.events counts. Under RLIMIT_DATA only a refused
+    allocation reported on stderr (OOM_STDERR_MARKERS) or death by SIGKILL
+    do; any other failure is an ordinary one.
+    """
+    if cgroup_usage is not None:
+        return bool(cgroup_usage.get('oom_events') or cgroup_usage.get('oom_kills'))
+    return returncode == -signal.SIGKILL or any(marker in stderr.lower() for marker in OOM_STDERR_MARKERS)
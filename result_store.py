@@ -0,0 +1,215 @@
+"""
+Result Store
+
+Embedded SQLite store for benchmark measurements. Every iteration is written
+as soon as it completes, keyed by the configuration it measured: corpus hash,
+codec binary version, command line, CPU model and cpuset. Reruns reuse the
+samples already stored, and the JSON/CSV exports are views over the store.
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import threading
+import time
+import zlib
+from functools import lru_cache
+
+RESULT_STORE = os.environ.get('COMPBENCH_RESULT_STORE', 'results.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS configurations (
+    config_key TEXT PRIMARY KEY,
+    corpus_hash TEXT NOT NULL,
+    tool_version TEXT NOT NULL,
+    command_line TEXT NOT NULL,
+    cpu_model TEXT NOT NULL,
+    cpuset TEXT NOT NULL,
+    host TEXT NOT NULL,
+    algorithm TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    level_name TEXT NOT NULL,
+    level_value TEXT,
+    threads INTEGER,
+    cache_state TEXT NOT NULL DEFAULT 'cold',
+    result TEXT  -- latest summarized result as JSON, without its samples
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    id INTEGER PRIMARY KEY,
+    config_key TEXT NOT NULL REFERENCES configurations(config_key),
+    recorded_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS measurements_by_config ON measurements(config_key);
+"""
+
+# Serializes writes from the --parallel worker threads
+_write_lock = threading.Lock()
+
+
+def open_store(path: str = RESULT_STORE) -> sqlite3.Connection:
+    """Open (and create if needed) the result store"""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    # Stores created before the page-cache modes existed only hold cold measurements
+    columns = [row['name'] for row in conn.execute("PRAGMA table_info(configurations)")]
+    if 'cache_state' not in columns:
+        conn.execute("ALTER TABLE configurations ADD COLUMN cache_state TEXT NOT NULL DEFAULT 'cold'")
+        conn.commit()
+    return conn
+
+
+@lru_cache(maxsize=None)
+def cpu_model() -> str:
+    """CPU model name from /proc/cpuinfo"""
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return 'unknown'
+
+
+def cpuset() -> str:
+    """The cores this process may run on, e.g. '0-5' or '0,2,4'"""
+    cpus = sorted(os.sched_getaffinity(0))
+    ranges = []
+    start = prev = cpus[0]
+    for cpu in cpus[1:] + [None]:
+        if cpu is not None and cpu == prev + 1:
+            prev = cpu
+            continue
+        ranges.append(str(start) if start == prev else f"{start}-{prev}")
+        if cpu is not None:
+            start = prev = cpu
+    return ','.join(ranges)
+
+
+def environment() -> dict:
+    """Host fingerprint recorded with every configuration"""
+    return {'cpu_model': cpu_model(), 'cpuset': cpuset(), 'host': socket.gethostname()}
+
+
+@lru_cache(maxsize=None)
+def tool_version(binary: str) -> str:
+    """First line of `<binary> --version` (some tools print it on stderr)"""
+    try:
+        result = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return 'unknown'
+    output = (result.stdout.strip() or result.stderr.strip()).splitlines()
+    return output[0] if output else 'unknown'
+
+
+@lru_cache(maxsize=None)
+def library_version(module_name: str) -> str:
+    """Version of an in-process codec library"""
+    if module_name == 'zlib':
+        return f"zlib {zlib.ZLIB_RUNTIME_VERSION}"
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        return 'unknown'
+    return f"{module_name} {getattr(module, '__version__', 'stdlib')}"
+
+
+def register_config(conn: sqlite3.Connection, corpus_hash: str, tool_version: str, command_line: str,
+                    algorithm: str, backend: str, level_name: str, level_value, threads=None,
+                    cache_state: str = 'cold', memory_limit: int = None, env: dict = None) -> str:
+    """Record a configuration (if new) and return its key; env is the measuring host's, by default this one"""
+    env = env or environment()
+    identity = {
+        'corpus_hash': corpus_hash,
+        'tool_version': tool_version,
+        'command_line': command_line,
+        'cpu_model': env['cpu_model'],
+        'cpuset': env['cpuset'],
+    }
+    if cache_state != 'cold':
+        identity['cache_state'] = cache_state  # Cold keys stay those of stores that predate cache modes
+    if memory_limit:
+        identity['memory_limit'] = memory_limit  # Same for unlimited runs and memory limits
+    if env.get('host_class'):
+        identity['host_class'] = env['host_class']  # Distributed workers: classes never share samples
+    config_key = hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+    with _write_lock:
+        conn.execute(
+            "INSERT OR IGNORE INTO configurations "
+            "(config_key, corpus_hash, tool_version, command_line, cpu_model, cpuset, host, "
+            "algorithm, backend, level_name, level_value, threads, cache_state) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (config_key, corpus_hash, tool_version, command_line, env['cpu_model'], env['cpuset'],
+             env['host'], algorithm, backend, level_name, json.dumps(level_value), threads, cache_state)
+        )
+        conn.commit()
+    return config_key
+
+
+def add_measurement(conn: sqlite3.Connection, config_key: str, data: dict) -> None:
+    """Persist one iteration's data immediately"""
+    with _write_lock:
+        conn.execute(
+            "INSERT INTO measurements (config_key, recorded_at, data) VALUES (?, ?, ?)",
+            (config_key, time.time(), json.dumps(data))
+        )
+        conn.commit()
+
+
+def clear_measurements(conn: sqlite3.Connection, config_key: str) -> None:
+    """Discard the stored iterations and result of a configuration"""
+    with _write_lock:
+        conn.execute("DELETE FROM measurements WHERE config_key = ?", (config_key,))
+        conn.execute("UPDATE configurations SET result = NULL WHERE config_key = ?", (config_key,))
+        conn.commit()
+
+
+def measurements(conn: sqlite3.Connection, config_key: str) -> list:
+    """All stored iterations of a configuration, oldest first"""
+    rows = conn.execute(
+        "SELECT data FROM measurements WHERE config_key = ? ORDER BY id", (config_key,)
+    ).fetchall()
+    return [json.loads(row['data']) for row in rows]
+
+
+def save_result(conn: sqlite3.Connection, result: dict) -> None:
+    """Store the summarized result of a configuration (samples stay in measurements)"""
+    summary = {key: value for key, value in result.items() if key != 'samples'}
+    with _write_lock:
+        conn.execute(
+            "UPDATE configurations SET result = ? WHERE config_key = ?",
+            (json.dumps(summary), result['config_key'])
+        )
+        conn.commit()
+
+
+def load_results(conn: sqlite3.Connection, config_keys=None) -> list:
+    """
+    Summarized results joined with their configuration metadata and samples
+
+    config_keys selects and orders the results (e.g. one run's configurations);
+    by default every summarized configuration in the store is returned.
+    """
+    rows = {
+        row['config_key']: row
+        for row in conn.execute("SELECT * FROM configurations WHERE result IS NOT NULL")
+    }
+    keys = config_keys if config_keys is not None else list(rows)
+    results = []
+    for config_key in keys:
+        row = rows.get(config_key)
+        if row is None:
+            continue
+        result = json.loads(row['result'])
+        for column in ('corpus_hash', 'tool_version', 'command_line', 'cpu_model', 'cpuset', 'host',
+                       'cache_state'):
+            result[column] = row[column]
+        result['samples'] = measurements(conn, config_key)
+        results.append(result)
+    return results
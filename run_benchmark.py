@@ -4,133 +4,440 @@ Compression Benchmark Tool
 
 import os
 import sys
+import argparse
 import time
 import subprocess
 import csv
+import fcntl
 import json
+import hashlib
+import queue
+import threading
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import random
-
-ITERATIONS = 1  # Number of iterations for each algorithm/level
-ALGORITHMS_SINGLE_THREADS = {
-    'gzip': {
-        'compress_cmd': 'gzip -c -{level}',
-        'decompress_cmd': 'gzip -dc',
-        'levels': {'low': 1, 'mid': 5, 'high': 9},  # gzip -c -5 is used by production teuthology
-        'extension': '.gz'
-    },
-    'brotli': {
-        'compress_cmd': 'brotli -c -q {level}',  # brotli uses -q for quality
-        'decompress_cmd': 'brotli -dc',
-        'levels': {'low': 1, 'mid': 6, 'high': 11},
-        'extension': '.br'
-    },
-    'xz': {
-        'compress_cmd': 'xz -c -{level}',
-        'decompress_cmd': 'xz -dc',
-        'levels': {'low': 1, 'mid': 6, 'high': 9},
-        'extension': '.xz'
-    },
-    'lz4': {
-        'compress_cmd': 'lz4 -c -{level}',
-        'decompress_cmd': 'lz4 -dc',
-        'levels': {'low': 1, 'mid': 6, 'high': 9},
-        'extension': '.lz4'
-    },
-    'zstd_single_threaded': {
-        'compress_cmd': 'zstd -c -{level}',  # single-threaded (no -T flag)
-        'decompress_cmd': 'zstd -dc',
-        'levels': {'low': 1, 'mid': 10, 'high': 19},
-        'extension': '.zst'
-    }
-}
 
-ALGORITHMS_MULTI_THREADS = {
-    # All available CPU cores will be used
-    'zstd_multithreaded': {
-        'compress_cmd': 'zstd -c -{level} -T0',
-        'decompress_cmd': 'zstd -dc -T0',
-        'levels': {'low': 1, 'mid': 10, 'high': 19},
-        'extension': '.zst'
-    },
-    'pigz': {
-        'compress_cmd': 'pigz -c -{level}',
-        'decompress_cmd': 'pigz -dc',
-        'levels': {'low': 1, 'mid': 6, 'high': 9},
-        'extension': '.gz'
-    },
-    'pbzip2': {
-        'compress_cmd': 'pbzip2 -c -{level}',
-        'decompress_cmd': 'pbzip2 -dc',
-        'levels': {'low': 1, 'mid': 6, 'high': 9},
-        'extension': '.bz2'
-    }
+import analyze_result
+import cache_control
+import codec_registry
+import corpus_generator
+import distributed
+import library_backend
+import log_transform
+import memory_limit
+import result_store
+import sample_stats
+
+ITERATIONS = 1  # Number of iterations for each algorithm/level (--iterations)
+ADAPTIVE = False  # --adaptive: iterate each configuration until its CI is tight enough
+ADAPTIVE_CI_TARGET = 0.05  # Stop once the 95% CI of the mean time is within +/-5%
+ADAPTIVE_TIME_BUDGET = 300  # ...or after this many seconds spent on one configuration
+ADAPTIVE_MIN_ITERATIONS = 3
+ADAPTIVE_MAX_ITERATIONS = 50
+STORE = None  # Open result store connection (see result_store.py), set by main()
+FRESH = False  # --fresh: discard stored samples instead of resuming from them
+CACHE_MODE = 'cold'  # Page-cache state of the codec inputs (see cache_control.py), set per pass by main()
+MEMORY_LIMIT = None  # --memory-limit: memory ceiling in bytes of every CLI codec run (see memory_limit.py)
+TRANSFORM = None  # --transform: the log_transform.py stage of the current pass (see prepare_transform), set by main()
+
+# CLI codecs, their command templates, levels and parameter grids (see codec_registry.py and codecs.json)
+ALGORITHMS_SINGLE_THREADS, ALGORITHMS_MULTI_THREADS = codec_registry.split(codec_registry.load_registry())
+
+# Time budgets: runs that cannot finish within them are aborted and recorded as over budget
+COMPRESSION_TIMEOUT = 90  # 90 seconds budget
+DECOMPRESSION_TIMEOUT = 30  # 30 seconds budget
+PROGRESS_GRACE_TIME = 5.0  # Don't project completion before a run has had this long to warm up
+PROJECTION_MARGIN = 1.5  # Abort early once the projected time exceeds the budget by 50%
+TEST_FILE_SIZE = 300 * 1024 * 1024  # 300MB test file size
+CORPUS_SEED = 0  # Seed for the generated corpus, so every run sees the same bytes
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1MB reads when streaming data through the harness
+PIPE_BUFFER_SIZE = 1024 * 1024  # Kernel buffer of the codec stdin/stdout pipes (default is 64KB)
+TIMESERIES_INTERVAL = 0.05  # Seconds between bytes-in/bytes-out samples of a running codec
+HASH_QUEUE_DEPTH = 64  # Max chunks buffered between the stdout reader and the hasher
+DIGEST_CACHE_FILE = ".sha256_cache.json"  # Input digests keyed by path, size and mtime
+PARALLEL_WORK_DIR = "parallel_work"  # Per-core input copies and work files for --parallel
+INTERFERENCE_THRESHOLD = 1.10  # Flag parallel results >10% slower than the serial calibration
+SWEEP_FINE_ITERATIONS = 4  # Extra iterations for --level-sweep configurations near the Pareto frontier
+SWEEP_FRONTIER_TOLERANCE = 0.05  # "Near" the frontier: within 5% on both ratio and throughput
+
+RSS_SAMPLE_INTERVAL = 0.02  # Seconds between /proc VmHWM samples of a running codec
+
+# Per-process resource usage recorded from os.wait4 (result key suffix -> struct rusage field)
+RUSAGE_FIELDS = {
+    'user_time': 'ru_utime',
+    'sys_time': 'ru_stime',
+    'max_rss_kb': 'ru_maxrss',
+    'voluntary_ctx_switches': 'ru_nvcsw',
+    'involuntary_ctx_switches': 'ru_nivcsw',
+    'inblock': 'ru_inblock',
+    'oublock': 'ru_oublock',
 }
 
-# Add penalty constants at the top
-COMPRESSION_TIMEOUT = 90  # 90 seconds timeout
-DECOMPRESSION_TIMEOUT = 30  # 30 seconds timeout
-TEST_FILE_SIZE = 300 * 1024 * 1024  # 300MB test file size
 
+class BudgetExceeded(Exception):
+    """A codec run was aborted because it could not finish within its time budget"""
 
-def check_sha256sum(file1: str, file2: str) -> bool:
+    def __init__(self, cmd: str, budget: float, elapsed: float, bytes_done: int, projected_time):
+        self.cmd = cmd
+        self.budget = budget
+        self.elapsed = elapsed
+        self.bytes_done = bytes_done
+        self.projected_time = projected_time  # None when no progress could be measured
+        self.mbps = bytes_done / elapsed / 1024 / 1024 if elapsed else 0.0
+        super().__init__(f"exceeded {budget}s budget at {self.mbps:.1f} MB/s after {elapsed:.1f}s")
+
+
+def get_input_digest(file_path: str) -> str:
     """
-    Compare SHA256 checksums of two files using system sha256sum command
+    Get the SHA256 checksum of the input file, hashing it at most once per corpus
+
+    Digests are cached in DIGEST_CACHE_FILE keyed by path, size and mtime,
+    so an unchanged teuthology.log is never re-hashed between iterations or runs.
     """
+    stat = os.stat(file_path)
+    cache_key = f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
     try:
-        # Get checksum of first file
-        # capture_output=True allows us to capture stdout/stderr
-        # text=True returns output as string instead of bytes
-        result1 = subprocess.run(['sha256sum', file1],
-                                 capture_output=True, text=True)
-        if result1.returncode != 0:
-            return False
-        checksum1 = result1.stdout.split()[0]
+        with open(DIGEST_CACHE_FILE, 'r') as f:
+            digest_cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        digest_cache = {}
+
+    if cache_key in digest_cache:
+        return digest_cache[cache_key]
 
-        # Get checksum of second file
-        # capture_output=True allows us to capture stdout/stderr
-        # text=True returns output as string instead of bytes
-        result2 = subprocess.run(['sha256sum', file2],
-                                 capture_output=True, text=True)
-        if result2.returncode != 0:
-            return False
-        checksum2 = result2.stdout.split()[0]
+    print(f"Computing SHA256 of {file_path}...")
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(STREAM_CHUNK_SIZE):
+            digest.update(chunk)
 
-        return checksum1 == checksum2
+    digest_cache[cache_key] = digest.hexdigest()
+    with open(DIGEST_CACHE_FILE, 'w') as f:
+        json.dump(digest_cache, f, indent=2)
+    return digest_cache[cache_key]
 
-    except Exception as e:
-        print(f"Error checking SHA256: {e}")
-        return False
+
+def track_peak_rss(process: subprocess.Popen):
+    """
+    Sample a codec's peak RSS from /proc/<pid>/status VmHWM while it runs
+
+    ru_maxrss of a child spawned from Python never drops below the harness's
+    own peak RSS (the kernel carries the pre-exec high-water mark over), so
+    the sampled VmHWM is what gets recorded. Sampling starts as soon as the
+    codec is started and skips the child while it is still the harness's
+    image (before exec). Returns peak(): it stops sampling and returns the
+    highest VmHWM in KB, or 0 if the codec exited before the first sample.
+    """
+    harness_exe = os.readlink('/proc/self/exe')
+    peak_kb = [0]
+    reaped = threading.Event()
+
+    def sample():
+        status_path = f"/proc/{process.pid}/status"
+        while True:
+            try:
+                if os.readlink(f"/proc/{process.pid}/exe") != harness_exe:
+                    with open(status_path, 'r') as f:
+                        for line in f:
+                            if line.startswith('VmHWM:'):
+                                peak_kb[0] = max(peak_kb[0], int(line.split()[1]))
+                                break
+            except OSError:
+                return  # Exited (a zombie has no exe or memory map left)
+            if reaped.wait(RSS_SAMPLE_INTERVAL):
+                return
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    def peak():
+        reaped.set()
+        sampler.join()
+        return peak_kb[0]
+
+    return peak
+
+
+def wait_rusage(process: subprocess.Popen, peak_rss=None) -> dict:
+    """
+    Reap a codec process with os.wait4 and return its resource usage
+
+    Sets process.returncode so Popen never tries to reap the pid again.
+    peak_rss is the process's track_peak_rss(); its sample replaces
+    ru_maxrss, which is only an upper bound (it includes the harness's own
+    peak) and is kept only when there is no sample.
+    """
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    usage = {name: getattr(rusage, field) for name, field in RUSAGE_FIELDS.items()}
+    sampled_peak_kb = peak_rss() if peak_rss else 0
+    if sampled_peak_kb:
+        usage['max_rss_kb'] = sampled_peak_kb
+    return usage
+
+
+def set_pipe_size(pipe) -> None:
+    """Grow a pipe's kernel buffer to PIPE_BUFFER_SIZE (best effort, capped by fs.pipe-max-size)"""
+    try:
+        fcntl.fcntl(pipe.fileno(), fcntl.F_SETPIPE_SZ, PIPE_BUFFER_SIZE)
+    except OSError:
+        pass
 
 
-def flush_cache(file_path: str) -> bool:
+def start_codec(cmd: str, input_file: str, traffic: dict, cpu=None, direct: bool = False, cgroup=None):
     """
-    Flush file from cache using vmtouch
+    Start a codec process with both stdin and stdout relayed through the harness
 
+    A feeder thread streams input_file into the codec's stdin, read normally
+    or, with direct, with O_DIRECT, and counts the bytes in traffic['in'].
+    The caller reads process.stdout and counts traffic['out'].
+    cgroup is the run cgroup enforcing MEMORY_LIMIT, if one is used.
+    Returns (process, feeder thread).
     """
+    if direct:
+        # Fail here rather than in the feeder if the filesystem rejects O_DIRECT
+        os.close(os.open(input_file, os.O_RDONLY | os.O_DIRECT))
+
+    process = subprocess.Popen(
+        codec_argv(cmd, cpu, cgroup), stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    set_pipe_size(process.stdin)
+    set_pipe_size(process.stdout)
+
+    def read_chunks():
+        with open(input_file, 'rb', buffering=0) as infile:
+            while chunk := infile.read(STREAM_CHUNK_SIZE):
+                yield chunk
+
+    def feed():
+        chunks = cache_control.direct_chunks(input_file, STREAM_CHUNK_SIZE) if direct else read_chunks()
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+                traffic['in'] += len(chunk)
+            process.stdin.close()
+        except BrokenPipeError:
+            pass  # The codec exited early (failed or was killed over budget)
+
+    feeder = threading.Thread(target=feed)
+    feeder.start()
+    return process, feeder
+
+
+def codec_bytes_read(pid: int):
+    """Bytes a running codec has read so far (rchar of /proc/<pid>/io), or None if unavailable"""
     try:
-        # capture_output=True allows us to capture stdout/stderr
-        # text=True returns output as string instead of bytes
-        # Evict the file from cache!
-        subprocess.run(
-            ['vmtouch', '-e', file_path],
-            capture_output=True, check=True
+        with open(f"/proc/{pid}/io", 'r') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def monitor_codec(process: subprocess.Popen, cmd: str, budget: float, traffic: dict,
+                  progress, total_bytes: int):
+    """
+    Sample a running codec's throughput and kill it once it cannot finish within its budget
+
+    Every TIMESERIES_INTERVAL the bytes relayed in and out are appended to a
+    time series as [seconds, bytes_in, bytes_out]. progress() returns the
+    bytes done towards total_bytes, or None when that cannot be measured:
+    after PROGRESS_GRACE_TIME the completion time is projected from the
+    average rate, and a run projected past
+    budget * PROJECTION_MARGIN is killed right away instead of wasting the
+    rest of its budget; any run still going when the budget is spent is
+    killed as well.
+
+    Returns (stop, verdict, series): call stop() once the process has been
+    reaped, which adds the final sample; verdict then holds the
+    BudgetExceeded if the monitor killed the codec.
+    """
+    start_time = time.perf_counter()
+    stopped = threading.Event()
+    verdict = []
+    series = []
+    last_done = [0]
+
+    def sample():
+        elapsed = time.perf_counter() - start_time
+        series.append([elapsed, traffic['in'], traffic['out']])
+        return elapsed
+
+    def watch():
+        while not stopped.wait(TIMESERIES_INTERVAL):
+            elapsed = sample()
+            done = progress()
+            if done is not None:
+                last_done[0] = done
+            projected = elapsed * total_bytes / done if done else None
+            if elapsed >= budget or (
+                elapsed >= PROGRESS_GRACE_TIME and projected is not None
+                and projected > budget * PROJECTION_MARGIN
+            ):
+                verdict.append(BudgetExceeded(cmd, budget, elapsed, last_done[0], projected))
+                process.kill()
+                return
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+
+    def stop():
+        stopped.set()
+        watcher.join()
+        sample()
+
+    return stop, verdict, series
+
+
+def relay_codec(cmd: str, input_file: str, timeout: float, progress: str, total_bytes: int, on_output,
+                cpu=None, direct: bool = False):
+    """
+    Run a codec with its input and output relayed through the harness
+
+    on_output(chunk) receives the codec's stdout as it arrives. The timed
+    window ends when the codec has been reaped after its stdout hit EOF.
+
+    Under MEMORY_LIMIT the codec runs in its own cgroup when the host
+    allows it, and the cgroup's peak memory and OOM kills join the rusage.
+
+    Returns (returncode, elapsed time, stderr, rusage, throughput) where
+    throughput holds the time series and the time to the first output byte.
+    Raises BudgetExceeded (after killing the process) when over budget.
+    """
+    traffic = {'in': 0, 'out': 0}
+    first_output_time = None
+    stderr_output = []
+    cgroup = None
+    if MEMORY_LIMIT and memory_limit.cgroup_parent():
+        cgroup = memory_limit.create_run_cgroup(MEMORY_LIMIT)
+
+    start_time = time.perf_counter()
+    process, feeder = start_codec(cmd, input_file, traffic, cpu, direct, cgroup)
+    if progress == 'in':
+        # What the codec has read, not what was relayed: that sits in the 1MB pipe buffer first
+        measure = lambda: codec_bytes_read(process.pid)
+    else:
+        measure = lambda: traffic[progress]
+    stop_monitor, over_budget, series = monitor_codec(process, cmd, timeout, traffic, measure, total_bytes)
+    peak_rss = track_peak_rss(process)
+    stderr_reader = threading.Thread(
+        target=lambda: stderr_output.append(process.stderr.read())
+    )
+    stderr_reader.start()
+    try:
+        stdout_fd = process.stdout.fileno()
+        while chunk := os.read(stdout_fd, STREAM_CHUNK_SIZE):
+            if first_output_time is None:
+                first_output_time = time.perf_counter() - start_time
+            traffic['out'] += len(chunk)
+            on_output(chunk)
+        rusage = wait_rusage(process, peak_rss)
+        elapsed = time.perf_counter() - start_time
+        if cgroup:
+            usage = memory_limit.cgroup_usage(cgroup)
+            rusage.update({f'cgroup_{name}': value for name, value in usage.items()})
+    except BaseException:
+        # A failing on_output or Ctrl-C: the joins below would wait for the codec to finish
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        stop_monitor()
+        peak_rss()
+        stderr_reader.join()
+        feeder.join()
+        process.stdout.close()
+        process.stderr.close()
+        if cgroup:
+            memory_limit.remove_cgroup(cgroup)
+
+    if over_budget:
+        raise over_budget[0]
+
+    throughput = {'timeseries': series, 'ttfb': first_output_time}
+    return process.returncode, elapsed, stderr_output[0], rusage, throughput
+
+
+def run_compression(cmd: str, input_file: str, compressed_file: str, timeout: float, cpu=None,
+                    direct: bool = False):
+    """
+    Run the compressor from input_file into compressed_file
+
+    cpu pins the compressor to a single core (see codec_argv); direct feeds
+    the input through an O_DIRECT reader (see start_codec). Progress is the
+    input the compressor has read itself (not what the harness has relayed
+    into its pipe), so the budget monitor can project the completion time.
+
+    Returns (returncode, compression_time, stderr, rusage, throughput).
+    Raises BudgetExceeded (after killing the process) when over budget.
+    """
+    with open(compressed_file, 'wb') as outfile:
+        return relay_codec(
+            cmd, input_file, timeout, 'in', os.path.getsize(input_file), outfile.write, cpu, direct
         )
-        # Check if the file is flushed
-        result = subprocess.run(
-            ['vmtouch', file_path],
-            capture_output=True, text=True
+
+
+def run_decompression(decompress_cmd: str, compressed_file: str, timeout: float, expected_size: int,
+                      cpu=None, direct: bool = False):
+    """
+    Run the decompressor and hash its stdout as it streams through the harness
+
+    Nothing is written to disk. The pipe reader hands chunks to a hashing
+    thread, so the timed window ends when the decompressor's output hits EOF
+    rather than when the hasher catches up.
+
+    cpu pins the decompressor to a single core (see codec_argv); direct feeds
+    the compressed file through an O_DIRECT reader (see start_codec).
+    Progress is the output streamed so far against expected_size, so the
+    budget monitor can project the completion time.
+
+    Returns (returncode, decompression_time, sha256 hex digest, stderr, rusage, throughput).
+    Raises BudgetExceeded (after killing the process) when over budget.
+    """
+    chunks = queue.Queue(maxsize=HASH_QUEUE_DEPTH)
+    digest = hashlib.sha256()
+
+    def hash_chunks():
+        while (chunk := chunks.get()) is not None:
+            digest.update(chunk)
+
+    hasher = threading.Thread(target=hash_chunks)
+    hasher.start()
+    try:
+        returncode, decompression_time, stderr, rusage, throughput = relay_codec(
+            decompress_cmd, compressed_file, timeout, 'out', expected_size, chunks.put, cpu, direct
         )
-        # Parse vmtouch output to verify cache is flushed
-        if "Resident Pages: 0/" in result.stdout:
-            print(f"Cache flushed for {file_path}")
-            return True
-        else:
-            print(f"Cache not flushed for {file_path}")
-            return False
-    except subprocess.CalledProcessError as e:
-        print(f"Warning: Cache flush failed: {e}")
-        return False
+    finally:
+        chunks.put(None)
+        hasher.join()
+
+    return returncode, decompression_time, digest.hexdigest(), stderr, rusage, throughput
+
+
+def prepare_cache(file_path: str):
+    """
+    Put a file into the CACHE_MODE page-cache state and verify it with mincore
+
+    Returns the fraction of the file's pages resident afterwards, or None if
+    the cache could not be controlled.
+    """
+    try:
+        resident = cache_control.prepare(file_path, CACHE_MODE)
+    except OSError as e:
+        print(f"Warning: Cache preparation failed: {e}")
+        return None
+    expected = 1.0 if CACHE_MODE == 'warm' else 0.0
+    if resident == expected:
+        print(f"Cache {CACHE_MODE} for {file_path}")
+    else:
+        print(f"Cache not {CACHE_MODE} for {file_path} ({resident:.0%} resident)")
+    return resident
 
 
 def get_file_size(file_path: str) -> int:
@@ -138,357 +445,1072 @@ def get_file_size(file_path: str) -> int:
     return os.path.getsize(file_path)
 
 
-def generate_log_line():
-    log_lines = [
-        f"2025-08-15 10:30:45 INFO: Starting teuthology job {random.randint(10000, 99999)}\n",
-        f"2025-08-15 10:30:46 DEBUG: Connecting to cluster nodes {random.randint(10000, 99999)}\n",
-        f"2025-08-15 10:30:47 ERROR: Connection timeout on node-{random.randint(1, 10)}\n",
-        f"2025-08-15 10:30:48 WARN: Retrying connection to node-{random.randint(1, 10)}\n",
-        "2025-08-15 10:30:49 INFO: Successfully connected to all nodes\n"
-    ]
-    return random.choice(log_lines)
+def create_test_file(size: int, seed: int, profile_file=None) -> Path:
+    """
+    Return the benchmark input file
+
+    Uses teuthology.log if it exists (e.g. a real log copied into the container),
+    otherwise a seeded generated corpus of the given size from the corpus cache.
+    """
+    if os.path.exists("teuthology.log"):
+        return Path("teuthology.log")  # File already exists, don't overwrite
+
+    profile = corpus_generator.load_profile(profile_file)
+    return corpus_generator.get_corpus(size, seed, profile)
 
 
-def create_test_file():
+def prepare_transform(name: str, input_file: Path, input_digest: str) -> dict:
     """
-    Create a test file of size
-    TEST_FILE_SIZE if teuthology.log doesn't exist
+    Apply a log_transform.py transform to the input once and time both directions
+
+    Returns the transformed file, its digest and the stage's own measurements;
+    while a pass runs with it as TRANSFORM, the codecs compress the transformed
+    file and summarize_iterations adds the stage to their times.
     """
+    os.makedirs(corpus_generator.CORPUS_CACHE_DIR, exist_ok=True)
+    transformed_file = Path(corpus_generator.CORPUS_CACHE_DIR) / f"{name}-{input_digest[:16]}"
+    print(f"Applying the {name} transform...")
+    cpu_start = time.process_time()
+    encode_time = log_transform.encode_file(str(input_file), str(transformed_file))
+    encode_cpu_time = time.process_time() - cpu_start
+    cpu_start = time.process_time()
+    decode_time, decoded_digest = log_transform.decode_digest(str(transformed_file))
+    decode_cpu_time = time.process_time() - cpu_start
+    original_size = get_file_size(str(input_file))
+    transform = {
+        'name': name,
+        'file': transformed_file,
+        'digest': get_input_digest(str(transformed_file)),
+        'original_digest': input_digest,
+        'transformed_size': get_file_size(str(transformed_file)),
+        'encode_time': encode_time,
+        'decode_time': decode_time,
+        'encode_cpu_time': encode_cpu_time,
+        'decode_cpu_time': decode_cpu_time,
+        'valid': decoded_digest == input_digest,
+    }
+    size_mb = original_size / 1024 / 1024
+    print(f"Transform encode: {encode_time:.3f}s ({size_mb / encode_time:.1f} MB/s), "
+          f"decode: {decode_time:.3f}s ({size_mb / decode_time:.1f} MB/s), "
+          f"size: {transform['transformed_size']} ({transform['transformed_size'] / original_size:.3f})")
+    print("Transform verification passed" if transform['valid'] else "Transform verification failed")
+    return transform
+
+
+def parse_cache_modes(value: str) -> list:
+    """Parse a comma-separated list of cache_control.CACHE_MODES"""
+    modes = [mode.strip() for mode in value.split(',') if mode.strip()]
+    for mode in modes:
+        if mode not in cache_control.CACHE_MODES:
+            raise argparse.ArgumentTypeError(
+                f"invalid cache mode {mode!r} (choose from {', '.join(cache_control.CACHE_MODES)})"
+            )
+    return modes
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Run the compression benchmark'
+    )
+    parser.add_argument('--corpus-size', type=corpus_generator.parse_size, default=TEST_FILE_SIZE,
+                        help='Size of the generated corpus when teuthology.log is absent (e.g. 10MB, 10GB)')
+    parser.add_argument('--seed', type=int, default=CORPUS_SEED,
+                        help='Seed for the generated corpus')
+    parser.add_argument('--corpus-profile',
+                        help='JSON file overriding the corpus content profile (see corpus_generator.py)')
+    parser.add_argument('--codecs', default=codec_registry.CODEC_REGISTRY,
+                        help='Codec registry file: command templates, levels and parameter grids '
+                             '(default: codecs.json, or $COMPBENCH_CODECS)')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Run single-threaded algorithms concurrently, one job pinned per core')
+    parser.add_argument('--thread-sweep', action='store_true',
+                        help='Only run the multi-threaded codecs, once per worker count from 1 to the cpuset size')
+    parser.add_argument('--max-threads', type=int,
+                        help='Upper bound for --thread-sweep (default: cores in the cpuset)')
+    parser.add_argument('--level-sweep', action='store_true',
+                        help='Sweep every supported level of every CLI codec (coarse-to-fine around the Pareto frontier)')
+    parser.add_argument('--iterations', type=int, default=ITERATIONS,
+                        help=f'Iterations per configuration (default: {ITERATIONS})')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Iterate each configuration until its confidence interval is tight enough')
+    parser.add_argument('--ci-target', type=float, default=ADAPTIVE_CI_TARGET,
+                        help='--adaptive: target CI half-width as a fraction of the mean (default: 0.05)')
+    parser.add_argument('--time-budget', type=float, default=ADAPTIVE_TIME_BUDGET,
+                        help='--adaptive: seconds per configuration before giving up on the CI target')
+    parser.add_argument('--backend', choices=['cli', 'library', 'both'], default='cli',
+                        help='Benchmark the CLI tools, the in-process library bindings, or both')
+    parser.add_argument('--chunk-size', type=corpus_generator.parse_size,
+                        default=library_backend.LIBRARY_CHUNK_SIZE,
+                        help='Chunk size fed to each library compress() call (e.g. 64KB, 4MB)')
+    parser.add_argument('--store', default=result_store.RESULT_STORE,
+                        help=f'SQLite result store to resume from and record into (default: {result_store.RESULT_STORE})')
+    parser.add_argument('--cache-modes', type=parse_cache_modes, default=[CACHE_MODE],
+                        help='Comma-separated page-cache states to measure: cold (evicted), warm (pre-faulted), '
+                             'direct (O_DIRECT reads); each mode is a separate pass (default: cold)')
+    parser.add_argument('--memory-limit', type=corpus_generator.parse_size,
+                        help='Memory ceiling of every CLI codec run, e.g. 512MB (cgroup memory.max when '
+                             'available, otherwise RLIMIT_DATA)')
+    parser.add_argument('--memory-sweep', action='store_true',
+                        help='Sweep window/dictionary/block sizes: zstd --long, xz dict, brotli -w/--large_window, '
+                             'lz4 -B')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Discard stored samples of the configurations being run instead of resuming')
+    parser.add_argument('--coordinator', metavar='HOST:PORT',
+                        help='Serve the CLI job list to worker agents (benchmark_worker.py) instead of running it; '
+                             'every host class runs the full matrix')
+    parser.add_argument('--min-workers', type=int, default=1,
+                        help='--coordinator: workers that must register before the run can finish (default: 1)')
+    parser.add_argument('--transform', choices=log_transform.TRANSFORMS,
+                        help='Also run every configuration behind this reversible log-aware transform '
+                             '(see log_transform.py) and report both')
+    return parser.parse_args()
+
+
+def run_cgroup_usage(rusage: dict):
+    """The run cgroup's usage joined to a codec run's rusage (see relay_codec), or None under RLIMIT_DATA"""
+    usage = {name[len('cgroup_'):]: value for name, value in rusage.items() if name.startswith('cgroup_')}
+    return usage or None
+
+
+def codec_argv(cmd: str, cpu=None, cgroup=None) -> list:
+    """
+    Split a codec command line, pinning it to one core with taskset when cpu is given
 
-    if os.path.exists("teuthology.log"):
-        return  # File already exists, don't overwrite
-
-    print(f"Creating test file of size {TEST_FILE_SIZE / 1024 / 1024:.1f} MB...")
-    target_size = TEST_FILE_SIZE
-
-    with open("teuthology.log", "w") as f:
-        written = 0
-        while written < target_size:
-            for line in generate_log_line():
-                f.write(line)
-                written += len(line)
-                if written >= target_size:
-                    break
+    Under MEMORY_LIMIT the codec is started in its run cgroup, or through
+    prlimit when no cgroup is available (see memory_limit.limit_argv).
+    """
+    argv = cmd.split()
+    if cpu is not None:
+        argv = ['taskset', '-c', str(cpu)] + argv
+    if MEMORY_LIMIT:
+        argv = memory_limit.limit_argv(argv, MEMORY_LIMIT, cgroup)
+    return argv
 
-    size_mb = os.path.getsize("teuthology.log") / 1024 / 1024
-    print(f"Created teuthology.log: {size_mb:.1f} MB")
 
+def throughput_metrics(phase: str, throughput: dict) -> dict:
+    """
+    Iteration fields derived from a codec run's throughput time series
 
-def main():
-    # Create test file if it doesn't exist
-    create_test_file()
+    Everything is measured on the output side, which is what a reader
+    streaming the result waits on (compressors may swallow their whole input
+    into a block buffer at once). The steady-state rate is scaled by
+    bytes in / bytes out so it is always MB/s of uncompressed data.
+    """
+    series = throughput['timeseries']
+    rate = sample_stats.steady_state_rate(series, 2)
+    if rate and phase == 'compression':
+        rate *= series[-1][1] / series[-1][2]
+    stalls = sample_stats.stall_intervals(series, 2)
+    return {
+        f'{phase}_ttfb': throughput['ttfb'],
+        f'{phase}_steady_mbps': rate / 1024 / 1024 if rate else None,
+        f'{phase}_stalls': len(stalls),
+        f'{phase}_stall_time': sum(end - start for start, end in stalls),
+        f'{phase}_timeseries': series,
+    }
 
-    # Use teuthology.log as the input file (should be present in container)
-    input_file = Path("teuthology.log")
-    if not input_file.exists():
-        print("Error: teuthology.log not found in current directory!")
-        sys.exit(1)
 
-    print(f"Starting benchmark with input file: {input_file}")
+def exceeded_record(phase: str, exceeded: BudgetExceeded) -> dict:
+    """Iteration fields describing a run aborted over budget"""
+    return {
+        'exceeded_resource': 'time',
+        'exceeded_phase': phase,
+        'exceeded_budget': exceeded.budget,
+        'exceeded_after': exceeded.elapsed,
+        'exceeded_mbps': exceeded.mbps,
+        'projected_time': exceeded.projected_time,
+    }
+
+
+def memory_exceeded_record(phase: str, elapsed: float, throughput: dict) -> dict:
+    """Iteration fields of a codec run that died of the MEMORY_LIMIT ceiling"""
+    series = throughput['timeseries']
+    done = series[-1][1 if phase == 'compression' else 2] if series else 0
+    return {
+        'exceeded_resource': 'memory',
+        'exceeded_phase': phase,
+        'exceeded_budget': MEMORY_LIMIT,
+        'exceeded_after': elapsed,
+        'exceeded_mbps': done / elapsed / 1024 / 1024 if elapsed else 0.0,
+        'projected_time': None,
+    }
+
+
+def run_iteration(algorithm: str, config: dict, level_name: str, level_value, iteration: int,
+                  input_file: Path, input_digest: str, work_dir: str = '.', cpu=None, log_prefix: str = ''):
+    """
+    Compress and decompress the input once and return this iteration's data
+
+    cpu pins both codec processes to a single core; work_dir holds the
+    compressed file so concurrent jobs never share work files.
+    Returns None if the iteration failed before producing a measurement.
+    A run aborted over budget, or killed by MEMORY_LIMIT, returns a
+    'budget_exceeded' record with the throughput it managed instead of
+    compression/decompression times.
+    """
     original_size = get_file_size(str(input_file))
 
-    TIMEOUT_PENALTY_TIME = 9999.0  # Large penalty time for timeouts
-    TIMEOUT_PENALTY_SIZE = original_size * 2  # Worse than no compression
+    compression_time = None
+    decompression_time = None
+    compressed_size = None
+    sha256_valid = False
+    compressed_file = None
+    compression_usage = {}
+    decompression_usage = {}
+    cache_state = {'cache_state': CACHE_MODE}
+    direct = CACHE_MODE == 'direct'
+    budget_exceeded = {}
+
+    def measurement():
+        # This iteration's data
+        if budget_exceeded:
+            return {
+                'budget_exceeded': True,
+                **budget_exceeded,
+                'sha256_valid': False,
+                'cpu': cpu,
+                **cache_state,
+                **({'compression_time': compression_time, 'compressed_size': compressed_size,
+                    **compression_usage} if compressed_size else {}),
+            }
+        if compression_time and decompression_time and compressed_size:
+            return {
+                'compression_time': compression_time,
+                'decompression_time': decompression_time,
+                'compressed_size': compressed_size,
+                'sha256_valid': sha256_valid,
+                'cpu': cpu,
+                **cache_state,
+                **compression_usage,
+                **decompression_usage,
+            }
+        return None
 
-    print(f"Original file size: {original_size}")
+    try:
+        # Compression
+        try:
+            cache_state['compression_input_resident'] = prepare_cache(str(input_file))
+            cmd = config['compress_cmd'].format(level=level_value)
+            compressed_file = os.path.join(
+                work_dir, f"{algorithm}_{level_name}_iter{iteration}_compressed{config['extension']}"
+            )
+
+            try:
+                returncode, compression_time, stderr, rusage, throughput = run_compression(
+                    cmd, str(input_file), compressed_file, COMPRESSION_TIMEOUT, cpu, direct
+                )
+                compression_usage = {f'compression_{name}': value for name, value in rusage.items()}
+                compression_usage.update(throughput_metrics('compression', throughput))
+
+                if returncode != 0:
+                    if MEMORY_LIMIT and memory_limit.exhausted(returncode, stderr, run_cgroup_usage(rusage)):
+                        print(f"{log_prefix}Compression ran out of memory under the limit: {stderr.decode().strip()}")
+                        budget_exceeded.update(memory_exceeded_record('compression', compression_time, throughput))
+                        return measurement()
+                    print(f"{log_prefix}Compression failed: {stderr.decode()}")
+                    return None
+
+                compressed_size = get_file_size(compressed_file)
+                print(f"{log_prefix}Compression Time: {compression_time:.3f}s, Size: {compressed_size}")
+
+            except BudgetExceeded as e:
+                print(f"{log_prefix}Compression {e} - aborted")
+                budget_exceeded.update(exceeded_record('compression', e))
+                # Skip decompression section entirely
+                return measurement()
+
+        except Exception as e:
+            print(f"{log_prefix}Compression exception: {e}")
+            return None
+
+        # Decompression
+        # (only runs if compression succeeded)
+        try:
+            cache_state['decompression_input_resident'] = prepare_cache(compressed_file)
+            decompress_cmd = config['decompress_cmd'].format(level=level_value)
+
+            try:
+                returncode, decompression_time, output_digest, stderr, rusage, throughput = run_decompression(
+                    decompress_cmd, compressed_file, DECOMPRESSION_TIMEOUT, original_size, cpu, direct
+                )
+                decompression_usage = {f'decompression_{name}': value for name, value in rusage.items()}
+                decompression_usage.update(throughput_metrics('decompression', throughput))
+
+                if returncode != 0:
+                    if MEMORY_LIMIT and memory_limit.exhausted(returncode, stderr, run_cgroup_usage(rusage)):
+                        print(f"{log_prefix}Decompression ran out of memory under the limit: {stderr.decode().strip()}")
+                        budget_exceeded.update(memory_exceeded_record('decompression', decompression_time, throughput))
+                        return measurement()
+                    print(f"{log_prefix}Decompression failed: {stderr.decode()}")
+                    return measurement()
+
+                # Compare the streamed output digest against the cached input digest
+                if output_digest == input_digest:
+                    sha256_valid = True
+                    print(f"{log_prefix}Verification passed")
+                else:
+                    print(f"{log_prefix}Verification failed")
+
+            except BudgetExceeded as e:
+                print(f"{log_prefix}Decompression {e} - aborted")
+                budget_exceeded.update(exceeded_record('decompression', e))
+                return measurement()
+
+            print(f"{log_prefix}Decompression Time: {decompression_time:.3f}s")
+
+        except Exception as e:
+            print(f"{log_prefix}Decompression exception: {e}")
+
+    finally:
+        # Clean up files safely regardless of success or failure
+        if compressed_file and os.path.exists(compressed_file):
+            os.unlink(compressed_file)
+
+    return measurement()
+
+
+def summarize_iterations(algorithm: str, is_threaded: bool, level_name: str, level_value,
+                         iteration_data: list, original_size: int, config_key: str,
+                         backend: str = 'cli', threads: int = None) -> dict:
+    """
+    Average one algorithm/level combination's iterations into a result record
 
-    # Initialize results collection - now collect raw data per iteration
-    raw_results = []
+    Iterations aborted over budget (time or MEMORY_LIMIT) are left out of
+    the averages. When every iteration was, the record is marked
+    budget_exceeded and carries the best throughput reached and a status
+    line instead of times, so it never enters the score normalization.
+    """
+    samples = iteration_data
+    exceeded = [d for d in samples if d.get('budget_exceeded')]
+    iteration_data = [d for d in samples if not d.get('budget_exceeded')]
+
+    result = {
+        'config_key': config_key,
+        'algorithm': algorithm,
+        'backend': backend,
+        'is_threaded': is_threaded,
+        'level_name': level_name,
+        'level_value': level_value,
+        'cache_state': samples[0].get('cache_state', 'cold'),
+        'iterations': len(iteration_data),
+        'original_size': original_size,
+    }
+    if threads is not None:
+        result['threads'] = threads
+    if TRANSFORM:
+        result['transform'] = TRANSFORM['name']
+    if MEMORY_LIMIT and backend == 'cli':
+        result['memory_limit'] = MEMORY_LIMIT
+        result['memory_enforcement'] = memory_limit.enforcement()
+
+    if not iteration_data:
+        best = max(exceeded, key=lambda d: d['exceeded_mbps'])
+        resource_name = best.get('exceeded_resource', 'time')
+        if resource_name == 'memory':
+            status = (f"exceeded {best['exceeded_budget'] / 1024 / 1024:.0f} MB "
+                      f"{memory_limit.LIMIT_KINDS[result['memory_enforcement']]} "
+                      f"during {best['exceeded_phase']}")
+        else:
+            status = f"exceeded {best['exceeded_phase']} budget at {best['exceeded_mbps']:.1f} MB/s"
+        result.update({
+            'budget_exceeded': True,
+            'exceeded_resource': resource_name,
+            'exceeded_phase': best['exceeded_phase'],
+            'exceeded_budget': best['exceeded_budget'],
+            'exceeded_mbps': best['exceeded_mbps'],
+            'projected_time': best['projected_time'],
+            'status': status,
+            'all_sha256_valid': False,
+            'samples': samples,
+        })
+        return result
+
+    avg_compression_time = sum(d['compression_time'] for d in iteration_data) / len(iteration_data)
+    avg_decompression_time = sum(d['decompression_time'] for d in iteration_data) / len(iteration_data)
+    avg_compressed_size = sum(d['compressed_size'] for d in iteration_data) / len(iteration_data)
+    avg_compression_ratio = avg_compressed_size / original_size
+    sha256_valid = all(d['sha256_valid'] for d in iteration_data)
+    if TRANSFORM:
+        # End to end: the transform runs before compression and after decompression
+        result.update({
+            'codec_compression_time': avg_compression_time,
+            'codec_decompression_time': avg_decompression_time,
+            'transformed_size': TRANSFORM['transformed_size'],
+            'transform_encode_time': TRANSFORM['encode_time'],
+            'transform_decode_time': TRANSFORM['decode_time'],
+            'transform_encode_cpu_time': TRANSFORM['encode_cpu_time'],
+            'transform_decode_cpu_time': TRANSFORM['decode_cpu_time'],
+            'transform_valid': TRANSFORM['valid'],
+        })
+        avg_compression_time += TRANSFORM['encode_time']
+        avg_decompression_time += TRANSFORM['decode_time']
+        sha256_valid = sha256_valid and TRANSFORM['valid']
+
+    result.update({
+        'avg_compressed_size': avg_compressed_size,
+        'avg_compression_ratio': avg_compression_ratio,
+        'avg_compression_time': avg_compression_time,
+        'avg_decompression_time': avg_decompression_time,
+        'all_sha256_valid': sha256_valid,
+        # Cores the measurements were pinned to ("" when run on the full cpuset)
+        'cpus': ';'.join(str(d['cpu']) for d in iteration_data if d['cpu'] is not None),
+    })
+    if exceeded:
+        result['exceeded_iterations'] = len(exceeded)
+    result.update(summarize_rusage(iteration_data, is_threaded, original_size, threads))
+    result.update(summarize_throughput(iteration_data))
+    result.update(sample_stats.summarize_samples(
+        iteration_data, ('compression_time', 'decompression_time', 'compressed_size')
+    ))
+    # Raw per-iteration samples (JSON only; the CSV export writes them to a separate file)
+    result['samples'] = samples
+    return result
+
+
+def summarize_throughput(iteration_data: list) -> dict:
+    """Average the time-to-first-byte, steady-state rate and stalls of the relayed codec runs"""
+    summary = {}
+    for phase in ('compression', 'decompression'):
+        for metric in ('ttfb', 'steady_mbps', 'stalls', 'stall_time'):
+            values = [d[f'{phase}_{metric}'] for d in iteration_data if d.get(f'{phase}_{metric}') is not None]
+            if values:
+                summary[f'avg_{phase}_{metric}'] = sum(values) / len(values)
+    return summary
+
+
+def summarize_rusage(iteration_data: list, is_threaded: bool, original_size: int, threads: int = None) -> dict:
+    """
+    Average the per-process resource usage and derive CPU efficiency metrics
 
-    # ALGORITHMS_SINGLE_THREADS
-    print("Testing Single-Threaded Algorithms")
-    for algorithm, config in ALGORITHMS_SINGLE_THREADS.items():
-        print(f"Testing {algorithm}...")
-        for level_name, level_value in config['levels'].items():
-            print(f"Level {level_name} ({level_value}):")
-            iteration_data = []
-
-            for i in range(ITERATIONS):
-                print(f"Iteration {i+1}/{ITERATIONS}...")
-                compression_time = None
-                decompression_time = None
-                compressed_size = None
-                sha256_valid = False
-                compressed_file = None
-                decompressed_file = None
-                try:
-                    # Compression
-                    try:
-                        flush_cache(str(input_file))
-                        cmd = config['compress_cmd'].format(level=level_value)
-                        compressed_file = f"{algorithm}_{level_name}_iter{i}_compressed{config['extension']}"
-
-                        start_time = time.perf_counter()
-                        with open(input_file, 'rb') as infile:
-                            with open(compressed_file, 'wb') as outfile:
-                                process = subprocess.Popen(
-                                    cmd.split(), stdin=infile,
-                                    stdout=outfile,
-                                    stderr=subprocess.PIPE
-                                )
-                                try:
-                                    _, stderr = process.communicate(timeout=COMPRESSION_TIMEOUT)
-                                    compression_time = time.perf_counter() - start_time
-
-                                    if process.returncode != 0:
-                                        print(f"Compression failed: {stderr.decode()}")
-                                        continue
-
-                                    compressed_size = get_file_size(compressed_file)
-                                    print(f"Compression Time: {compression_time:.3f}s, Size: {compressed_size}")
-
-                                except subprocess.TimeoutExpired:
-                                    process.kill()
-                                    process.wait()
-                                    print(f"Compression timeout ({COMPRESSION_TIMEOUT}s) - assigning penalty")
-                                    compression_time = TIMEOUT_PENALTY_TIME
-                                    decompression_time = TIMEOUT_PENALTY_TIME
-                                    compressed_size = TIMEOUT_PENALTY_SIZE
-                                    sha256_valid = False
-                                    # Skip decompression section entirely
-                                    continue
-
-                    except Exception as e:
-                        print(f"Compression exception: {e}")
-                        continue
-
-                    # Decompression
-                    # (only runs if compression succeeded)
-                    try:
-                        flush_cache(compressed_file)
-                        decompressed_file = f"{algorithm}_{level_name}_iter{i}_decompressed.log"
-                        decompress_cmd = config['decompress_cmd'].format(level=level_value)
-
-                        start_time = time.perf_counter()
-                        with open(compressed_file, 'rb') as infile:
-                            with open(decompressed_file, 'wb') as outfile:
-                                process = subprocess.Popen(
-                                    decompress_cmd.split(), stdin=infile,
-                                    stdout=outfile,
-                                    stderr=subprocess.PIPE
-                                )
-                                try:
-                                    _, stderr = process.communicate(timeout=DECOMPRESSION_TIMEOUT)
-                                    decompression_time = time.perf_counter() - start_time
-
-                                    if process.returncode != 0:
-                                        print(f"Decompression failed: {stderr.decode()}")
-                                        continue
-
-                                    # Check sha256sum
-                                    if check_sha256sum(str(input_file), decompressed_file):
-                                        sha256_valid = True
-                                        print("Verification passed")
-                                    else:
-                                        print("Verification failed")
-
-                                except subprocess.TimeoutExpired:
-                                    process.kill()
-                                    process.wait()
-                                    print(f"Decompression timeout ({DECOMPRESSION_TIMEOUT}s) - assigning penalty")
-                                    decompression_time = TIMEOUT_PENALTY_TIME
-                                    sha256_valid = False
-
-                        print(f"Decompression Time: {decompression_time:.3f}s")
-
-                    except Exception as e:
-                        print(f"Decompression exception: {e}")
-
-                finally:
-                    # Clean up files safely regardless of success or failure
-                    if compressed_file and os.path.exists(compressed_file):
-                        os.unlink(compressed_file)
-                    if decompressed_file and os.path.exists(decompressed_file):
-                        os.unlink(decompressed_file)
-                    # Store this iteration's data (including penalties)
-                    if compression_time and decompression_time and compressed_size:
-                        iteration_data.append({
-                            'compression_time': compression_time,
-                            'decompression_time': decompression_time,
-                            'compressed_size': compressed_size,
-                            'sha256_valid': sha256_valid
-                        })
-
-            # Exit the third for-loop; Calculate averages for this algorithm/level combination
-            if iteration_data:
-                avg_compression_time = sum(d['compression_time'] for d in iteration_data) / len(iteration_data)
-                avg_decompression_time = sum(d['decompression_time'] for d in iteration_data) / len(iteration_data)
-                avg_compressed_size = sum(d['compressed_size'] for d in iteration_data) / len(iteration_data)
-                avg_compression_ratio = avg_compressed_size / original_size
-                successful_iterations = len(iteration_data)
-
-                result = {
-                    'algorithm': algorithm,
-                    'is_threaded': False,
-                    'level_name': level_name,
-                    'level_value': level_value,
-                    'iterations': successful_iterations,
-                    'original_size': original_size,
-                    'avg_compressed_size': avg_compressed_size,
-                    'avg_compression_ratio': avg_compression_ratio,
-                    'avg_compression_time': avg_compression_time,
-                    'avg_decompression_time': avg_decompression_time,
-                    'all_sha256_valid': all(d['sha256_valid'] for d in iteration_data),
-                }
-                raw_results.append(result)
-
-    # ALGORITHMS_MULTI_THREADS (same pattern)
-    print("Testing Multi-Threaded Algorithms")
-    for algorithm, config in ALGORITHMS_MULTI_THREADS.items():
-        print(f"Testing {algorithm}...")
-        for level_name, level_value in config['levels'].items():
+    Peak RSS is the maximum over iterations rather than the mean. Parallel
+    efficiency is CPU time / (wall time * cores the codec may use): 1 core
+    for single-threaded codecs, the thread count when one was set, otherwise
+    the whole cpuset for multi-threaded ones.
+    """
+    if threads is not None:
+        cores = threads
+    else:
+        cores = len(os.sched_getaffinity(0)) if is_threaded else 1
+    summary = {}
+    for phase in ('compression', 'decompression'):
+        measured = [d for d in iteration_data if f'{phase}_user_time' in d]
+        if not measured:
+            continue
+        for name in RUSAGE_FIELDS:
+            if f'{phase}_{name}' not in measured[0]:
+                continue  # e.g. peak RSS for in-process library runs
+            values = [d[f'{phase}_{name}'] for d in measured]
+            if name == 'max_rss_kb':
+                summary[f'peak_{phase}_rss_kb'] = max(values)
+            else:
+                summary[f'avg_{phase}_{name}'] = sum(values) / len(values)
+        # Charged to the run cgroup under --memory-limit (RSS plus page tables, kernel buffers...)
+        cgroup_peaks = [d[f'{phase}_cgroup_memory_peak_kb'] for d in measured
+                        if f'{phase}_cgroup_memory_peak_kb' in d]
+        if cgroup_peaks:
+            summary[f'peak_{phase}_cgroup_memory_kb'] = max(cgroup_peaks)
+
+        cpu_time = summary[f'avg_{phase}_user_time'] + summary[f'avg_{phase}_sys_time']
+        wall_time = sum(d[f'{phase}_time'] for d in measured) / len(measured)
+        summary[f'{phase}_cpu_seconds_per_gb'] = cpu_time / (original_size / 1024 ** 3)
+        summary[f'{phase}_cpu_utilization'] = cpu_time / wall_time
+        summary[f'{phase}_parallel_efficiency'] = cpu_time / (wall_time * cores)
+    return summary
+
+
+def store_identity(input_digest: str, command_line: str) -> tuple:
+    """
+    The (corpus hash, command line) a configuration is stored under
+
+    Behind a transform the corpus is still the original log; the transform
+    becomes part of the command line so the pipelines get separate keys.
+    """
+    if TRANSFORM:
+        return TRANSFORM['original_digest'], f"{TRANSFORM['name']} | {command_line}"
+    return input_digest, command_line
+
+
+def register_config(algorithm: str, config: dict, level_name: str, level_value, input_digest: str,
+                    threads: int = None, environment: dict = None, cache_state: str = None) -> str:
+    """
+    Register a CLI codec configuration in the result store and return its key
+
+    The key covers the corpus, the codec binary's version, both command lines,
+    the page-cache mode, the memory limit and the host's CPU model and cpuset.
+    environment is a remote worker's fingerprint (see distributed.py) when
+    the configuration runs there rather than on this host, and cache_state
+    its page-cache mode (default: CACHE_MODE).
+    With --fresh, samples stored for the configuration by earlier runs are discarded.
+    """
+    compress_cmd = config['compress_cmd'].format(level=level_value)
+    decompress_cmd = config['decompress_cmd'].format(level=level_value)
+    corpus_hash, command_line = store_identity(input_digest, f"{compress_cmd} | {decompress_cmd}")
+    tool = compress_cmd.split()[0]
+    config_key = result_store.register_config(
+        STORE, corpus_hash,
+        environment['tool_versions'][tool] if environment else result_store.tool_version(tool),
+        command_line, algorithm, 'cli', level_name, level_value, threads,
+        cache_state=cache_state or CACHE_MODE, memory_limit=MEMORY_LIMIT, env=environment
+    )
+    if FRESH:
+        result_store.clear_measurements(STORE, config_key)
+    return config_key
+
+
+def ci_half_width(iteration_data: list) -> float:
+    """Widest relative bootstrap CI half-width of the mean compression and decompression time"""
+    return max(
+        sample_stats.relative_ci_half_width([d[metric] for d in iteration_data])
+        for metric in ('compression_time', 'decompression_time')
+    )
+
+
+def collect_iterations(run_one, config_key: str) -> list:
+    """
+    Run iterations of one configuration and return their data
+
+    run_one(i) runs iteration i and returns its data or None. Each iteration
+    is written to the result store as soon as it completes, and samples
+    already stored for config_key count towards the target, so an interrupted
+    run resumes where it stopped. The fixed mode runs until there are
+    ITERATIONS samples. The adaptive mode keeps iterating until the
+    bootstrap CI of both the mean compression and decompression time is
+    within ADAPTIVE_CI_TARGET, or the configuration has used
+    ADAPTIVE_TIME_BUDGET seconds or ADAPTIVE_MAX_ITERATIONS attempts.
+    Either way, a configuration stops at its first iteration aborted over
+    budget: repeating it would only waste the budget again.
+    """
+    iteration_data = result_store.measurements(STORE, config_key)
+    if iteration_data:
+        print(f"Resuming from {len(iteration_data)} stored samples")
+
+    def record(data):
+        # Returns False once the configuration has gone over budget
+        if data:
+            result_store.add_measurement(STORE, config_key, data)
+            iteration_data.append(data)
+        return not any(d.get('budget_exceeded') for d in iteration_data)
+
+    if not record(None):
+        return iteration_data
+
+    if not ADAPTIVE:
+        for i in range(len(iteration_data), ITERATIONS):
+            print(f"Iteration {i+1}/{ITERATIONS}...")
+            if not record(run_one(i)):
+                break
+        return iteration_data
+
+    if len(iteration_data) >= ADAPTIVE_MIN_ITERATIONS and ci_half_width(iteration_data) <= ADAPTIVE_CI_TARGET:
+        return iteration_data
+
+    start_time = time.perf_counter()
+    for i in range(len(iteration_data), ADAPTIVE_MAX_ITERATIONS):
+        print(f"Iteration {i+1} (adaptive)...")
+        if not record(run_one(i)):
+            break
+
+        if len(iteration_data) >= ADAPTIVE_MIN_ITERATIONS:
+            width = ci_half_width(iteration_data)
+            if width <= ADAPTIVE_CI_TARGET:
+                print(f"Converged after {len(iteration_data)} iterations (CI +/-{width:.1%})")
+                break
+        if time.perf_counter() - start_time >= ADAPTIVE_TIME_BUDGET:
+            print(f"Time budget ({ADAPTIVE_TIME_BUDGET}s) exhausted after {len(iteration_data)} iterations")
+            break
+    return iteration_data
+
+
+def run_jobs(jobs: list, input_file: Path, input_digest: str, original_size: int) -> list:
+    """
+    Run a job list (see codec_registry.expand) one job after another on the full cpuset
+
+    Every job is one configuration: its iterations are collected (resuming
+    from the result store) and summarized, and grid variants keep their label.
+    """
+    results = []
+    algorithm = None
+    for job in jobs:
+        if job['algorithm'] != algorithm:
+            algorithm = job['algorithm']
+            print(f"Testing {algorithm}...")
+        print(f"Level {job['level_name']} ({job['level_value']})"
+              + (f" [{job['variant']}]" if job['variant'] else "") + ":")
+        config_key = register_config(job['algorithm'], job['config'], job['level_name'], job['level_value'],
+                                     input_digest, job['threads'])
+        iteration_data = collect_iterations(
+            lambda i: run_iteration(job['algorithm'], job['config'], job['level_name'], job['level_value'], i,
+                                    input_file, input_digest),
+            config_key
+        )
+
+        # Calculate averages for this configuration
+        if iteration_data:
+            result = summarize_iterations(
+                job['algorithm'], job['is_threaded'], job['level_name'], job['level_value'], iteration_data,
+                original_size, config_key, threads=job['threads']
+            )
+            if job['variant']:
+                result['variant'] = job['variant']
+            results.append(result)
+    return results
+
+
+def run_serial(algorithms: dict, input_file: Path, input_digest: str, original_size: int,
+               threads: int = None) -> list:
+    """Run every algorithm/level/grid variant one after another on the full cpuset"""
+    return run_jobs(codec_registry.expand(algorithms, threads), input_file, input_digest, original_size)
+
+
+def with_threads(config: dict, threads: int) -> dict:
+    """Copy of a multi-threaded codec config with an explicit worker count on both commands"""
+    option = config['threads_option'].format(threads=threads)
+    return {
+        **config,
+        'compress_cmd': f"{config['compress_cmd']} {option}",
+        'decompress_cmd': f"{config['decompress_cmd']} {option}",
+    }
+
+
+def run_thread_sweep(algorithms: dict, input_file: Path, input_digest: str, original_size: int,
+                     max_threads: int = None) -> list:
+    """
+    Run each multi-threaded codec/level with 1..N workers (N = cores in the cpuset)
+
+    Each result gets speedup (time at 1 thread / time at N threads) and scaling
+    efficiency (speedup / N) for compression and decompression.
+    """
+    max_threads = max_threads or len(os.sched_getaffinity(0))
+    results = []
+    for threads in range(1, max_threads + 1):
+        print(f"Thread sweep: {threads}/{max_threads} threads")
+        variants = {algorithm: with_threads(config, threads) for algorithm, config in algorithms.items()}
+        results.extend(run_serial(variants, input_file, input_digest, original_size, threads=threads))
+
+    measured = [r for r in results if not r.get('budget_exceeded')]
+    baselines = {(r['algorithm'], r['level_name'], r.get('variant')): r for r in measured if r['threads'] == 1}
+    for result in measured:
+        baseline = baselines.get((result['algorithm'], result['level_name'], result.get('variant')))
+        if not baseline:
+            continue
+        for phase in ('compression', 'decompression'):
+            speedup = baseline[f'avg_{phase}_time'] / result[f'avg_{phase}_time']
+            result[f'{phase}_speedup'] = speedup
+            result[f'{phase}_scaling_efficiency'] = speedup / result['threads']
+    return results
+
+
+def with_memory_option(config: dict, compress_option: str, decompress_option: str) -> dict:
+    """Copy of a codec config with a memory-related option appended to its commands"""
+    return {
+        **config,
+        'compress_cmd': f"{config['compress_cmd']} {compress_option}",
+        'decompress_cmd': f"{config['decompress_cmd']} {decompress_option}".rstrip(),
+    }
+
+
+def run_memory_sweep(algorithms: dict, input_file: Path, input_digest: str, original_size: int) -> list:
+    """
+    Run each codec/level with its default window and every memory_options variant
+
+    The variants are the knobs the standard commands leave alone (zstd
+    --long, xz dictionary size, brotli window, lz4 block size); each result
+    records its variant label. Combine with --memory-limit to see which
+    settings still fit a small worker.
+    """
+    jobs = []
+    for job in codec_registry.expand({name: config for name, config in algorithms.items()
+                                      if 'memory_options' in config}):
+        jobs.append({**job, 'variant': job['variant'] or 'default'})
+        for label, (compress_option, decompress_option) in job['config']['memory_options'].items():
+            jobs.append({
+                **job,
+                'config': with_memory_option(job['config'], compress_option, decompress_option),
+                'variant': ','.join(filter(None, [job['variant'], label])),
+            })
+
+    results = run_jobs(jobs, input_file, input_digest, original_size)
+    for result in results:
+        result['memory_sweep'] = True
+    return results
+
+
+def run_library(input_file: Path, input_digest: str, original_size: int, chunk_size: int) -> list:
+    """Run every available in-process library codec/level/iteration (see library_backend.py)"""
+    results = []
+    for algorithm, codec in library_backend.available_codecs().items():
+        print(f"Testing {algorithm} ({codec['library']})...")
+        for level_name, level_value in codec['levels'].items():
             print(f"Level {level_name} ({level_value}):")
-            iteration_data = []
-
-            for i in range(ITERATIONS):
-                print(f"Iteration {i+1}/{ITERATIONS}...")
-                compression_time = None
-                decompression_time = None
-                compressed_size = None
-                sha256_valid = False
-                compressed_file = None
-                decompressed_file = None
+            corpus_hash, command_line = store_identity(
+                input_digest, f"{codec['library']} level={level_value} chunk_size={chunk_size}"
+            )
+            config_key = result_store.register_config(
+                STORE, corpus_hash, result_store.library_version(codec['library']), command_line,
+                algorithm, 'library', level_name, level_value, cache_state=CACHE_MODE
+            )
+            if FRESH:
+                result_store.clear_measurements(STORE, config_key)
+
+            def run_one(i):
                 try:
-                    # Compression
-                    try:
-                        flush_cache(str(input_file))
-                        cmd = config['compress_cmd'].format(level=level_value)
-                        compressed_file = f"{algorithm}_{level_name}_iter{i}_compressed{config['extension']}"
-
-                        start_time = time.perf_counter()
-                        with open(input_file, 'rb') as infile:
-                            with open(compressed_file, 'wb') as outfile:
-                                process = subprocess.Popen(
-                                    cmd.split(), stdin=infile,
-                                    stdout=outfile,
-                                    stderr=subprocess.PIPE
-                                )
-                                try:
-                                    _, stderr = process.communicate(timeout=COMPRESSION_TIMEOUT)
-                                    compression_time = time.perf_counter() - start_time
-
-                                    if process.returncode != 0:
-                                        print(f"Compression failed: {stderr.decode()}")
-                                        continue
-
-                                    compressed_size = get_file_size(compressed_file)
-                                    print(f"Compression Time: {compression_time:.3f}s, Size: {compressed_size}")
-
-                                except subprocess.TimeoutExpired:
-                                    process.kill()
-                                    process.wait()
-                                    print(f"Compression timeout ({COMPRESSION_TIMEOUT}s) - assigning penalty")
-                                    compression_time = TIMEOUT_PENALTY_TIME
-                                    decompression_time = TIMEOUT_PENALTY_TIME
-                                    compressed_size = TIMEOUT_PENALTY_SIZE
-                                    sha256_valid = False
-                                    # Skip decompression section entirely
-                                    continue
-
-                    except Exception as e:
-                        print(f"Compression exception: {e}")
-                        continue
-
-                    # Decompression (only runs if compression succeeded)
-                    try:
-                        flush_cache(compressed_file)
-                        decompressed_file = f"{algorithm}_{level_name}_iter{i}_decompressed.log"
-                        decompress_cmd = config['decompress_cmd'].format(level=level_value)
-
-                        start_time = time.perf_counter()
-                        with open(compressed_file, 'rb') as infile:
-                            with open(decompressed_file, 'wb') as outfile:
-                                process = subprocess.Popen(
-                                    decompress_cmd.split(), stdin=infile,
-                                    stdout=outfile,
-                                    stderr=subprocess.PIPE
-                                )
-                                try:
-                                    _, stderr = process.communicate(timeout=DECOMPRESSION_TIMEOUT)
-                                    decompression_time = time.perf_counter() - start_time
-
-                                    if process.returncode != 0:
-                                        print(f"Decompression failed: {stderr.decode()}")
-                                        continue
-
-                                    # Check sha256sum
-                                    if check_sha256sum(str(input_file), decompressed_file):
-                                        sha256_valid = True
-                                        print("Verification passed")
-                                    else:
-                                        print("Verification failed")
-
-                                except subprocess.TimeoutExpired:
-                                    process.kill()
-                                    process.wait()
-                                    print(f"Decompression timeout ({DECOMPRESSION_TIMEOUT}s) - assigning penalty")
-                                    decompression_time = TIMEOUT_PENALTY_TIME
-                                    sha256_valid = False
-                        print(f"Decompression Time: {decompression_time:.3f}s")
-
-                    except Exception as e:
-                        print(f"Decompression exception: {e}")
-                finally:
-                    # Clean up files safely
-                    if compressed_file and os.path.exists(compressed_file):
-                        os.unlink(compressed_file)
-                    if decompressed_file and os.path.exists(decompressed_file):
-                        os.unlink(decompressed_file)
-                    # Store this iteration's data (including penalties)
-                    if compression_time and decompression_time and compressed_size:
-                        iteration_data.append({
-                            'compression_time': compression_time,
-                            'decompression_time': decompression_time,
-                            'compressed_size': compressed_size,
-                            'sha256_valid': sha256_valid
-                        })
-
-            # Calculate averages
+                    resident = prepare_cache(str(input_file))
+                    data = library_backend.run_iteration(
+                        codec, level_value, str(input_file), input_digest, chunk_size,
+                        direct=CACHE_MODE == 'direct'
+                    )
+                except Exception as e:
+                    print(f"Library exception: {e}")
+                    return None
+                data.update(cache_state=CACHE_MODE, compression_input_resident=resident)
+                print(f"Compression Time: {data['compression_time']:.3f}s, Size: {data['compressed_size']}")
+                print("Verification passed" if data['sha256_valid'] else "Verification failed")
+                print(f"Decompression Time: {data['decompression_time']:.3f}s")
+                return data
+
+            iteration_data = collect_iterations(run_one, config_key)
+
             if iteration_data:
-                avg_compression_time = sum(d['compression_time'] for d in iteration_data) / len(iteration_data)
-                avg_decompression_time = sum(d['decompression_time'] for d in iteration_data) / len(iteration_data)
-                avg_compressed_size = sum(d['compressed_size'] for d in iteration_data) / len(iteration_data)
-                avg_compression_ratio = avg_compressed_size / original_size
-                successful_iterations = len(iteration_data)
-                result = {
-                    'algorithm': algorithm,
-                    'is_threaded': True,
-                    'level_name': level_name,
-                    'level_value': level_value,
-                    'iterations': successful_iterations,
-                    'original_size': original_size,
-                    'avg_compressed_size': avg_compressed_size,
-                    'avg_compression_ratio': avg_compression_ratio,
-                    'avg_compression_time': avg_compression_time,
-                    'avg_decompression_time': avg_decompression_time,
-                    'all_sha256_valid': all(d['sha256_valid'] for d in iteration_data),
-                }
-                raw_results.append(result)
-
-    # After collecting all results, calculate + normalized scores
-    if raw_results:
-        # Inverse the compression ratio for normalization and scoring aesthetics
-        # (smaller = better compression), but for scoring we want original/compressed (bigger = better compression).
-        max_ratio_seen = max(1 / result['avg_compression_ratio'] for result in raw_results)
-        min_time_seen = min(result['avg_compression_time'] + result['avg_decompression_time'] for result in raw_results)
+                results.append(summarize_iterations(
+                    algorithm, False, level_name, level_value, iteration_data, original_size,
+                    config_key, backend='library'
+                ))
+    return results
+
+
+def run_level_sweep(input_file: Path, input_digest: str, original_size: int) -> list:
+    """
+    Coarse-to-fine sweep over every supported level of every CLI codec
+
+    The coarse pass runs each level once. Configurations on or within
+    SWEEP_FRONTIER_TOLERANCE of the ratio-vs-compression-throughput Pareto
+    frontier then get SWEEP_FINE_ITERATIONS more iterations, so the
+    measurements that decide the trade-off are the most precise ones.
+    Samples already in the result store count towards both passes.
+    """
+    jobs = {}
+    for job in codec_registry.expand({**ALGORITHMS_SINGLE_THREADS, **ALGORITHMS_MULTI_THREADS}, all_levels=True):
+        config_key = register_config(job['algorithm'], job['config'], job['level_name'], job['level_value'],
+                                     input_digest, job['threads'])
+        jobs[config_key] = job
+
+    iteration_data = {config_key: result_store.measurements(STORE, config_key) for config_key in jobs}
+
+    def run_pass(config_keys, target):
+        # Run each configuration until it has target samples
+        for config_key in config_keys:
+            job = jobs[config_key]
+            print(f"Testing {job['algorithm']} level {job['level_name']}"
+                  + (f" [{job['variant']}]" if job['variant'] else "") + "...")
+            for i in range(len(iteration_data[config_key]), target):
+                if any(d.get('budget_exceeded') for d in iteration_data[config_key]):
+                    break
+                data = run_iteration(job['algorithm'], job['config'], job['level_name'], job['level_value'], i,
+                                     input_file, input_digest)
+                if data:
+                    result_store.add_measurement(STORE, config_key, data)
+                    iteration_data[config_key].append(data)
+
+    def summarize():
+        results = []
+        for config_key, data in iteration_data.items():
+            if not data:
+                continue
+            job = jobs[config_key]
+            result = summarize_iterations(job['algorithm'], job['is_threaded'], job['level_name'], job['level_value'],
+                                          data, original_size, config_key, threads=job['threads'])
+            if job['variant']:
+                result['variant'] = job['variant']
+            results.append(result)
+        return results
+
+    print(f"Level sweep coarse pass: {len(jobs)} configurations")
+    run_pass(list(jobs), 1)
+
+    near_frontier = analyze_result.pareto_frontier(summarize(), tolerance=SWEEP_FRONTIER_TOLERANCE)
+    fine_keys = [r['config_key'] for r in near_frontier]
+    print(f"Level sweep fine pass: {len(fine_keys)} configurations near the Pareto frontier")
+    run_pass(fine_keys, 1 + SWEEP_FINE_ITERATIONS)
+
+    results = summarize()
+    for result in results:
+        result['near_frontier'] = result['config_key'] in fine_keys
+    return results
+
+
+def run_pinned_jobs(jobs: list, input_file: Path, input_digest: str, cpus: list, record: bool = False) -> dict:
+    """
+    Run (config_key, job, iteration) jobs concurrently, one job per core
+
+    Each core gets its own copy of the input and its own work directory, so a
+    cache flush or a compressed file in one job never touches another job's files.
+    With record, every measurement is written to the result store as soon as
+    its job completes.
+    Returns {config_key: [iteration data, ...]}.
+    """
+    free_cpus = queue.Queue()
+    core_inputs = {}
+    for cpu in cpus:
+        core_dir = os.path.join(PARALLEL_WORK_DIR, f"cpu{cpu}")
+        os.makedirs(core_dir, exist_ok=True)
+        core_inputs[cpu] = Path(core_dir) / input_file.name
+        shutil.copyfile(input_file, core_inputs[cpu])
+        free_cpus.put(cpu)
+
+    def run_job(pinned_job):
+        config_key, job, i = pinned_job
+        cpu = free_cpus.get()
+        try:
+            data = run_iteration(
+                job['algorithm'], job['config'], job['level_name'], job['level_value'], i,
+                core_inputs[cpu], input_digest,
+                work_dir=os.path.dirname(core_inputs[cpu]), cpu=cpu,
+                log_prefix=f"[cpu{cpu} {job['algorithm']} {job['level_name']}"
+                           + (f" {job['variant']}" if job['variant'] else "") + f" iter{i+1}] "
+            )
+        finally:
+            free_cpus.put(cpu)
+        if data and record:
+            result_store.add_measurement(STORE, config_key, data)
+        return data
+
+    iteration_data = {}
+    with ThreadPoolExecutor(max_workers=len(cpus)) as executor:
+        for pinned_job, data in zip(jobs, executor.map(run_job, jobs)):
+            if data:
+                iteration_data.setdefault(pinned_job[0], []).append(data)
+    return iteration_data
+
+
+def run_parallel(algorithms: dict, input_file: Path, input_digest: str, original_size: int) -> list:
+    """
+    Run single-threaded algorithm/level/iteration jobs concurrently, each pinned to its own core
+
+    A serial calibration pass runs each algorithm's first job on one core first;
+    the same configurations measured under full parallel load are compared against
+    it and flagged when they slow down by more than INTERFERENCE_THRESHOLD.
+    """
+    cpus = sorted(os.sched_getaffinity(0))
+    print(f"Parallel scheduler: {len(cpus)} cores {cpus}")
+
+    calibration_jobs = {}
+    jobs = []
+    configs = {}
+    stored = {}
+    for job in codec_registry.expand(algorithms):
+        config_key = register_config(job['algorithm'], job['config'], job['level_name'], job['level_value'],
+                                     input_digest, job['threads'])
+        configs[config_key] = job
+        calibration_jobs.setdefault(job['algorithm'], (config_key, job, 0))
+        stored[config_key] = result_store.measurements(STORE, config_key)
+        # Only the iterations the result store does not have yet
+        for i in range(len(stored[config_key]), ITERATIONS):
+            jobs.append((config_key, job, i))
+
+    calibration = {}
+    new_data = {}
+    if jobs:  # Nothing to calibrate against when every sample came from the store
+        try:
+            print("Serial calibration run...")
+            calibration = run_pinned_jobs(list(calibration_jobs.values()), input_file, input_digest, cpus[:1])
+            print(f"Running {len(jobs)} jobs on {len(cpus)} cores...")
+            new_data = run_pinned_jobs(jobs, input_file, input_digest, cpus, record=True)
+        finally:
+            shutil.rmtree(PARALLEL_WORK_DIR, ignore_errors=True)
+    iteration_data = {config_key: data + new_data.get(config_key, []) for config_key, data in stored.items()}
+
+    # Interference ratio per algorithm: parallel time / serial time for the calibration configuration
+    interference = {}
+    for config_key, serial_data in calibration.items():
+        serial_data = [d for d in serial_data if not d.get('budget_exceeded')]
+        parallel_data = [d for d in iteration_data.get(config_key, []) if not d.get('budget_exceeded')]
+        if not serial_data or not parallel_data:
+            continue
+        serial_time = sum(d['compression_time'] + d['decompression_time'] for d in serial_data) / len(serial_data)
+        parallel_time = sum(d['compression_time'] + d['decompression_time'] for d in parallel_data) / len(parallel_data)
+        interference[configs[config_key]['algorithm']] = parallel_time / serial_time
+
+    results = []
+    for config_key, job in configs.items():
+        data = iteration_data.get(config_key)
+        if not data:
+            continue
+        algorithm = job['algorithm']
+        result = summarize_iterations(algorithm, job['is_threaded'], job['level_name'], job['level_value'], data,
+                                      original_size, config_key, threads=job['threads'])
+        if job['variant']:
+            result['variant'] = job['variant']
+        ratio = interference.get(algorithm)
+        result['interference_ratio'] = ratio
+        result['interference'] = ratio is not None and ratio > INTERFERENCE_THRESHOLD
+        if result['interference']:
+            print(f"Warning: {algorithm} ran {ratio:.2f}x slower in parallel than in the serial calibration")
+        results.append(result)
+    return results
+
+
+def run_distributed(address: str, algorithms: dict, cache_modes: list, corpus: dict, original_size: int,
+                    min_workers: int) -> list:
+    """
+    Serve the job list to worker agents (see distributed.py) and summarize what they send back
+
+    Every host class runs each configuration's ITERATIONS iterations in each
+    cache mode, spread over its workers; iterations are stored as they arrive,
+    and samples already stored for the class count, as in collect_iterations.
+    Returns one result per host class and configuration, tagged with its host_class.
+    """
+    jobs = codec_registry.expand(algorithms)
+    configurations = []  # (host class, cache mode, config_key, job) to summarize
+
+    def plan(environment, host_class):
+        # Runs in a coordinator request thread, possibly next to another class's plan: no globals
+        tasks = []
+        for cache_mode in cache_modes:
+            for job in jobs:
+                tool = job['config']['compress_cmd'].split()[0]
+                if environment['tool_versions'].get(tool) is None:
+                    print(f"Skipping {job['algorithm']} on {host_class}: {tool} is not installed")
+                    continue
+                config_key = register_config(job['algorithm'], job['config'], job['level_name'],
+                                             job['level_value'], corpus['digest'], job['threads'], environment,
+                                             cache_mode)
+                configurations.append((host_class, cache_mode, config_key, job))
+                stored = result_store.measurements(STORE, config_key)
+                if any(d.get('budget_exceeded') for d in stored):
+                    continue
+                tasks.extend((config_key, {
+                    'algorithm': job['algorithm'], 'config': job['config'], 'level_name': job['level_name'],
+                    'level_value': job['level_value'], 'iteration': i, 'cache_mode': cache_mode,
+                    'memory_limit': MEMORY_LIMIT,
+                }) for i in range(len(stored), ITERATIONS))
+        return tasks
+
+    def record(config_key, data):
+        result_store.add_measurement(STORE, config_key, data)
+        return not data.get('budget_exceeded')
+
+    tools = sorted({job['config']['compress_cmd'].split()[0] for job in jobs})
+    coordinator = distributed.Coordinator(distributed.parse_address(address), {'corpus': corpus, 'tools': tools},
+                                          plan, record, min_workers)
+    coordinator.run()
+
+    results = []
+    for host_class, cache_mode, config_key, job in configurations:
+        iteration_data = result_store.measurements(STORE, config_key)
+        if not iteration_data:
+            continue
+        result = summarize_iterations(
+            job['algorithm'], job['is_threaded'], job['level_name'], job['level_value'], iteration_data,
+            original_size, config_key, threads=job['threads']
+        )
+        result['host_class'] = host_class
+        if job['variant']:
+            result['variant'] = job['variant']
+        results.append(result)
+    return results
+
+
+def run_pass(args, input_file: Path, input_digest: str, original_size: int) -> list:
+    """Run the selected modes once over input_file (one page-cache mode, with or without TRANSFORM)"""
+    results = []
+
+    if args.level_sweep:
+        print("Testing every supported level (level sweep)")
+        results.extend(run_level_sweep(input_file, input_digest, original_size))
+    elif args.memory_sweep:
+        print("Testing window, dictionary and block sizes (memory sweep)")
+        results.extend(run_memory_sweep(ALGORITHMS_SINGLE_THREADS, input_file, input_digest, original_size))
+    elif args.thread_sweep:
+        print("Testing Multi-Threaded Algorithms (thread sweep)")
+        results.extend(run_thread_sweep(
+            ALGORITHMS_MULTI_THREADS, input_file, input_digest, original_size, args.max_threads
+        ))
+    elif args.backend in ('cli', 'both'):
+        # ALGORITHMS_SINGLE_THREADS
+        print("Testing Single-Threaded Algorithms")
+        if args.parallel:
+            results.extend(run_parallel(ALGORITHMS_SINGLE_THREADS, input_file, input_digest, original_size))
+        else:
+            results.extend(run_serial(ALGORITHMS_SINGLE_THREADS, input_file, input_digest, original_size))
+
+        # ALGORITHMS_MULTI_THREADS always run alone on the full cpuset
+        print("Testing Multi-Threaded Algorithms")
+        results.extend(run_serial(ALGORITHMS_MULTI_THREADS, input_file, input_digest, original_size))
+
+    if args.backend in ('library', 'both') and not (args.thread_sweep or args.level_sweep or args.memory_sweep):
+        print("Testing In-Process Library Codecs")
+        results.extend(run_library(input_file, input_digest, original_size, args.chunk_size))
+    return results
 
-        # Add normalized scores to each result
-        for result in raw_results:
-            # Compression score: normalize compression ratio to 0-1 (e.g., 1 = best, 0 = worst)
-            compression_score = (1 / result['avg_compression_ratio']) / max_ratio_seen
 
-            # Speed score: normalize time to 0-1 (e.g., 0.9, 1 being fastest) (faster = higher score)
-            # e.g., speed_score = 0.5 means it's twice as slow as the fastest
-            total_time = result['avg_compression_time'] + result['avg_decompression_time']
-            speed_score = min_time_seen / total_time
+def main():
+    global ITERATIONS, ADAPTIVE, ADAPTIVE_CI_TARGET, ADAPTIVE_TIME_BUDGET, STORE, FRESH, CACHE_MODE, MEMORY_LIMIT
+    global TRANSFORM
+    global ALGORITHMS_SINGLE_THREADS, ALGORITHMS_MULTI_THREADS
+    args = parse_args()
+    if args.codecs != codec_registry.CODEC_REGISTRY:
+        ALGORITHMS_SINGLE_THREADS, ALGORITHMS_MULTI_THREADS = codec_registry.split(
+            codec_registry.load_registry(args.codecs)
+        )
+        print(f"Codec registry: {args.codecs}")
+    ITERATIONS = args.iterations
+    ADAPTIVE = args.adaptive
+    ADAPTIVE_CI_TARGET = args.ci_target
+    ADAPTIVE_TIME_BUDGET = args.time_budget
+    STORE = result_store.open_store(args.store)
+    FRESH = args.fresh
+    MEMORY_LIMIT = args.memory_limit
+    if MEMORY_LIMIT:
+        print(f"Memory limit: {MEMORY_LIMIT / 1024 / 1024:.0f} MB per codec run, "
+              f"as a {memory_limit.LIMIT_KINDS[memory_limit.enforcement()]}")
+        if args.backend != 'cli':
+            print("Warning: The memory limit does not apply to in-process library codecs")
+
+    if args.coordinator and (args.parallel or args.thread_sweep or args.level_sweep or args.memory_sweep
+                             or args.adaptive or args.transform or args.backend != 'cli'):
+        print("Error: --coordinator runs the CLI job list with fixed --iterations only")
+        sys.exit(1)
 
-            # Combined trade-off score (0-100)
-            trade_off_score = (compression_score + speed_score) / 2 * 100
+    # Use teuthology.log if present, otherwise a cached generated corpus
+    input_file = create_test_file(args.corpus_size, args.seed, args.corpus_profile)
+    if not input_file.exists():
+        print(f"Error: {input_file} not found!")
+        sys.exit(1)
 
-            # Add to result
-            result['compression_score'] = compression_score
-            result['speed_score'] = speed_score
-            result['trade_off_score'] = trade_off_score
+    print(f"Starting benchmark with input file: {input_file}")
+    original_size = get_file_size(str(input_file))
+
+    print(f"Original file size: {original_size}")
+    input_digest = get_input_digest(str(input_file))
+
+    # Initialize results collection - now collect raw data per iteration
+    raw_results = []
+
+    transform = prepare_transform(args.transform, input_file, input_digest) if args.transform else None
+
+    if args.coordinator:
+        corpus = {'size': args.corpus_size, 'seed': args.seed, 'digest': input_digest,
+                  'profile': corpus_generator.load_profile(args.corpus_profile)}
+        raw_results.extend(run_distributed(
+            args.coordinator, {**ALGORITHMS_SINGLE_THREADS, **ALGORITHMS_MULTI_THREADS}, args.cache_modes, corpus,
+            original_size, args.min_workers
+        ))
+    else:
+        for cache_mode in args.cache_modes:
+            CACHE_MODE = cache_mode
+            print(f"Page cache mode: {CACHE_MODE}")
+            TRANSFORM = None
+            raw_results.extend(run_pass(args, input_file, input_digest, original_size))
+            if transform:
+                # Same matrix on the transformed input; ratios stay relative to the original log
+                TRANSFORM = transform
+                print(f"Testing behind the {transform['name']} transform")
+                raw_results.extend(run_pass(args, transform['file'], transform['digest'], original_size))
+
+    # The exports are a view over the store: this run's configurations with all their stored samples
+    for result in raw_results:
+        result_store.save_result(STORE, result)
+    raw_results = result_store.load_results(STORE, [result['config_key'] for result in raw_results])
 
     # Save results to files
     timestamp = int(time.time())
@@ -500,15 +1522,47 @@ def main():
 
     # Save as CSV
     csv_file = f"results_{timestamp}.csv"
+    samples_file = f"results_{timestamp}_samples.csv"
+    timeseries_file = f"results_{timestamp}_timeseries.csv"
     if raw_results:
         with open(csv_file, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=raw_results[0].keys())
+            # Union of keys: mode-specific columns only appear on some results
+            fieldnames = list(dict.fromkeys(key for result in raw_results for key in result if key != 'samples'))
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
             writer.writeheader()
             writer.writerows(raw_results)
 
+        # One row per iteration, keyed by the configuration it belongs to
+        config_keys = ['algorithm', 'backend', 'level_name', 'level_value', 'variant', 'threads', 'cache_state',
+                       'memory_limit', 'transform', 'host_class']
+        sample_rows = [
+            {**{key: result.get(key) for key in config_keys}, 'iteration': i, **sample}
+            for result in raw_results for i, sample in enumerate(result['samples'])
+        ]
+        with open(samples_file, 'w', newline='') as f:
+            # Time series go to their own file
+            fieldnames = list(dict.fromkeys(
+                key for row in sample_rows for key in row if not key.endswith('_timeseries')
+            ))
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(sample_rows)
+
+        # One row per time series sample of every relayed codec run
+        with open(timeseries_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(config_keys + ['iteration', 'phase', 'seconds', 'bytes_in', 'bytes_out'])
+            for row in sample_rows:
+                for phase in ('compression', 'decompression'):
+                    for point in row.get(f'{phase}_timeseries') or []:
+                        writer.writerow([row[key] for key in config_keys] + [row['iteration'], phase, *point])
+
     print("Results saved:")
     print(f"JSON: {json_file}")
     print(f"CSV: {csv_file}")
+    print(f"Samples CSV: {samples_file}")
+    print(f"Time series CSV: {timeseries_file}")
+    print(f"Result store: {args.store}")
     print(f"Total tests: {len(raw_results)}")
 
     print("\nTest Finish!")
@@ -0,0 +1,163 @@
+"""
+Sample Statistics
+
+Robust summaries of per-iteration benchmark samples: median, p95, standard
+deviation and bootstrap confidence intervals of the mean, a permutation test
+and effect size for comparing two runs, plus steady-state rate and stalls of
+the throughput time series recorded during a codec run.
+"""
+
+import itertools
+import math
+import random
+import statistics
+
+BOOTSTRAP_RESAMPLES = 1000  # Resamples per bootstrap confidence interval
+CONFIDENCE = 0.95  # Confidence level of the bootstrap intervals
+BOOTSTRAP_SEED = 0  # Fixed seed so the same samples always give the same interval
+PERMUTATION_RESAMPLES = 10000  # Random relabelings per permutation test when exact enumeration takes more
+PERMUTATION_SEED = 0  # Fixed seed so the same samples always give the same p-value
+STEADY_STATE_WINDOW = (0.1, 0.9)  # Steady state: from 10% to 90% of the bytes processed
+STALL_MIN_DURATION = 0.25  # Seconds without new output that count as a stall
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Percentile with linear interpolation between closest ranks (fraction in 0..1)"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def bootstrap_ci(values: list, confidence: float = CONFIDENCE,
+                 resamples: int = BOOTSTRAP_RESAMPLES) -> tuple:
+    """
+    Percentile bootstrap confidence interval of the mean
+
+    Returns (low, high); a single sample gives a zero-width interval.
+    """
+    if len(values) < 2:
+        return values[0], values[0]
+    rng = random.Random(BOOTSTRAP_SEED)
+    n = len(values)
+    means = sorted(sum(rng.choices(values, k=n)) / n for _ in range(resamples))
+    tail = (1 - confidence) / 2
+    return percentile(means, tail), percentile(means, 1 - tail)
+
+
+def relative_ci_half_width(values: list) -> float:
+    """Half the bootstrap CI width as a fraction of the mean (0.05 = mean +/- 5%)"""
+    low, high = bootstrap_ci(values)
+    mean = sum(values) / len(values)
+    return (high - low) / 2 / mean if mean else 0.0
+
+
+def permutation_test(baseline: list, candidate: list, resamples: int = PERMUTATION_RESAMPLES):
+    """
+    Two-sided p-value of the difference of means between two samples
+
+    Every relabeling of the pooled samples is enumerated when there are at
+    most resamples of them, otherwise resamples random ones are drawn.
+    Returns None with fewer than two samples on either side. Two constant
+    samples (e.g. the compressed size of a deterministic codec) are taken at
+    face value: 0 if they differ, 1 if they don't.
+    """
+    if len(baseline) < 2 or len(candidate) < 2:
+        return None
+    if len(set(baseline)) == 1 and len(set(candidate)) == 1:
+        return 0.0 if baseline[0] != candidate[0] else 1.0
+    pooled = list(baseline) + list(candidate)
+    n, m = len(baseline), len(candidate)
+    total = sum(pooled)
+
+    def statistic(baseline_sum):
+        return abs((total - baseline_sum) / m - baseline_sum / n)
+
+    observed = statistic(sum(baseline)) * (1 - 1e-9)  # Ties with the observed labeling count as extreme
+    if math.comb(n + m, n) <= resamples:
+        sums = [sum(labeling) for labeling in itertools.combinations(pooled, n)]
+        return sum(1 for s in sums if statistic(s) >= observed) / len(sums)
+    rng = random.Random(PERMUTATION_SEED)
+    extreme = sum(1 for _ in range(resamples) if statistic(sum(rng.sample(pooled, n))) >= observed)
+    return (extreme + 1) / (resamples + 1)
+
+
+def smallest_p_value(n: int, m: int, resamples: int = PERMUTATION_RESAMPLES) -> float:
+    """
+    Smallest p-value permutation_test can return for samples of n and m values without ties
+
+    Only the most extreme relabelings beat the observed one: both ends when
+    n == m (mirror images), one otherwise. With 2 + 2 samples that is 2/6,
+    so no difference is ever significant at 0.05.
+    """
+    total = math.comb(n + m, n)
+    if total > resamples:
+        return 1 / (resamples + 1)
+    return (2 if n == m else 1) / total
+
+
+def cliffs_delta(baseline: list, candidate: list) -> float:
+    """Cliff's delta effect size: P(candidate > baseline) - P(candidate < baseline), from -1 to 1"""
+    greater = sum(1 for c in candidate for b in baseline if c > b)
+    less = sum(1 for c in candidate for b in baseline if c < b)
+    return (greater - less) / (len(baseline) * len(candidate))
+
+
+def summarize_samples(iteration_data: list, metrics: tuple) -> dict:
+    """Median, p95, stddev and bootstrap CI of the mean for each metric of the iterations"""
+    summary = {}
+    for metric in metrics:
+        values = [d[metric] for d in iteration_data]
+        low, high = bootstrap_ci(values)
+        summary[f'median_{metric}'] = statistics.median(values)
+        summary[f'p95_{metric}'] = percentile(values, 0.95)
+        summary[f'stddev_{metric}'] = statistics.stdev(values) if len(values) > 1 else 0.0
+        summary[f'{metric}_ci_low'] = low
+        summary[f'{metric}_ci_high'] = high
+    return summary
+
+
+def steady_state_rate(series: list, column: int):
+    """
+    Bytes per second of one column of a [seconds, bytes, ...] time series in steady state
+
+    Measured between the samples where the column first reaches the start
+    and end fractions of STEADY_STATE_WINDOW of its final value, which
+    leaves out warm-up and the final flush. None if the run was too short
+    to resolve.
+    """
+    final = series[-1][column] if series else 0
+    if not final:
+        return None
+    low, high = STEADY_STATE_WINDOW
+    start = next(sample for sample in series if sample[column] >= final * low)
+    end = next(sample for sample in series if sample[column] >= final * high)
+    if end[0] <= start[0]:
+        return None
+    return (end[column] - start[column]) / (end[0] - start[0])
+
+
+def stall_intervals(series: list, column: int, min_duration: float = STALL_MIN_DURATION) -> list:
+    """
+    (start, end) seconds of the stretches in which a time series column stopped growing
+
+    Only stalls after the column first became non-zero count (e.g. after the
+    first output byte), and only those lasting at least min_duration.
+    """
+    stalls = []
+    last_growth = None  # (seconds, value) of the last sample that grew
+    previous_time = None
+    for sample in series:
+        seconds, value = sample[0], sample[column]
+        if last_growth is None:
+            if value:
+                last_growth = (seconds, value)
+        elif value > last_growth[1]:
+            if previous_time - last_growth[0] >= min_duration:
+                stalls.append((last_growth[0], previous_time))
+            last_growth = (seconds, value)
+        previous_time = seconds
+    if last_growth is not None and previous_time - last_growth[0] >= min_duration:
+        stalls.append((last_growth[0], previous_time))
+    return stalls
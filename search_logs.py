@@ -0,0 +1,206 @@
+"""
+Search-Over-Compressed-Logs Benchmark
+
+Most reads of an archived teuthology log are searches for tracebacks and
+ERROR lines, not full decompressions to disk. This benchmark compresses the
+corpus once per codec and level and times regex queries against each
+artifact the way zgrep/zstdgrep/`lz4cat | grep` run them: the codec's
+decompress command piped into grep. Two kinds of search are timed:
+
+- scan: count every match (`grep -c`), decompressing the whole log
+- first: stop at the first match (`grep -m1`); the decompressor is then
+  killed by SIGPIPE, so a cheap-to-start codec with an early match wins
+
+The uncompressed corpus is searched the same way as a baseline, and every
+compressed search must find what the baseline found.
+"""
+
+import argparse
+import csv
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import concurrent_readers
+import corpus_generator
+import run_benchmark
+
+SEARCH_CORPUS_SIZE = '100MB'  # Size of the searched log
+SEARCH_LEVELS = ('mid',)  # Decompression speed barely depends on the level for most codecs
+SEARCH_REPEATS = 3  # Runs per query; the median latency is reported
+GREP_ENV = {**os.environ, 'LC_ALL': 'C'}  # Byte-wise matching, as fast as grep gets
+
+# Extended regexes for what corpus_generator.py emits (and people grep for)
+DEFAULT_QUERIES = {
+    'traceback': r'^Traceback \(most recent call last\)',
+    'error': r'ERROR:teuthology',
+    'command_failed': r'CommandFailedError: Command failed on smithi[0-9]+',
+    'health_warn': r'HEALTH_WARN [0-9]+ osds down',
+    'heartbeat': r'heartbeat_check: no reply from [0-9.:]+ osd\.3 ',
+    'scrub_pg': r'\[DBG\] : 5\.1f scrub (starts|ok)',
+    'absent': r'Segmentation fault|ceph_assert',  # Never emitted: the worst case for a first-match search
+}
+
+
+def parse_query(value: str) -> tuple:
+    """Parse a NAME=REGEX --query"""
+    name, sep, pattern = value.partition('=')
+    if not sep or not name or not pattern:
+        raise argparse.ArgumentTypeError(f"expected NAME=REGEX, got {value!r}")
+    return name, pattern
+
+
+def search(decompress_argv: list, artifact: str, pattern: str, first: bool) -> tuple:
+    """
+    Run `decompress | grep` over artifact; returns (seconds, grep output)
+
+    The clock stops when grep exits, which is when the user has the answer;
+    for a first-match search the decompressor is still being torn down.
+    """
+    grep_argv = ['grep', '-E', '-m1' if first else '-c', pattern]
+    start_time = time.perf_counter()
+    with open(artifact, 'rb') as stdin:
+        if decompress_argv is None:
+            grep = subprocess.Popen(grep_argv, stdin=stdin, stdout=subprocess.PIPE, env=GREP_ENV)
+            output = grep.communicate()[0]
+        else:
+            decompressor = subprocess.Popen(decompress_argv, stdin=stdin, stdout=subprocess.PIPE,
+                                            stderr=subprocess.DEVNULL)
+            grep = subprocess.Popen(grep_argv, stdin=decompressor.stdout, stdout=subprocess.PIPE, env=GREP_ENV)
+            decompressor.stdout.close()  # grep holds the only read end, so its exit stops the decompressor
+            output = grep.communicate()[0]
+    elapsed = time.perf_counter() - start_time
+    if decompress_argv is not None:
+        decompressor.wait()
+    if grep.returncode > 1:
+        raise ValueError(f"grep -E {pattern!r} failed (exit {grep.returncode})")
+    return elapsed, output
+
+
+def run_searches(jobs: list, data: bytes, input_file: str, queries: dict, work_dir: str) -> list:
+    """Search the uncompressed corpus and every codec/level artifact with every query"""
+    # (algorithm, level_name, level_value, decompress argv, artifact); the baseline needs no decompressor
+    artifacts = [('none', None, None, None, str(input_file))]
+    for algorithm, level_name, level_value, config in jobs:
+        artifact = os.path.join(work_dir, f"search-{algorithm}-{level_name}")
+        print(f"Compressing {algorithm} level {level_name} ({level_value}) artifact...")
+        concurrent_readers.compress_artifact('cli', algorithm, level_value, config, data, artifact)
+        decompress_argv = run_benchmark.codec_argv(config['decompress_cmd'].format(level=level_value))
+        artifacts.append((algorithm, level_name, level_value, decompress_argv, artifact))
+
+    expected = {}
+    results = []
+    for algorithm, level_name, level_value, decompress_argv, artifact in artifacts:
+        print(f"Searching {algorithm}" + (f" level {level_name} ({level_value})" if level_name else " (uncompressed)"))
+        for query, pattern in queries.items():
+            for kind in ('scan', 'first'):
+                runs = [search(decompress_argv, artifact, pattern, kind == 'first') for _ in range(SEARCH_REPEATS)]
+                latencies = [elapsed for elapsed, _ in runs]
+                output = runs[0][1]
+                expected.setdefault((query, kind), output)
+                median_latency = statistics.median(latencies)
+                result = {
+                    'mode': 'search',
+                    'algorithm': algorithm,
+                    'level_name': level_name,
+                    'level_value': level_value,
+                    'query': query,
+                    'pattern': pattern,
+                    'search': kind,
+                    'input_size': len(data),
+                    'compressed_size': os.path.getsize(artifact),
+                    # Matching lines for a scan; whether anything matched for a first-match search
+                    'matches': int(output) if kind == 'scan' else int(bool(output)),
+                    'median_latency': median_latency,
+                    'min_latency': min(latencies),
+                    'max_latency': max(latencies),
+                    # Uncompressed bytes scanned per second; a first-match search stops early
+                    'scan_throughput': len(data) / median_latency if kind == 'scan' else None,
+                    'sha256_valid': all(out == expected[(query, kind)] for _, out in runs),
+                }
+                print(f"  {query:<16} {kind:<5} {median_latency * 1000:>8.1f} ms  ({result['matches']} matches)")
+                if not result['sha256_valid']:
+                    print("  Verification failed: results differ from the uncompressed search")
+                results.append(result)
+        if algorithm != 'none':
+            os.remove(artifact)
+    return results
+
+
+def main():
+    global SEARCH_LEVELS
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark regex searches over compressed logs (decompress | grep)'
+    )
+    parser.add_argument('--corpus-size', type=corpus_generator.parse_size, default=SEARCH_CORPUS_SIZE,
+                        help=f'Size of the searched log (default: {SEARCH_CORPUS_SIZE})')
+    parser.add_argument('--query', type=parse_query, action='append', default=[], metavar='NAME=REGEX',
+                        help='Add an extended regex query (repeatable)')
+    parser.add_argument('--no-default-queries', action='store_true',
+                        help=f"Only run --query queries, not the defaults ({', '.join(DEFAULT_QUERIES)})")
+    parser.add_argument('--levels', default=','.join(SEARCH_LEVELS),
+                        help=f"Comma-separated level names (default: {','.join(SEARCH_LEVELS)})")
+    parser.add_argument('--codecs',
+                        help='Comma-separated subset of the registry codecs (default: every installed one)')
+    parser.add_argument('--work-dir',
+                        help='Directory for the compressed artifacts (default: a temporary directory)')
+    parser.add_argument('--seed', type=int, default=run_benchmark.CORPUS_SEED,
+                        help='Seed for the generated corpus')
+    parser.add_argument('--corpus-profile',
+                        help='JSON file overriding the corpus content profile (see corpus_generator.py)')
+    args = parser.parse_args()
+
+    SEARCH_LEVELS = tuple(args.levels.split(','))
+    queries = {} if args.no_default_queries else dict(DEFAULT_QUERIES)
+    queries.update(args.query)
+    if not queries:
+        raise ValueError("No queries to run; pass --query NAME=REGEX")
+    jobs = concurrent_readers.cli_jobs(SEARCH_LEVELS)
+    if args.codecs:
+        jobs = [job for job in jobs if job[0] in args.codecs.split(',')]
+    if not jobs:
+        print("Error: none of the selected codecs is installed")
+        sys.exit(1)
+
+    input_file = run_benchmark.create_test_file(args.corpus_size, args.seed, args.corpus_profile)
+    with open(input_file, 'rb') as f:
+        data = f.read(args.corpus_size)
+
+    with tempfile.TemporaryDirectory(prefix='compbench-search-', dir=args.work_dir) as work_dir:
+        if len(data) != os.path.getsize(input_file):
+            # Search exactly the bytes that were compressed
+            input_file = os.path.join(work_dir, 'search-none')
+            with open(input_file, 'wb') as f:
+                f.write(data)
+        print(f"Searching {len(data)} bytes with {len(queries)} queries")
+        results = run_searches(jobs, data, input_file, queries, work_dir)
+
+    timestamp = int(time.time())
+    json_file = f"search_{timestamp}.json"
+    with open(json_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    csv_file = f"search_{timestamp}.csv"
+    if results:
+        with open(csv_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    print("Results saved:")
+    print(f"JSON: {json_file}")
+    print(f"CSV: {csv_file}")
+    print(f"Total tests: {len(results)}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
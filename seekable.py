@@ -0,0 +1,323 @@
+"""
+Seekable Compression Benchmark
+
+Log viewers mostly want the tail or a byte range of a huge compressed log,
+and a whole-stream .gz/.zst has to be decompressed from the start to serve
+either. This benchmark compresses the corpus as independent frames of a fixed
+uncompressed size with an index of frame offsets, and measures what that
+costs in ratio and what it buys in read latency:
+
+- zstd: the zstd seekable format (independent frames followed by a seek table
+  in a skippable frame, so plain `zstd -d` still decodes the file)
+- gzip: independent gzip members, bgzip style
+- lz4: independent lz4 frames
+
+gzip and lz4 have nowhere to embed an index, so theirs goes to a sidecar
+file with the layout of bgzip's .gzi: a little-endian uint64 count followed
+by (compressed offset, uncompressed offset) uint64 pairs for every frame
+after the first. Every read opens the file, loads the index, seeks to the
+first frame overlapping the range and decompresses only the frames it needs.
+Each codec is also written as a single frame, the whole-stream baseline.
+
+Frames are compressed in-process through library_backend.py.
+"""
+
+import argparse
+import bisect
+import csv
+import json
+import os
+import random
+import statistics
+import struct
+import sys
+import tempfile
+import time
+
+import corpus_generator
+import library_backend
+import run_benchmark
+import sample_stats
+
+FRAME_SIZES = ['64KB', '256KB', '1MB', '4MB']  # Uncompressed bytes per independent frame
+SEEKABLE_LEVELS = ('mid',)  # Named levels from library_backend.LIBRARY_CODECS
+TAIL_SIZE = '10MB'  # Last N bytes a viewer asks for
+RANGE_SIZE = '1MB'  # Size of each random range read
+RANGE_READS = 20  # Random ranges read per configuration
+TAIL_READS = 3  # Tail reads per configuration; the median is reported
+READ_CHUNK = 1024 * 1024  # Compressed bytes fed to a decompressor at a time
+
+ZSTD_SKIPPABLE_MAGIC = 0x184D2A5E  # Skippable frame magic the seek table is stored under
+ZSTD_SEEKABLE_MAGIC = 0x8F92EAB1  # Last 4 bytes of a seekable zstd file
+ZSTD_SEEK_TABLE_FOOTER = 9  # Number_Of_Frames (u32), Seek_Table_Descriptor (u8), Seekable_Magic_Number (u32)
+
+
+def _write_sidecar_index(path: str, offsets: list, sizes: list) -> int:
+    """Write a .gzi-style index next to path; returns its size"""
+    entries = offsets[1:]
+    with open(f"{path}.idx", 'wb') as f:
+        f.write(struct.pack('<Q', len(entries)))
+        for compressed_offset, uncompressed_offset in entries:
+            f.write(struct.pack('<QQ', compressed_offset, uncompressed_offset))
+    return os.path.getsize(f"{path}.idx")
+
+
+def _read_sidecar_index(path: str) -> tuple:
+    with open(f"{path}.idx", 'rb') as f:
+        count, = struct.unpack('<Q', f.read(8))
+        entries = [struct.unpack('<QQ', f.read(16)) for _ in range(count)]
+    return [(0, 0)] + entries, os.path.getsize(path)
+
+
+def _write_seek_table(path: str, offsets: list, sizes: list) -> int:
+    """Append a zstd seek table (no checksums) to path; returns its size"""
+    entries = b''.join(struct.pack('<II', compressed, uncompressed) for compressed, uncompressed in sizes)
+    footer = struct.pack('<IBI', len(sizes), 0, ZSTD_SEEKABLE_MAGIC)
+    table = struct.pack('<II', ZSTD_SKIPPABLE_MAGIC, len(entries) + len(footer)) + entries + footer
+    with open(path, 'ab') as f:
+        f.write(table)
+    return len(table)
+
+
+def _read_seek_table(path: str) -> tuple:
+    with open(path, 'rb') as f:
+        f.seek(-ZSTD_SEEK_TABLE_FOOTER, os.SEEK_END)
+        count, descriptor, magic = struct.unpack('<IBI', f.read(ZSTD_SEEK_TABLE_FOOTER))
+        if magic != ZSTD_SEEKABLE_MAGIC:
+            raise ValueError(f"{path} has no zstd seek table")
+        entry_size = 12 if descriptor & 0x80 else 8
+        f.seek(-ZSTD_SEEK_TABLE_FOOTER - count * entry_size, os.SEEK_END)
+        table = f.read(count * entry_size)
+    offsets = []
+    compressed_offset = uncompressed_offset = 0
+    for i in range(count):
+        compressed, uncompressed = struct.unpack_from('<II', table, i * entry_size)
+        offsets.append((compressed_offset, uncompressed_offset))
+        compressed_offset += compressed
+        uncompressed_offset += uncompressed
+    return offsets, compressed_offset
+
+
+# Names and levels follow library_backend.LIBRARY_CODECS, whose compressor
+# and decompressor factories produce one independent frame each.
+# 'write_index' gets the file path, the (compressed, uncompressed) offset and
+# the (compressed, uncompressed) size of every frame and returns the index
+# size; 'read_index' returns the offsets again and where the last frame ends.
+SEEKABLE_CODECS = {
+    'zstd_single_threaded': {
+        'format': 'zstd seekable',
+        'extension': '.zst',
+        'write_index': _write_seek_table,
+        'read_index': _read_seek_table,
+    },
+    'gzip': {
+        'format': 'gzip members',
+        'extension': '.gz',
+        'write_index': _write_sidecar_index,
+        'read_index': _read_sidecar_index,
+    },
+    'lz4': {
+        'format': 'lz4 frames',
+        'extension': '.lz4',
+        'write_index': _write_sidecar_index,
+        'read_index': _read_sidecar_index,
+    },
+}
+
+
+def write_seekable(algorithm: str, level_value, data: bytes, frame_size: int, path: str) -> dict:
+    """Compress data into independent frames of frame_size bytes at path and index them"""
+    codec = library_backend.LIBRARY_CODECS[algorithm]
+    offsets = []
+    sizes = []
+    compressed_offset = 0
+    start_time = time.perf_counter()
+    with open(path, 'wb') as f:
+        for uncompressed_offset in range(0, len(data), frame_size):
+            block = data[uncompressed_offset:uncompressed_offset + frame_size]
+            compressor = codec['compressor'](level_value)
+            frame = compressor.compress(block) + compressor.flush()
+            f.write(frame)
+            offsets.append((compressed_offset, uncompressed_offset))
+            sizes.append((len(frame), len(block)))
+            compressed_offset += len(frame)
+    index_size = SEEKABLE_CODECS[algorithm]['write_index'](path, offsets, sizes)
+    return {
+        'frames': len(offsets),
+        'compression_time': time.perf_counter() - start_time,
+        'compressed_size': compressed_offset,
+        'index_size': index_size,
+    }
+
+
+def read_range(algorithm: str, path: str, start: int, length: int) -> tuple:
+    """
+    Read length uncompressed bytes from start, as a viewer serving the range would
+
+    Returns (bytes, uncompressed bytes decompressed to serve them).
+    """
+    offsets, frames_end = SEEKABLE_CODECS[algorithm]['read_index'](path)
+    first = bisect.bisect_right([u for _, u in offsets], start) - 1
+    end = start + length
+    output = []
+    decompressed = 0
+    with open(path, 'rb') as f:
+        for i in range(first, len(offsets)):
+            compressed_offset, uncompressed_offset = offsets[i]
+            if uncompressed_offset >= end:
+                break
+            f.seek(compressed_offset)
+            decompressor = library_backend.LIBRARY_CODECS[algorithm]['decompressor']()
+            position = uncompressed_offset
+            remaining = (offsets[i + 1][0] if i + 1 < len(offsets) else frames_end) - compressed_offset
+            while position < end and remaining > 0:
+                chunk = f.read(min(READ_CHUNK, remaining))
+                remaining -= len(chunk)
+                block = decompressor.decompress(chunk)
+                decompressed += len(block)
+                output.append(block[max(0, start - position):max(0, end - position)])
+                position += len(block)
+    return b''.join(output), decompressed
+
+
+def timed_read(algorithm: str, path: str, data: bytes, start: int, length: int) -> tuple:
+    """(latency, decompressed bytes, valid) of one range read"""
+    start_time = time.perf_counter()
+    output, decompressed = read_range(algorithm, path, start, length)
+    return time.perf_counter() - start_time, decompressed, output == data[start:start + length]
+
+
+def run_seekable(data: bytes, codecs: list, frame_sizes: list, tail_size: int, range_size: int,
+                 range_reads: int, seed: int, work_dir: str) -> list:
+    """Write every codec/level/frame size plus the whole-stream baseline and time tail and range reads"""
+    rng = random.Random(seed)
+    range_starts = [rng.randrange(0, max(1, len(data) - range_size)) for _ in range(range_reads)]
+    tail_start = max(0, len(data) - tail_size)
+    results = []
+    for algorithm in codecs:
+        library_codec = library_backend.LIBRARY_CODECS[algorithm]
+        for level_name in SEEKABLE_LEVELS:
+            level_value = library_codec['levels'][level_name]
+            baseline = None
+            # The whole-stream baseline is a single frame, read through the same code path
+            for frame_size in [len(data)] + frame_sizes:
+                label = "whole stream" if frame_size == len(data) else f"{frame_size // 1024} KB frames"
+                print(f"Writing {algorithm} level {level_name} ({level_value}), {label}...")
+                path = os.path.join(work_dir, f"seekable-{algorithm}-{level_value}-{frame_size}"
+                                              f"{SEEKABLE_CODECS[algorithm]['extension']}")
+                written = write_seekable(algorithm, level_value, data, frame_size, path)
+                if baseline is None:
+                    baseline = written
+
+                tail_reads = [timed_read(algorithm, path, data, tail_start, tail_size) for _ in range(TAIL_READS)]
+                range_results = [timed_read(algorithm, path, data, start, range_size) for start in range_starts]
+                range_latencies = [latency for latency, _, _ in range_results]
+                total_size = written['compressed_size'] + written['index_size']
+                result = {
+                    'mode': 'seekable',
+                    'algorithm': algorithm,
+                    'library': library_codec['library'],
+                    'format': SEEKABLE_CODECS[algorithm]['format'],
+                    'level_name': level_name,
+                    'level_value': level_value,
+                    'frame_size': 0 if frame_size == len(data) else frame_size,  # 0: whole stream
+                    'input_size': len(data),
+                    **written,
+                    'compression_ratio': total_size / len(data),
+                    # Size added by framing and the index, relative to the whole stream
+                    'ratio_cost': total_size / (baseline['compressed_size'] + baseline['index_size']) - 1,
+                    'compression_throughput': len(data) / written['compression_time'],
+                    'tail_size': tail_size,
+                    'tail_read_latency': statistics.median(latency for latency, _, _ in tail_reads),
+                    'range_size': range_size,
+                    'range_reads': len(range_results),
+                    'median_range_latency': statistics.median(range_latencies),
+                    'p95_range_latency': sample_stats.percentile(range_latencies, 0.95),
+                    # Uncompressed bytes decompressed per byte served
+                    'read_amplification': statistics.mean(d for _, d, _ in range_results) / range_size,
+                    'sha256_valid': all(valid for _, _, valid in tail_reads + range_results),
+                }
+                print(f"  ratio {result['compression_ratio']:.3f} ({result['ratio_cost']:+.2%} vs whole stream), "
+                      f"tail {result['tail_read_latency'] * 1000:.1f} ms, "
+                      f"range p50 {result['median_range_latency'] * 1000:.1f} ms")
+                if not result['sha256_valid']:
+                    print("  Verification failed")
+                results.append(result)
+                os.remove(path)
+                if os.path.exists(f"{path}.idx"):
+                    os.remove(f"{path}.idx")
+    return results
+
+
+def main():
+    global SEEKABLE_LEVELS
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark seekable (independently framed, indexed) compression and random-access reads'
+    )
+    parser.add_argument('--corpus-size', type=corpus_generator.parse_size, default=run_benchmark.TEST_FILE_SIZE,
+                        help='Size of the generated corpus, e.g. 300MB or 1G (default: 300MB)')
+    parser.add_argument('--frame-sizes', default=','.join(FRAME_SIZES),
+                        help=f"Comma-separated uncompressed frame sizes (default: {','.join(FRAME_SIZES)})")
+    parser.add_argument('--tail-size', type=corpus_generator.parse_size, default=TAIL_SIZE,
+                        help=f'Bytes read from the end of the log (default: {TAIL_SIZE})')
+    parser.add_argument('--range-size', type=corpus_generator.parse_size, default=RANGE_SIZE,
+                        help=f'Bytes per random range read (default: {RANGE_SIZE})')
+    parser.add_argument('--range-reads', type=int, default=RANGE_READS,
+                        help=f'Random ranges read per configuration (default: {RANGE_READS})')
+    parser.add_argument('--levels', default=','.join(SEEKABLE_LEVELS),
+                        help=f"Comma-separated level names (default: {','.join(SEEKABLE_LEVELS)})")
+    parser.add_argument('--codecs',
+                        help=f"Comma-separated subset of {', '.join(SEEKABLE_CODECS)}")
+    parser.add_argument('--work-dir',
+                        help='Directory for the compressed files (default: a temporary directory)')
+    parser.add_argument('--seed', type=int, default=run_benchmark.CORPUS_SEED,
+                        help='Seed for the generated corpus and the range offsets')
+    parser.add_argument('--corpus-profile',
+                        help='JSON file overriding the corpus content profile (see corpus_generator.py)')
+    args = parser.parse_args()
+
+    SEEKABLE_LEVELS = tuple(args.levels.split(','))
+    frame_sizes = [corpus_generator.parse_size(size) for size in args.frame_sizes.split(',')]
+    codecs = [name for name in SEEKABLE_CODECS if library_backend.LIBRARY_CODECS[name]['available']]
+    if args.codecs:
+        codecs = [name for name in codecs if name in args.codecs.split(',')]
+    if not codecs:
+        print("Error: none of the selected codecs has its Python binding installed")
+        sys.exit(1)
+
+    input_file = run_benchmark.create_test_file(args.corpus_size, args.seed, args.corpus_profile)
+    with open(input_file, 'rb') as f:
+        data = f.read(args.corpus_size)
+    if len(data) >= 2 ** 32:
+        raise ValueError("The zstd seek table stores 32-bit frame sizes; use a corpus under 4GB")
+    print(f"Reading from {input_file} ({len(data)} bytes)")
+
+    with tempfile.TemporaryDirectory(prefix='compbench-seekable-', dir=args.work_dir) as work_dir:
+        results = run_seekable(data, codecs, frame_sizes, args.tail_size, args.range_size,
+                               args.range_reads, args.seed, work_dir)
+
+    timestamp = int(time.time())
+    json_file = f"seekable_{timestamp}.json"
+    with open(json_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    csv_file = f"seekable_{timestamp}.csv"
+    if results:
+        with open(csv_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    print("Results saved:")
+    print(f"JSON: {json_file}")
+    print(f"CSV: {csv_file}")
+    print(f"Total tests: {len(results)}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
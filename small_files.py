@@ -0,0 +1,341 @@
+"""
+Small-File Benchmark
+
+Teuthology archives hold thousands of small per-daemon logs, YAML configs and
+summaries next to the big teuthology.log, and a general-purpose codec has
+little history to work with in each of them. This benchmark splits the corpus
+into small records of a configurable size distribution (or takes the files of
+a real archive directory), trains zstd dictionaries on a random sample of the
+records and compresses every other record on its own, with and without a
+dictionary. Ratio and per-file latency are reported for every level and
+dictionary size; the cost of training is reported separately.
+
+The library backend (python zstandard) times each record in-process. The CLI
+backend runs `zstd --train` and one zstd process per record, so its per-file
+latency includes process startup; its ratios are exact either way.
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import corpus_generator
+import run_benchmark
+import sample_stats
+from library_backend import zstandard
+
+RECORD_SIZES = '1KB:0.3,4KB:0.4,16KB:0.2,64KB:0.1'  # size:weight buckets; each record is 0.5-1.5x its bucket size
+RECORD_COUNT = 2000  # Records split from the corpus (or files read from --input-dir)
+MAX_RECORD_SIZE = 1024 * 1024  # Larger archive files are not small files; run_benchmark.py covers them
+TRAIN_FRACTION = 0.1  # Share of the records the dictionaries are trained on; only the rest are measured
+DICT_SIZES = ['16KB', '112KB']  # 112KB is the zstd --train default (--maxdict=112640)
+ZSTD_CODEC = 'zstd_single_threaded'  # Registry codec whose named levels are measured
+COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.xz', '.zst', '.lz4', '.br')  # Archive files skipped by --input-dir
+SIZE_CLASSES = [  # (upper bound, label) of the per-size ratio breakdown
+    (1024, 'upto_1KB'),
+    (4 * 1024, '1KB_4KB'),
+    (16 * 1024, '4KB_16KB'),
+    (64 * 1024, '16KB_64KB'),
+    (None, 'over_64KB'),
+]
+
+
+def parse_distribution(value: str) -> list:
+    """Parse size:weight buckets such as 1KB:0.3,4KB:0.7 into [(bytes, weight)]"""
+    buckets = []
+    for item in value.split(','):
+        size, _, weight = item.partition(':')
+        buckets.append((corpus_generator.parse_size(size), float(weight or 1)))
+    if not buckets or any(size <= 0 or weight < 0 for size, weight in buckets):
+        raise ValueError(f"Invalid record size distribution {value!r}")
+    return buckets
+
+
+def split_records(data: bytes, distribution: list, count: int, seed: int) -> list:
+    """
+    Cut data into up to count consecutive records drawn from the size distribution
+
+    Every record ends at a line boundary, like a log file closed mid-run.
+    """
+    rng = random.Random(seed)
+    sizes, weights = zip(*distribution)
+    records = []
+    position = 0
+    while len(records) < count and position < len(data):
+        target = int(rng.choices(sizes, weights)[0] * rng.uniform(0.5, 1.5))
+        end = data.find(b'\n', position + max(target, 1) - 1)
+        end = len(data) if end == -1 else end + 1
+        records.append(data[position:end])
+        position = end
+    return records
+
+
+def read_records(input_dir: str, count: int) -> list:
+    """Contents of up to count non-empty, uncompressed files under input_dir of at most MAX_RECORD_SIZE"""
+    records = []
+    skipped = 0
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if name.endswith(COMPRESSED_EXTENSIONS) or not os.path.isfile(path):
+                continue
+            if os.path.getsize(path) > MAX_RECORD_SIZE:
+                skipped += 1
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            if data:
+                records.append(data)
+            if len(records) >= count:
+                return records
+    if skipped:
+        print(f"Skipped {skipped} files larger than {MAX_RECORD_SIZE // 1024} KB")
+    return records
+
+
+def _train_library(samples: list, dict_size: int) -> bytes:
+    try:
+        return zstandard.train_dictionary(dict_size, samples).as_bytes()
+    except zstandard.ZstdError as e:
+        raise RuntimeError(str(e))
+
+
+def _measure_library(records: list, level: int, dictionary: bytes) -> list:
+    dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+    compressor = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+    decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+    measurements = []
+    for record in records:
+        start = time.perf_counter()
+        compressed = compressor.compress(record)
+        compressed_at = time.perf_counter()
+        valid = decompressor.decompress(compressed) == record
+        measurements.append((len(compressed), compressed_at - start, time.perf_counter() - compressed_at, valid))
+    return measurements
+
+
+def _train_cli(samples: list, dict_size: int) -> bytes:
+    with tempfile.TemporaryDirectory(prefix='compbench-train-') as tmp:
+        sample_dir = os.path.join(tmp, 'samples')
+        os.mkdir(sample_dir)
+        for i, sample in enumerate(samples):
+            with open(os.path.join(sample_dir, f"{i:06d}"), 'wb') as f:
+                f.write(sample)
+        dict_path = os.path.join(tmp, 'dictionary')
+        process = subprocess.run(['zstd', '--train', '-q', '-r', sample_dir, '-o', dict_path, f'--maxdict={dict_size}'],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if process.returncode != 0:
+            raise RuntimeError(process.stderr.decode(errors='replace').strip())
+        with open(dict_path, 'rb') as f:
+            return f.read()
+
+
+def _measure_cli(records: list, level: int, dictionary: bytes) -> list:
+    with tempfile.NamedTemporaryFile(prefix='compbench-dict-') as dict_file:
+        dict_options = []
+        if dictionary:
+            dict_file.write(dictionary)
+            dict_file.flush()
+            dict_options = ['-D', dict_file.name]
+        measurements = []
+        for record in records:
+            start = time.perf_counter()
+            compressed = subprocess.run(['zstd', '-c', '-q', f'-{level}'] + dict_options, input=record,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            compressed_at = time.perf_counter()
+            decompressed = subprocess.run(['zstd', '-dc', '-q'] + dict_options, input=compressed.stdout,
+                                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            valid = compressed.returncode == 0 and decompressed.returncode == 0 and decompressed.stdout == record
+            measurements.append((len(compressed.stdout), compressed_at - start, time.perf_counter() - compressed_at, valid))
+        return measurements
+
+
+# 'train' takes the sample records and a maximum dictionary size and returns
+# the dictionary (RuntimeError when training fails); 'measure' compresses and
+# decompresses each record on its own and returns
+# [(compressed size, compression seconds, decompression seconds, valid)].
+BACKENDS = {
+    'library': {'available': zstandard is not None, 'train': _train_library, 'measure': _measure_library},
+    'cli': {'available': True, 'train': _train_cli, 'measure': _measure_cli},
+}
+
+
+def size_class(size: int) -> str:
+    """SIZE_CLASSES label of a record size"""
+    for bound, label in SIZE_CLASSES:
+        if bound is None or size <= bound:
+            return label
+
+
+def summarize(records: list, measurements: list) -> dict:
+    """Aggregate ratio, latency and verification of one level/dictionary pass"""
+    input_size = sum(len(record) for record in records)
+    compressed_size = sum(m[0] for m in measurements)
+    compression_latencies = [m[1] for m in measurements]
+    decompression_latencies = [m[2] for m in measurements]
+    summary = {
+        'input_size': input_size,
+        'compressed_size': compressed_size,
+        'compression_ratio': compressed_size / input_size,
+        'median_file_ratio': statistics.median(m[0] / len(record) for record, m in zip(records, measurements)),
+        'median_compression_latency': statistics.median(compression_latencies),
+        'p95_compression_latency': sample_stats.percentile(compression_latencies, 0.95),
+        'median_decompression_latency': statistics.median(decompression_latencies),
+        'p95_decompression_latency': sample_stats.percentile(decompression_latencies, 0.95),
+        'files_per_second': len(records) / sum(compression_latencies),
+        'sha256_valid': all(m[3] for m in measurements),
+    }
+    for _, label in SIZE_CLASSES:
+        sizes = [(len(record), m[0]) for record, m in zip(records, measurements) if size_class(len(record)) == label]
+        summary[f'ratio_{label}'] = sum(c for _, c in sizes) / sum(s for s, _ in sizes) if sizes else None
+    return summary
+
+
+def run_small_files(records: list, train_fraction: float, dict_sizes: list, levels: dict,
+                    backend: str, seed: int) -> list:
+    """Train one dictionary per size on a sample and measure every level with and without each"""
+    order = list(range(len(records)))
+    random.Random(seed).shuffle(order)
+    train_count = max(1, int(len(records) * train_fraction))
+    samples = [records[i] for i in order[:train_count]]
+    test = [records[i] for i in order[train_count:]]
+    if not test:
+        raise ValueError(f"No records left to measure after training on {train_count} of {len(records)}")
+    print(f"Training on {len(samples)} records ({sum(map(len, samples))} bytes), "
+          f"measuring {len(test)} records ({sum(map(len, test))} bytes)")
+
+    dictionaries = [(0, None, 0.0)]
+    for dict_size in dict_sizes:
+        print(f"Training a {dict_size // 1024} KB dictionary ({backend})...")
+        start = time.perf_counter()
+        try:
+            dictionary = BACKENDS[backend]['train'](samples, dict_size)
+        except RuntimeError as e:
+            print(f"  Warning: training failed, skipping this size: {e}")
+            continue
+        training_time = time.perf_counter() - start
+        print(f"  {len(dictionary)} bytes in {training_time:.2f}s")
+        dictionaries.append((dict_size, dictionary, training_time))
+
+    results = []
+    for level_name, level_value in levels.items():
+        baseline = None
+        for dict_size, dictionary, training_time in dictionaries:
+            label = f"{dict_size // 1024} KB dictionary" if dictionary else "no dictionary"
+            print(f"Compressing {len(test)} records at {level_name} ({level_value}), {label}...")
+            summary = summarize(test, BACKENDS[backend]['measure'](test, level_value, dictionary))
+            if baseline is None:
+                baseline = summary
+            dict_bytes = len(dictionary) if dictionary else 0
+            result = {
+                'mode': 'small_files',
+                'algorithm': ZSTD_CODEC,
+                'backend': backend,
+                'level_name': level_name,
+                'level_value': level_value,
+                'dict_size': dict_size,
+                'dict_actual_size': dict_bytes,
+                'training_time': training_time,
+                'training_records': len(samples) if dictionary else 0,
+                'training_size': sum(map(len, samples)) if dictionary else 0,
+                'records': len(test),
+                **summary,
+                # The dictionary is stored once next to the records it serves
+                'compression_ratio_with_dict': (summary['compressed_size'] + dict_bytes) / summary['input_size'],
+                # Size saved relative to compressing the same records without a dictionary
+                'dict_gain': 1 - summary['compressed_size'] / baseline['compressed_size'],
+            }
+            print(f"  ratio {result['compression_ratio']:.3f} ({result['dict_gain']:+.1%} saved), "
+                  f"median {result['median_compression_latency'] * 1e6:.0f} us/file, "
+                  f"p95 {result['p95_compression_latency'] * 1e6:.0f} us/file")
+            if not result['sha256_valid']:
+                print("  Verification failed")
+            results.append(result)
+    return results
+
+
+def main():
+    default_backend = 'library' if BACKENDS['library']['available'] else 'cli'
+    parser = argparse.ArgumentParser(
+        description='Benchmark zstd dictionary compression of small files'
+    )
+    parser.add_argument('--input-dir',
+                        help='Use the files of this archive directory as records instead of splitting the corpus')
+    parser.add_argument('--record-sizes', default=RECORD_SIZES,
+                        help=f'Comma-separated size:weight buckets records are drawn from (default: {RECORD_SIZES})')
+    parser.add_argument('--records', type=int, default=RECORD_COUNT,
+                        help=f'Number of records (default: {RECORD_COUNT})')
+    parser.add_argument('--train-fraction', type=float, default=TRAIN_FRACTION,
+                        help=f'Share of the records used for training (default: {TRAIN_FRACTION})')
+    parser.add_argument('--dict-sizes', default=','.join(DICT_SIZES),
+                        help=f"Comma-separated maximum dictionary sizes (default: {','.join(DICT_SIZES)})")
+    parser.add_argument('--levels',
+                        help=f'Comma-separated subset of the {ZSTD_CODEC} level names in the codec registry')
+    parser.add_argument('--backend', choices=list(BACKENDS), default=default_backend,
+                        help=f'Train and compress in-process or with the zstd CLI (default: {default_backend})')
+    parser.add_argument('--seed', type=int, default=run_benchmark.CORPUS_SEED,
+                        help='Seed for the generated corpus, record sizes and training sample')
+    parser.add_argument('--corpus-profile',
+                        help='JSON file overriding the corpus content profile (see corpus_generator.py)')
+    args = parser.parse_args()
+
+    if not BACKENDS[args.backend]['available']:
+        print("Error: the library backend needs the zstandard Python binding")
+        sys.exit(1)
+    if not 0 < args.train_fraction < 1:
+        raise ValueError(f"--train-fraction must be between 0 and 1, not {args.train_fraction}")
+    dict_sizes = [corpus_generator.parse_size(size) for size in args.dict_sizes.split(',')]
+    levels = run_benchmark.ALGORITHMS_SINGLE_THREADS[ZSTD_CODEC]['levels']
+    if args.levels:
+        levels = {name: value for name, value in levels.items() if name in args.levels.split(',')}
+
+    if args.input_dir:
+        records = read_records(args.input_dir, args.records)
+        print(f"Read {len(records)} files from {args.input_dir}")
+    else:
+        distribution = parse_distribution(args.record_sizes)
+        # Enough corpus for the requested records at the distribution's mean size
+        mean_size = sum(size * weight for size, weight in distribution) / sum(weight for _, weight in distribution)
+        corpus_size = int(mean_size * args.records * 1.1)
+        input_file = run_benchmark.create_test_file(corpus_size, args.seed, args.corpus_profile)
+        with open(input_file, 'rb') as f:
+            data = f.read(corpus_size)
+        records = split_records(data, distribution, args.records, args.seed)
+        print(f"Split {len(records)} records from {input_file}")
+    if len(records) < 2:
+        raise ValueError("Need at least two records to train on and measure")
+
+    results = run_small_files(records, args.train_fraction, dict_sizes, levels, args.backend, args.seed)
+
+    timestamp = int(time.time())
+    json_file = f"small_files_{timestamp}.json"
+    with open(json_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    csv_file = f"small_files_{timestamp}.csv"
+    if results:
+        with open(csv_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    print("Results saved:")
+    print(f"JSON: {json_file}")
+    print(f"CSV: {csv_file}")
+    print(f"Total tests: {len(results)}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -17,17 +17,21 @@ if [[ "$DEV_MODE" == "true" ]]; then
       --cpuset-cpus="0-5" \
       --memory="8g" \
       --memory-swap="8g" \
-      --privileged \
       -v $PWD:/data \
       -w /data \
       compbench /bin/bash
 else
     echo "Starting container in normal mode..."
     echo "Run './start.sh --dev' for development mode with live file mounting."
+    # Generated corpora and the result store are kept on the host so container rebuilds reuse them
+    mkdir -p "$PWD/.corpus_cache" "$PWD/.result_store"
     docker run --rm -it \
       --cpuset-cpus="0-5" \
       --memory="8g" \
       --memory-swap="8g" \
-      --privileged \
+      -v "$PWD/.corpus_cache":/corpus_cache \
+      -e COMPBENCH_CORPUS_CACHE=/corpus_cache \
+      -v "$PWD/.result_store":/result_store \
+      -e COMPBENCH_RESULT_STORE=/result_store/results.db \
       compbench /bin/bash
 fi
\ No newline at end of file
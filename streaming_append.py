@@ -0,0 +1,327 @@
+"""
+Streaming-Append Benchmark
+
+Replays the corpus as a live line stream at a fixed ingest rate and compresses
+it on the fly with periodic flushes, the way a teuthology job would if it
+compressed its log while writing it. For each codec, level, ingest rate and
+flush interval it measures the latency of each flush, the CPU the compressor
+needs to keep up with the stream, and the ratio lost to flushing compared
+with one-shot compression of the same bytes.
+
+The CLI tools cannot be told to flush mid-stream, so this mode drives the
+in-process library bindings (see library_backend.py).
+"""
+
+import argparse
+import csv
+import json
+import resource
+import statistics
+import sys
+import time
+import zlib
+
+import corpus_generator
+import library_backend
+import run_benchmark
+import sample_stats
+from library_backend import brotli, lz4, zstandard
+
+STREAM_RATES = ['1MB', '10MB']  # Ingest rates to replay at (per second)
+FLUSH_INTERVALS = [0.1, 1.0, 10.0]  # Seconds between flushes
+STREAM_DURATION = 20  # Seconds of replay per configuration
+STREAM_LEVELS = ('low', 'mid')  # High levels are not candidates for on-the-fly compression
+REPLAY_TICK = 0.01  # Seconds between writes of the lines that have come due
+KEEP_UP_LAG = 1.0  # A replay more than this many seconds behind schedule did not keep up
+
+
+class _GzipStream:
+    """One gzip member; every flush is a Z_SYNC_FLUSH"""
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def write(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def close(self):
+        return self._compressor.flush()
+
+
+class _ZstdStream:
+    """Every flush ends the current zstd frame; the stream is a concatenation of frames"""
+
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._frame = self._compressor.compressobj()
+
+    def write(self, data):
+        return self._frame.compress(data)
+
+    def flush(self):
+        output = self._frame.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+        self._frame = self._compressor.compressobj()
+        return output
+
+    def close(self):
+        return self._frame.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+class _LZ4Stream:
+    """Every flush ends the current lz4 frame; the stream is a concatenation of frames"""
+
+    def __init__(self, level):
+        self._compressor = lz4.frame.LZ4FrameCompressor(compression_level=level, auto_flush=False)
+        self._header = self._compressor.begin()
+
+    def write(self, data):
+        output = self._header + self._compressor.compress(data)
+        self._header = b''
+        return output
+
+    def flush(self):
+        output = self._header + self._compressor.flush()
+        self._header = self._compressor.begin()
+        return output
+
+    def close(self):
+        return self._header + self._compressor.flush()
+
+
+class _BrotliStream:
+    """One brotli stream; every flush is a BROTLI_OPERATION_FLUSH"""
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def write(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def close(self):
+        return self._compressor.finish()
+
+
+def _zstd_decompress_frames(data):
+    """Decompress a concatenation of zstd frames"""
+    output = []
+    while data:
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+        output.append(decompressor.decompress(data))
+        data = decompressor.unused_data
+    return b''.join(output)
+
+
+def _lz4_decompress_frames(data):
+    """Decompress a concatenation of lz4 frames"""
+    output = []
+    while data:
+        decompressor = lz4.frame.LZ4FrameDecompressor()
+        output.append(decompressor.decompress(data))
+        data = decompressor.unused_data
+    return b''.join(output)
+
+
+# Names and levels follow library_backend.LIBRARY_CODECS.
+# 'stream' takes a level and returns an object with write()/flush()/close(),
+# each returning the compressed bytes produced; 'decompress' verifies the output.
+STREAMING_CODECS = {
+    'gzip': {
+        'available': True,
+        'stream': _GzipStream,
+        'flush_method': 'Z_SYNC_FLUSH',
+        'decompress': lambda data: zlib.decompress(data, 31),
+    },
+    'zstd_single_threaded': {
+        'available': zstandard is not None,
+        'stream': _ZstdStream,
+        'flush_method': 'new frame',
+        'decompress': _zstd_decompress_frames,
+    },
+    'lz4': {
+        'available': lz4 is not None,
+        'stream': _LZ4Stream,
+        'flush_method': 'new frame',
+        'decompress': _lz4_decompress_frames,
+    },
+    'brotli': {
+        'available': brotli is not None,
+        'stream': _BrotliStream,
+        'flush_method': 'BROTLI_OPERATION_FLUSH',
+        'decompress': lambda data: brotli.decompress(data),
+    },
+}
+
+
+def oneshot_size(codec: dict, level_value, data: bytes) -> int:
+    """Compressed size of data without any intermediate flush"""
+    stream = codec['stream'](level_value)
+    return len(stream.write(data)) + len(stream.close())
+
+
+def replay(codec: dict, level_value, data: bytes, rate: int, flush_interval: float) -> dict:
+    """
+    Feed data into a compression stream at rate bytes/s and flush it every flush_interval seconds
+
+    Every REPLAY_TICK the lines that have come due are written, always cut
+    at a line boundary like a logger would. Flush latency is the time spent
+    in each flush() call; CPU is the benchmarking thread's, so sleeping
+    between ticks is not counted. Returns the replay's measurements.
+    """
+    stream = codec['stream'](level_value)
+    compressed_chunks = []
+    flush_latencies = []
+    written = 0
+    max_lag = 0.0
+    next_flush = flush_interval
+
+    usage_before = resource.getrusage(resource.RUSAGE_THREAD)
+    start_time = time.perf_counter()
+    while written < len(data):
+        now = time.perf_counter() - start_time
+        due = min(len(data), int(now * rate))
+        end = due if due == len(data) else data.rfind(b'\n', written, due) + 1
+        if end > written:
+            compressed_chunks.append(stream.write(data[written:end]))
+            written = end
+        if now >= next_flush:
+            flush_start = time.perf_counter()
+            compressed_chunks.append(stream.flush())
+            flush_latencies.append(time.perf_counter() - flush_start)
+            while next_flush <= now:
+                next_flush += flush_interval
+        # How far the writer is behind the ingest schedule
+        max_lag = max(max_lag, time.perf_counter() - start_time - written / rate)
+        time.sleep(max(0.0, REPLAY_TICK - (time.perf_counter() - start_time - now)))
+    compressed_chunks.append(stream.close())
+    wall_time = time.perf_counter() - start_time
+    usage_after = resource.getrusage(resource.RUSAGE_THREAD)
+
+    compressed = b''.join(compressed_chunks)
+    cpu_seconds = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    return {
+        'wall_time': wall_time,
+        'compressed_size': len(compressed),
+        'flushes': len(flush_latencies),
+        'median_flush_latency': statistics.median(flush_latencies) if flush_latencies else None,
+        'p95_flush_latency': sample_stats.percentile(flush_latencies, 0.95) if flush_latencies else None,
+        'max_flush_latency': max(flush_latencies) if flush_latencies else None,
+        'cpu_seconds': cpu_seconds,
+        'max_lag': max_lag,
+        'sha256_valid': codec['decompress'](compressed) == data,
+    }
+
+
+def run_streaming(data: bytes, rates: list, flush_intervals: list, codecs: dict) -> list:
+    """Replay every codec/level at every ingest rate and flush interval"""
+    results = []
+    for algorithm, codec in codecs.items():
+        levels = library_backend.LIBRARY_CODECS[algorithm]['levels']
+        for level_name in STREAM_LEVELS:
+            level_value = levels[level_name]
+            for rate in rates:
+                stream_input = data[:int(rate * STREAM_DURATION)]
+                stream_input = stream_input[:stream_input.rfind(b'\n') + 1]
+                baseline_size = oneshot_size(codec, level_value, stream_input)
+                for flush_interval in flush_intervals:
+                    print(f"Streaming {algorithm} level {level_name} ({level_value}) at "
+                          f"{rate / 1024 / 1024:g} MB/s, flush every {flush_interval:g}s...")
+                    measurement = replay(codec, level_value, stream_input, rate, flush_interval)
+                    result = {
+                        'mode': 'streaming',
+                        'algorithm': algorithm,
+                        'library': library_backend.LIBRARY_CODECS[algorithm]['library'],
+                        'level_name': level_name,
+                        'level_value': level_value,
+                        'flush_method': codec['flush_method'],
+                        'ingest_rate': rate,
+                        'flush_interval': flush_interval,
+                        'input_size': len(stream_input),
+                        **measurement,
+                        'compression_ratio': measurement['compressed_size'] / len(stream_input),
+                        'oneshot_compressed_size': baseline_size,
+                        # Size added by flushing, relative to one-shot compression of the same bytes
+                        'ratio_loss': measurement['compressed_size'] / baseline_size - 1,
+                        # Cores the compressor keeps busy at this ingest rate
+                        'cpu_utilization': measurement['cpu_seconds'] / measurement['wall_time'],
+                        'cpu_seconds_per_gb': measurement['cpu_seconds'] / (len(stream_input) / 1024 ** 3),
+                        'kept_up': measurement['max_lag'] <= KEEP_UP_LAG,
+                    }
+                    latency = result['p95_flush_latency']
+                    print(f"  ratio {result['compression_ratio']:.3f} ({result['ratio_loss']:+.2%} vs one-shot), "
+                          f"{result['cpu_utilization']:.1%} of a core, p95 flush "
+                          + (f"{latency * 1000:.2f} ms" if latency is not None else "-")
+                          + ("" if result['kept_up'] else f", fell {result['max_lag']:.1f}s behind"))
+                    if not result['sha256_valid']:
+                        print("  Verification failed")
+                    results.append(result)
+    return results
+
+
+def main():
+    global STREAM_DURATION
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark on-the-fly compression of a live log stream with periodic flushes'
+    )
+    parser.add_argument('--rates', default=','.join(STREAM_RATES),
+                        help=f"Comma-separated ingest rates per second (default: {','.join(STREAM_RATES)})")
+    parser.add_argument('--flush-intervals', default=','.join(str(i) for i in FLUSH_INTERVALS),
+                        help='Comma-separated seconds between flushes (default: 0.1,1.0,10.0)')
+    parser.add_argument('--duration', type=float, default=STREAM_DURATION,
+                        help=f'Seconds of replay per configuration (default: {STREAM_DURATION})')
+    parser.add_argument('--codecs',
+                        help=f"Comma-separated subset of {', '.join(STREAMING_CODECS)}")
+    parser.add_argument('--seed', type=int, default=run_benchmark.CORPUS_SEED,
+                        help='Seed for the generated corpus')
+    parser.add_argument('--corpus-profile',
+                        help='JSON file overriding the corpus content profile (see corpus_generator.py)')
+    args = parser.parse_args()
+
+    STREAM_DURATION = args.duration
+    rates = [corpus_generator.parse_size(rate) for rate in args.rates.split(',')]
+    flush_intervals = [float(interval) for interval in args.flush_intervals.split(',')]
+    codecs = {name: codec for name, codec in STREAMING_CODECS.items() if codec['available']}
+    if args.codecs:
+        codecs = {name: codec for name, codec in codecs.items() if name in args.codecs.split(',')}
+    if not codecs:
+        print("Error: none of the selected codecs has its Python binding installed")
+        sys.exit(1)
+
+    # Only as much corpus as the fastest replay consumes
+    input_file = run_benchmark.create_test_file(int(max(rates) * STREAM_DURATION), args.seed, args.corpus_profile)
+    with open(input_file, 'rb') as f:
+        data = f.read(int(max(rates) * STREAM_DURATION))
+    print(f"Streaming from {input_file} ({len(data)} bytes)")
+
+    results = run_streaming(data, [int(rate) for rate in rates], flush_intervals, codecs)
+
+    timestamp = int(time.time())
+    json_file = f"streaming_{timestamp}.json"
+    with open(json_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    csv_file = f"streaming_{timestamp}.csv"
+    if results:
+        with open(csv_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    print("Results saved:")
+    print(f"JSON: {json_file}")
+    print(f"CSV: {csv_file}")
+    print(f"Total tests: {len(results)}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,332 @@
+"""
+Compress-and-Upload Pipeline Benchmark
+
+In production a teuthology log is uploaded to the archive right after it is
+compressed, so what a job pays is compression plus transfer of the
+compressed bytes. When the codec's output is streamed straight into the
+upload, the two overlap, and the total is not the sum of the separate
+times. This benchmark runs a local stand-in object server that accepts
+HTTP PUTs at a throttled bandwidth and latency, and times for each codec,
+level and link:
+
+- sequential: compress to a file, then upload the file
+- pipelined: the codec's stdout streamed into a chunked PUT as it is produced
+
+The uncompressed log is uploaded the same way as a baseline. Every stored
+object is decompressed and checked against the corpus SHA256.
+"""
+
+import argparse
+import csv
+import hashlib
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import concurrent_readers
+import corpus_generator
+import run_benchmark
+
+UPLOAD_CORPUS_SIZE = '64MB'  # Size of the uploaded log
+UPLOAD_LEVELS = ('low', 'mid')  # Level names to run; every level is compressed once per link
+BANDWIDTHS = ('100Mbit', '1Gbit', '10Gbit')  # Links to the archive to emulate
+LINK_LATENCY = 0.02  # Seconds of round-trip time charged once per upload (connection and request)
+UPLOAD_CHUNK_SIZE = 256 * 1024  # Bytes per read from the codec or file and per HTTP chunk
+SOCKET_BUFFER_SIZE = 256 * 1024  # Send/receive buffers, so a throttled link pushes back on the codec promptly
+
+
+def parse_bandwidth(value: str) -> int:
+    """Parse a link speed such as 100Mbit, 1Gbit or 500000 (bits per second) into bits per second"""
+    units = {'K': 1000, 'M': 1000 ** 2, 'G': 1000 ** 3}
+    text = value.strip().upper()
+    if text.endswith('BIT'):
+        text = text[:-3]
+    try:
+        if text and text[-1] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid bandwidth {value!r} (e.g. 100Mbit, 1Gbit)")
+
+
+class _ObjectHandler(BaseHTTPRequestHandler):
+    """PUT /<name>: store the body at the server's link speed and return its size and SHA256"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _body_chunks(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass  # Trailers
+                    return
+                while size:
+                    chunk = self.rfile.read(min(size, UPLOAD_CHUNK_SIZE))
+                    if not chunk:
+                        raise ConnectionError("upload ended mid-chunk")
+                    size -= len(chunk)
+                    yield chunk
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers.get('Content-Length', 0))
+            while remaining:
+                chunk = self.rfile.read(min(remaining, UPLOAD_CHUNK_SIZE))
+                if not chunk:
+                    raise ConnectionError("upload ended early")
+                remaining -= len(chunk)
+                yield chunk
+
+    def do_PUT(self):
+        bandwidth, latency = self.server.link
+        time.sleep(latency)
+        hasher = hashlib.sha256()
+        size = 0
+        start_time = time.monotonic()
+        with open(os.path.join(self.server.store_dir, os.path.basename(self.path)), 'wb') as f:
+            for chunk in self._body_chunks():
+                f.write(chunk)
+                hasher.update(chunk)
+                size += len(chunk)
+                # Read no faster than the link; TCP backpressure throttles the sender
+                delay = start_time + size * 8 / bandwidth - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        body = json.dumps({'size': size, 'sha256': hasher.hexdigest()}).encode()
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ObjectServer(ThreadingHTTPServer):
+    """Local stand-in for the archive's object store; link is (bits per second, latency seconds)"""
+
+    daemon_threads = True
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self.link = (parse_bandwidth(BANDWIDTHS[0]), LINK_LATENCY)
+        super().__init__(('127.0.0.1', 0), _ObjectHandler)
+
+    def server_bind(self):
+        # Set before listen() so accepted sockets inherit it and the window stays small
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+        super().server_bind()
+
+
+def upload(port: int, name: str, body, headers: dict) -> dict:
+    """PUT body (a file object or an iterable of chunks) to the object server; returns its size/sha256 reply"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, blocksize=UPLOAD_CHUNK_SIZE)
+    connection.connect()
+    connection.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+    try:
+        connection.request('PUT', f'/{name}', body=body, headers=headers,
+                           encode_chunked=headers.get('Transfer-Encoding') == 'chunked')
+        response = connection.getresponse()
+        reply = response.read()
+        if response.status != 201:
+            raise ValueError(f"upload of {name} failed: HTTP {response.status}")
+        return json.loads(reply)
+    finally:
+        connection.close()
+
+
+def upload_file(port: int, name: str, path: str) -> tuple:
+    """Upload a finished file with a Content-Length; returns (seconds, reply)"""
+    start_time = time.perf_counter()
+    with open(path, 'rb') as f:
+        reply = upload(port, name, f, {'Content-Length': str(os.path.getsize(path))})
+    return time.perf_counter() - start_time, reply
+
+
+def upload_stream(port: int, name: str, compress_argv: list, input_file: str) -> tuple:
+    """Stream the compressor's stdout into a chunked upload as it is produced; returns (seconds, reply)"""
+    start_time = time.perf_counter()
+    with open(input_file, 'rb') as stdin:
+        process = subprocess.Popen(compress_argv, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            reply = upload(port, name, iter(lambda: process.stdout.read(UPLOAD_CHUNK_SIZE), b''),
+                           {'Transfer-Encoding': 'chunked'})
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+    if returncode != 0:
+        raise ValueError(f"{compress_argv[0]} exited with status {returncode}")
+    return time.perf_counter() - start_time, reply
+
+
+def stored_digest(decompress_argv, path: str) -> str:
+    """SHA256 of a stored object after decompression (None: stored uncompressed)"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as stdin:
+        if decompress_argv is None:
+            while chunk := stdin.read(UPLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+        else:
+            process = subprocess.Popen(decompress_argv, stdin=stdin, stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL)
+            while chunk := process.stdout.read(UPLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+            process.stdout.close()
+            process.wait()
+    return hasher.hexdigest()
+
+
+def run_pipelines(jobs: list, input_file: str, bandwidths: list, latency: float, work_dir: str) -> list:
+    """Time sequential and pipelined compress-and-upload for every codec/level and link"""
+    input_size = os.path.getsize(input_file)
+    digest = run_benchmark.get_input_digest(input_file)
+    store_dir = os.path.join(work_dir, 'objects')
+    os.makedirs(store_dir)
+    server = ObjectServer(store_dir)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    # (algorithm, level_name, level_value, compress argv, decompress argv); the baseline has neither
+    configs = [('none', None, None, None, None)]
+    for algorithm, level_name, level_value, config in jobs:
+        configs.append((algorithm, level_name, level_value,
+                        run_benchmark.codec_argv(config['compress_cmd'].format(level=level_value)),
+                        run_benchmark.codec_argv(config['decompress_cmd'].format(level=level_value))))
+
+    results = []
+    try:
+        for algorithm, level_name, level_value, compress_argv, decompress_argv in configs:
+            name = algorithm if level_name is None else f"{algorithm}-{level_name}"
+            print(f"Testing {algorithm}" + (f" level {level_name} ({level_value})" if level_name else " (uncompressed)"))
+            if compress_argv is None:
+                compressed_file, compression_time = input_file, 0.0
+            else:
+                compressed_file = os.path.join(work_dir, name)
+                start_time = time.perf_counter()
+                with open(input_file, 'rb') as stdin, open(compressed_file, 'wb') as stdout:
+                    subprocess.run(compress_argv, stdin=stdin, stdout=stdout, stderr=subprocess.DEVNULL, check=True)
+                compression_time = time.perf_counter() - start_time
+            compressed_size = os.path.getsize(compressed_file)
+
+            for bandwidth_name, bandwidth in bandwidths:
+                server.link = (bandwidth, latency)
+                upload_time, reply = upload_file(port, f"{name}-sequential", compressed_file)
+                if compress_argv is None:
+                    pipelined_time, stream_reply = upload_time, reply
+                else:
+                    pipelined_time, stream_reply = upload_stream(port, f"{name}-pipelined", compress_argv, input_file)
+                valid = (reply['size'] == compressed_size and stream_reply['size'] == compressed_size
+                         and stored_digest(decompress_argv, os.path.join(store_dir, f"{name}-sequential")) == digest)
+                if compress_argv is not None:
+                    valid = valid and stored_digest(
+                        decompress_argv, os.path.join(store_dir, f"{name}-pipelined")) == digest
+                sequential_time = compression_time + upload_time
+                ideal_upload_time = compressed_size * 8 / bandwidth + latency
+                result = {
+                    'mode': 'upload_pipeline',
+                    'algorithm': algorithm,
+                    'level_name': level_name,
+                    'level_value': level_value,
+                    'bandwidth_name': bandwidth_name,
+                    'bandwidth': bandwidth,
+                    'latency': latency,
+                    'input_size': input_size,
+                    'compressed_size': compressed_size,
+                    'compression_ratio': compressed_size / input_size,
+                    'compression_time': compression_time,
+                    'upload_time': upload_time,
+                    'sequential_time': sequential_time,
+                    'pipelined_time': pipelined_time,
+                    # Share of the sequential time the pipeline hides by overlapping compression and transfer
+                    'overlap_saving': 1 - pipelined_time / sequential_time,
+                    'end_to_end_throughput': input_size / pipelined_time,
+                    # Below ~0.9 the harness, not the emulated link, limited the upload
+                    'link_utilization': ideal_upload_time / upload_time,
+                    'sha256_valid': valid,
+                }
+                print(f"  {bandwidth_name:>8}: compress {compression_time:.2f}s + upload {upload_time:.2f}s = "
+                      f"{sequential_time:.2f}s, pipelined {pipelined_time:.2f}s ({result['overlap_saving']:.0%} saved)")
+                if result['link_utilization'] < 0.9:
+                    print(f"    Link only {result['link_utilization']:.0%} utilized: the harness limits this upload")
+                if not valid:
+                    print("    Verification failed")
+                results.append(result)
+                for suffix in ('sequential', 'pipelined'):
+                    if os.path.exists(os.path.join(store_dir, f"{name}-{suffix}")):
+                        os.remove(os.path.join(store_dir, f"{name}-{suffix}"))
+            if compress_argv is not None:
+                os.remove(compressed_file)
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark compress-then-upload against compression streamed into a throttled upload'
+    )
+    parser.add_argument('--bandwidths', default=','.join(BANDWIDTHS),
+                        help=f"Comma-separated link speeds (default: {','.join(BANDWIDTHS)})")
+    parser.add_argument('--latency', type=float, default=LINK_LATENCY * 1000,
+                        help=f'Round-trip time in milliseconds charged per upload (default: {LINK_LATENCY * 1000:g})')
+    parser.add_argument('--corpus-size', type=corpus_generator.parse_size, default=UPLOAD_CORPUS_SIZE,
+                        help=f'Size of the uploaded log (default: {UPLOAD_CORPUS_SIZE})')
+    parser.add_argument('--levels', default=','.join(UPLOAD_LEVELS),
+                        help=f"Comma-separated level names (default: {','.join(UPLOAD_LEVELS)})")
+    parser.add_argument('--codecs',
+                        help='Comma-separated subset of the registry codecs (default: every installed one)')
+    parser.add_argument('--work-dir',
+                        help='Directory for compressed files and stored objects (default: a temporary directory)')
+    parser.add_argument('--seed', type=int, default=run_benchmark.CORPUS_SEED,
+                        help='Seed for the generated corpus')
+    parser.add_argument('--corpus-profile',
+                        help='JSON file overriding the corpus content profile (see corpus_generator.py)')
+    args = parser.parse_args()
+
+    bandwidths = [(name.strip(), parse_bandwidth(name)) for name in args.bandwidths.split(',')]
+    jobs = concurrent_readers.cli_jobs(tuple(args.levels.split(',')))
+    if args.codecs:
+        jobs = [job for job in jobs if job[0] in args.codecs.split(',')]
+    if not jobs:
+        print("Error: none of the selected codecs is installed")
+        sys.exit(1)
+
+    input_file = run_benchmark.create_test_file(args.corpus_size, args.seed, args.corpus_profile)
+    with tempfile.TemporaryDirectory(prefix='compbench-upload-', dir=args.work_dir) as work_dir:
+        print(f"Links: {args.bandwidths}, {args.latency:g} ms round trip")
+        results = run_pipelines(jobs, str(input_file), bandwidths, args.latency / 1000, work_dir)
+
+    timestamp = int(time.time())
+    json_file = f"upload_{timestamp}.json"
+    with open(json_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    csv_file = f"upload_{timestamp}.csv"
+    if results:
+        with open(csv_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    print("Results saved:")
+    print(f"JSON: {json_file}")
+    print(f"CSV: {csv_file}")
+    print(f"Total tests: {len(results)}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)